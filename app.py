@@ -13,6 +13,10 @@ import os
 app_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, app_dir)
 
+# Il profilo dell'avvio (--profile-startup) deve partire prima degli import pesanti
+from src import startup_profiler
+startup_profiler.start_from_argv()
+
 from src.main import main
 
 if __name__ == "__main__":
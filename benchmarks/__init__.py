@@ -0,0 +1,3 @@
+"""
+Benchmark di prestazioni per Studio App (eseguibili senza display)
+"""
@@ -0,0 +1,97 @@
+"""
+Suite di benchmark dei servizi principali, senza display
+
+    python -m benchmarks --output risultati.json
+    python -m benchmarks --suites notes --only search --notes-sizes 10 1000
+    python -m benchmarks --compare baseline.json --threshold 0.2
+
+Tutto avviene in una HOME temporanea: configurazione, indice dei plugin e
+note dell'utente non vengono toccati. Con --compare l'uscita è 1 se un
+benchmark peggiora il p50 oltre la soglia.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.harness import (DEFAULT_REGRESSION_THRESHOLD, DEFAULT_REPEATS, DEFAULT_WARMUP,
+                                BenchmarkRunner, compare_reports, write_report)
+
+SUITES = ("settings", "plugins", "copilot", "notes")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks",
+                                     description="Benchmark dei servizi di Studio App")
+    parser.add_argument("--output", default="benchmark_results.json",
+                        help="File JSON con i risultati")
+    parser.add_argument("--warmup", type=int, default=DEFAULT_WARMUP)
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS)
+    parser.add_argument("--suites", nargs="+", choices=SUITES, default=list(SUITES))
+    parser.add_argument("--only", nargs="+", default=[],
+                        help="Esegue solo i benchmark il cui nome contiene uno di questi testi")
+    parser.add_argument("--notes-sizes", nargs="+", type=int, default=None,
+                        help="Numero di note da misurare (default 10 1000 100000)")
+    parser.add_argument("--compare", help="Report JSON precedente da confrontare")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_REGRESSION_THRESHOLD,
+                        help="Peggioramento relativo del p50 considerato regressione")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    output = os.path.abspath(args.output)
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    with tempfile.TemporaryDirectory(prefix="studio-bench-") as tmp_dir:
+        # Prima di importare src: alcuni percorsi predefiniti dipendono da HOME
+        home = Path(tmp_dir) / "home"
+        home.mkdir()
+        os.environ["HOME"] = os.environ["USERPROFILE"] = str(home)
+        work_dir = Path(tmp_dir) / "work"
+        work_dir.mkdir()
+
+        from benchmarks import bench_core
+
+        runner = BenchmarkRunner(warmup=args.warmup, repeats=args.repeats, only=args.only)
+        suites = {
+            "settings": lambda: bench_core.bench_settings(runner, work_dir),
+            "plugins": lambda: bench_core.bench_plugins(runner, work_dir),
+            "copilot": lambda: bench_core.bench_copilot(runner, work_dir),
+            "notes": lambda: bench_core.bench_notes(
+                runner, work_dir, args.notes_sizes or bench_core.DEFAULT_NOTES_SIZES
+            )
+        }
+
+        started = time.perf_counter()
+        for name in args.suites:
+            print(f"📊 {name}")
+            suites[name]()
+
+    report = runner.report()
+    report["duration_seconds"] = time.perf_counter() - started
+    write_report(report, output)
+    print(f"💾 {len(runner.results)} risultati salvati in {output}")
+
+    if baseline is None:
+        return 0
+
+    regressions = 0
+    print(f"\n🔍 Confronto con {args.compare} (soglia +{args.threshold:.0%} sul p50)")
+    for item in compare_reports(baseline, report, args.threshold):
+        marker = "❌" if item["regression"] else "✅"
+        regressions += item["regression"]
+        print(f"  {marker} {item['name']:<40} {item['baseline']:9.3f} -> {item['current']:9.3f} ms "
+              f"({item['change']:+.0%})")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
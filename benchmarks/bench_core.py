@@ -0,0 +1,205 @@
+"""
+Benchmark dei servizi principali: impostazioni, plugin, CopilotService e note
+
+Le funzioni ricevono un BenchmarkRunner e una directory di lavoro temporanea;
+HOME deve già puntare a una directory temporanea (vedi __main__.py), perché
+alcuni moduli calcolano i percorsi predefiniti all'import.
+"""
+
+import contextlib
+import io
+import json
+import os
+import random
+import shutil
+import uuid
+from pathlib import Path
+from typing import List
+
+from benchmarks.harness import BenchmarkRunner
+
+DEFAULT_NOTES_SIZES = (10, 1_000, 100_000)
+PLUGIN_COUNT = 50
+
+PLUGIN_TEMPLATE = '''
+from src.ui.plugins.plugin_manager import PluginBase
+
+PLUGIN_MANIFEST = {{
+    "name": "Plugin {index}",
+    "version": "1.{index}",
+    "entry": "BenchPlugin",
+    "capabilities": ["widget"]
+}}
+
+class BenchPlugin(PluginBase):
+    def get_name(self): return "Plugin {index}"
+    def get_description(self): return "Plugin generato per i benchmark"
+    def get_version(self): return "1.{index}"
+    def initialize(self, settings):
+        self.settings = settings
+        return True
+    def create_widget(self, parent): return None
+'''
+
+
+@contextlib.contextmanager
+def quiet():
+    """Nasconde i print dei servizi durante le misure"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def bench_settings(runner: BenchmarkRunner, work_dir: Path):
+    from src.configs.settings import Settings
+
+    settings = Settings()
+    # Configurazione realistica: qualche sezione in più oltre ai default
+    settings.settings["history"] = {f"sessione_{i}": {"aperta": i % 2 == 0} for i in range(200)}
+    settings.save_settings()
+
+    runner.run("settings.load", Settings)
+    runner.run("settings.save", settings.save_settings)
+
+    def set_burst():
+        # 100 modifiche raggruppate in una sola scrittura
+        with settings.transaction():
+            for i in range(100):
+                settings.set("benchmark_value", i)
+        settings.flush()
+
+    runner.run("settings.set_burst_100", set_burst)
+
+
+def bench_plugins(runner: BenchmarkRunner, work_dir: Path):
+    from src.configs.settings import Settings
+    from src.ui.plugins.plugin_manager import PluginManager
+
+    plugins_dir = work_dir / "plugins"
+    plugins_dir.mkdir(exist_ok=True)
+    for index in range(PLUGIN_COUNT):
+        (plugins_dir / f"bench_{index}.py").write_text(PLUGIN_TEMPLATE.format(index=index),
+                                                       encoding="utf-8")
+    index_file = work_dir / "plugin_index.json"
+    settings = Settings()
+    params = {"plugins": PLUGIN_COUNT}
+
+    def remove_index():
+        if index_file.exists():
+            index_file.unlink()
+
+    def discover():
+        PluginManager(settings, plugins_dir=str(plugins_dir), index_file=index_file)
+
+    # A freddo ogni manifest viene letto dal sorgente, a caldo dall'indice
+    runner.run("plugins.discover_cold", discover, setup=remove_index, params=params)
+    discover()
+    runner.run("plugins.discover_warm", discover, params=params)
+
+    manager = PluginManager(settings, plugins_dir=str(plugins_dir), index_file=index_file)
+
+    def unload():
+        with quiet():
+            manager.unload_plugin("bench_0")
+
+    def load():
+        with quiet():
+            if not manager.load_plugin("bench_0"):
+                raise RuntimeError("Caricamento del plugin fallito")
+
+    runner.run("plugins.load", load, setup=unload)
+    unload()
+    manager.shutdown()
+
+
+def bench_copilot(runner: BenchmarkRunner, work_dir: Path):
+    from src.configs.settings import Settings
+    from src.services.copilot_service import CopilotService
+    from src.services.mock_server import MockCompletionServer
+
+    reply = "risposta del server locale per il benchmark"
+    messages = [{"role": "user", "content": "ciao"}]
+    with MockCompletionServer(reply=reply) as server:
+        os.environ["GITHUB_COPILOT_API_KEY"] = "bench-key-1234567890"
+        os.environ["OPENAI_API_KEY"] = "bench-key"
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        service = CopilotService(Settings())
+
+        # Il servizio ripiega su una risposta mock in caso di errore: va escluso
+        if service.send_message(messages) != reply:
+            raise RuntimeError(f"Il server locale {server.base_url} non ha risposto")
+
+        runner.run("copilot.send_message", lambda: service.send_message(messages))
+        runner.run("copilot.stream_message", lambda: list(service.stream_message(messages)))
+
+
+def _generate_notes(count: int) -> dict:
+    notes = {}
+    for i in range(count):
+        note_id = uuid.uuid4().hex
+        notes[note_id] = {
+            "id": note_id,
+            "title": f"Nota {i}",
+            "content": f"Appunti numero {i} sull'argomento{i % 97}. " * 8,
+            "created_at": f"2024-01-01T00:00:00.{i:06d}",
+            "modified_at": f"2024-01-02T00:00:00.{i:06d}"
+        }
+    return notes
+
+
+def bench_notes(runner: BenchmarkRunner, work_dir: Path, sizes: List[int] = DEFAULT_NOTES_SIZES):
+    from src.services.notes_store import NotesStore
+
+    rng = random.Random(42)
+    for count in sizes:
+        data_dir = work_dir / f"notes_{count}"
+        data_dir.mkdir(exist_ok=True)
+        notes = _generate_notes(count)
+        # Il popolamento passa dal percorso di migrazione di notes.json
+        with open(data_dir / "notes.json", 'w', encoding='utf-8') as f:
+            json.dump(notes, f)
+        ids = list(notes)
+        params = {"notes": count}
+        # Le operazioni più lente si ripetono meno volte con 100k note
+        few = min(runner.repeats, 5) if count >= 100_000 else None
+
+        def remove_db():
+            for name in ("notes.db", "notes.db-wal", "notes.db-shm"):
+                path = data_dir / name
+                if path.exists():
+                    path.unlink()
+
+        def migrate():
+            store = NotesStore(data_dir)
+            with quiet():
+                store.open()
+            store.close()
+
+        runner.run(f"notes.migrate[{count}]", migrate, setup=remove_db,
+                   warmup=1, repeats=min(runner.repeats, 3), params=params)
+        migrate()
+        # Il vecchio file non serve più: le aperture successive non lo rileggono
+        (data_dir / "notes.json").unlink()
+
+        def open_and_list():
+            store = NotesStore(data_dir)
+            store.list_meta()
+            store.close()
+
+        runner.run(f"notes.open_list_meta[{count}]", open_and_list, repeats=few, params=params)
+
+        store = NotesStore(data_dir)
+        store.open()
+        try:
+            runner.run(f"notes.get[{count}]", lambda: store.get(rng.choice(ids)), params=params)
+
+            def put():
+                note = store.get(rng.choice(ids))
+                note["content"] += " modifica"
+                store.put(note)
+
+            runner.run(f"notes.put[{count}]", put, params=params)
+            runner.run(f"notes.search[{count}]", lambda: store.search("argomento5"),
+                       repeats=few, params=params)
+        finally:
+            store.close()
+        shutil.rmtree(data_dir, ignore_errors=True)
@@ -0,0 +1,70 @@
+"""
+Confronta la latenza per richiesta con e senza pool di connessioni
+
+    python -m benchmarks.bench_http_pool --requests 200
+"""
+
+import argparse
+import statistics
+import time
+from typing import Callable, List
+
+import requests
+
+from src.services.http_session import create_session
+from src.services.mock_server import MockCompletionServer
+
+PAYLOAD = {
+    "model": "gpt-3.5-turbo",
+    "messages": [{"role": "user", "content": "ping"}]
+}
+
+
+def measure(post: Callable, url: str, count: int) -> List[float]:
+    """Esegue count richieste e restituisce le latenze in millisecondi"""
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        response = post(url, json=PAYLOAD, timeout=10)
+        response.raise_for_status()
+        response.json()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def summarize(label: str, samples: List[float]):
+    ordered = sorted(samples)
+    p95 = ordered[int(len(ordered) * 0.95) - 1]
+    print(f"{label:<22} media {statistics.mean(samples):7.3f} ms   "
+          f"p50 {statistics.median(samples):7.3f} ms   p95 {p95:7.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del pool di connessioni HTTP")
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    with MockCompletionServer() as server:
+        url = f"{server.base_url}/chat/completions"
+
+        # Riscaldamento di entrambi i percorsi
+        measure(requests.post, url, 5)
+
+        without_pool = measure(requests.post, url, args.requests)
+
+        session = create_session()
+        try:
+            measure(session.post, url, 5)
+            with_pool = measure(session.post, url, args.requests)
+        finally:
+            session.close()
+
+    print(f"📊 {args.requests} richieste verso {server.base_url}")
+    summarize("senza pool (requests)", without_pool)
+    summarize("con pool (Session)", with_pool)
+    speedup = statistics.median(without_pool) / statistics.median(with_pool)
+    print(f"⚡ Speedup mediano: {speedup:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
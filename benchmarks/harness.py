@@ -0,0 +1,154 @@
+"""
+Misurazione dei benchmark: riscaldamento, ripetizioni, percentili e report JSON
+"""
+
+import json
+import math
+import os
+import platform
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+DEFAULT_WARMUP = 3
+DEFAULT_REPEATS = 20
+PERCENTILES = (50, 90, 95, 99)
+# Peggioramento del p50 oltre il quale un benchmark è segnalato come regressione
+DEFAULT_REGRESSION_THRESHOLD = 0.20
+REPORT_VERSION = 1
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    """Percentile q (0-100) di una lista ordinata, con interpolazione lineare"""
+    if not ordered:
+        return math.nan
+    position = (len(ordered) - 1) * q / 100
+    lower = math.floor(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize(samples_ms: List[float]) -> Dict[str, float]:
+    """Statistiche di una serie di campioni in millisecondi"""
+    ordered = sorted(samples_ms)
+    summary = {
+        "min": ordered[0],
+        "mean": statistics.mean(ordered),
+        "max": ordered[-1],
+        "stdev": statistics.stdev(ordered) if len(ordered) > 1 else 0.0
+    }
+    for q in PERCENTILES:
+        summary[f"p{q}"] = percentile(ordered, q)
+    return summary
+
+
+class BenchmarkRunner:
+    """Esegue i benchmark e ne raccoglie i risultati"""
+
+    def __init__(self, warmup: int = DEFAULT_WARMUP, repeats: int = DEFAULT_REPEATS,
+                 only: Optional[List[str]] = None, verbose: bool = True):
+        self.warmup = warmup
+        self.repeats = repeats
+        # Filtri sul nome: si eseguono solo i benchmark che ne contengono uno
+        self.only = only or []
+        self.verbose = verbose
+        self.results: List[Dict[str, Any]] = []
+
+    def selected(self, name: str) -> bool:
+        return not self.only or any(pattern in name for pattern in self.only)
+
+    def run(self, name: str, func: Callable[[], Any], setup: Optional[Callable[[], Any]] = None,
+            warmup: Optional[int] = None, repeats: Optional[int] = None,
+            params: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Misura func() più volte
+
+        Args:
+            name: Nome del benchmark, es. "notes.list_meta[1000]"
+            func: Operazione misurata
+            setup: Eseguita prima di ogni campione, fuori dalla misura
+            warmup: Esecuzioni iniziali scartate
+            repeats: Campioni misurati
+            params: Parametri riportati nel JSON (es. numero di note)
+
+        Returns:
+            Il risultato, o None se il benchmark è escluso dai filtri
+        """
+        if not self.selected(name):
+            return None
+        warmup = self.warmup if warmup is None else warmup
+        repeats = self.repeats if repeats is None else repeats
+
+        for _ in range(warmup):
+            if setup is not None:
+                setup()
+            func()
+
+        samples = []
+        for _ in range(repeats):
+            if setup is not None:
+                setup()
+            start = time.perf_counter()
+            func()
+            samples.append((time.perf_counter() - start) * 1000)
+
+        result = {
+            "name": name,
+            "params": params or {},
+            "warmup": warmup,
+            "repeats": repeats,
+            "unit": "ms",
+            "stats": summarize(samples),
+            "samples": samples
+        }
+        self.results.append(result)
+        if self.verbose:
+            stats = result["stats"]
+            print(f"  {name:<40} p50 {stats['p50']:9.3f} ms   p95 {stats['p95']:9.3f} ms   "
+                  f"max {stats['max']:9.3f} ms")
+        return result
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "version": REPORT_VERSION,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "environment": {
+                "python": sys.version.split()[0],
+                "implementation": platform.python_implementation(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count()
+            },
+            "results": self.results
+        }
+
+
+def write_report(report: Dict[str, Any], path: str):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+
+def compare_reports(baseline: Dict[str, Any], current: Dict[str, Any],
+                    threshold: float = DEFAULT_REGRESSION_THRESHOLD) -> List[Dict[str, Any]]:
+    """
+    Confronta il p50 dei benchmark presenti in entrambi i report
+
+    Returns:
+        [{"name", "baseline", "current", "change", "regression"}], change è relativo (0.1 = +10%)
+    """
+    previous = {result["name"]: result["stats"]["p50"] for result in baseline.get("results", [])}
+    comparison = []
+    for result in current.get("results", []):
+        name = result["name"]
+        if name not in previous:
+            continue
+        before, after = previous[name], result["stats"]["p50"]
+        change = (after - before) / before if before > 0 else 0.0
+        comparison.append({
+            "name": name,
+            "baseline": before,
+            "current": after,
+            "change": change,
+            "regression": change > threshold
+        })
+    return comparison
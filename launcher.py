@@ -6,6 +6,9 @@ Launcher per Studio App con rilevamento automatico dell'ambiente
 import sys
 import os
 import subprocess
+import time
+
+from src import startup_profiler
 
 
 def activate_venv():
@@ -21,8 +24,8 @@ def activate_venv():
         if os.path.exists(python_path) and sys.executable != python_path:
             print("🔧 Riavvio con ambiente virtuale...")
             # Riavvia lo script con l'interprete Python dell'ambiente virtuale
-            subprocess.run([python_path] + sys.argv)
-            sys.exit(0)
+            result = subprocess.run([python_path] + sys.argv)
+            sys.exit(result.returncode)
         elif os.path.exists(python_path):
             print("✅ Ambiente virtuale già attivo")
     else:
@@ -36,6 +39,12 @@ def check_display():
 
 def main():
     """Avvia l'applicazione nel modo appropriato"""
+    profiling = startup_profiler.PROFILE_FLAG in sys.argv
+    if profiling and startup_profiler.LAUNCH_TIME_ENV not in os.environ:
+        # Il processo rilanciato nel venv misura l'avvio a partire da qui
+        launch_time = startup_profiler.process_start_time() or time.time()
+        os.environ[startup_profiler.LAUNCH_TIME_ENV] = str(launch_time)
+    
     # Attiva ambiente virtuale se necessario
     activate_venv()
 
@@ -43,7 +52,12 @@ def main():
     app_dir = os.path.dirname(os.path.abspath(__file__))
     sys.path.insert(0, app_dir)
     
-    if check_display():
+    if profiling:
+        # Profilo dell'avvio: niente fallback sui test, l'esito è il codice di uscita
+        startup_profiler.start_from_argv()
+        from src.main import main as gui_main
+        gui_main()
+    elif check_display():
         # Avvia l'interfaccia grafica
         print("🖥️ Avvio interfaccia grafica...")
         try:
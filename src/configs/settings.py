@@ -5,10 +5,39 @@ Configurazioni e impostazioni dell'applicazione
 import os
 from typing import Dict, Any
 import json
+import atexit
+import threading
+import weakref
+from contextlib import contextmanager
 from pathlib import Path
 
+# Attesa dopo l'ultima modifica prima di scrivere config.json
+SAVE_DEBOUNCE_SECONDS = 0.5
+
+# Istanze con modifiche eventualmente non ancora scritte, salvate all'uscita
+_live_settings: "weakref.WeakSet[Settings]" = weakref.WeakSet()
+
+def _flush_all_settings():
+    for settings in list(_live_settings):
+        settings.flush()
+
+atexit.register(_flush_all_settings)
+
 class Settings:
-    def __init__(self):
+    def __init__(self, debounce_seconds: float = SAVE_DEBOUNCE_SECONDS):
+        # Stato della scrittura differita
+        self.debounce_seconds = debounce_seconds
+        self._lock = threading.RLock()
+        # Ordina le scritture su disco, fuori da _lock: set() non attende mai l'I/O
+        self._write_lock = threading.Lock()
+        self._snapshot_seq = 0
+        self._written_seq = 0
+        self._dirty = False
+        self._timer: threading.Timer = None
+        self._transaction_depth = 0
+        self.write_count = 0
+        _live_settings.add(self)
+        
         self.config_dir = Path.home() / ".studio_app"
         self.config_file = self.config_dir / "config.json"
         self.default_settings = {
@@ -25,7 +54,50 @@ class Settings:
                 "maximized": False
             },
             "plugins": {
-                "enabled": ["chat", "notes", "code_editor"]
+                "enabled": ["chat", "notes", "code_editor"],
+                "preload": True,
+                "isolation": True,
+                "hot_reload": True
+            },
+            "network": {
+                "pool_connections": 4,
+                "pool_maxsize": 10,
+                "max_concurrency": 4,
+                "completion_concurrency": 3,
+                "connect_timeout": 3.05,
+                "read_timeout": 30
+            },
+            "resilience": {
+                "max_attempts": 3,
+                "base_delay": 0.5,
+                "max_delay": 8.0,
+                "max_retry_after": 30.0,
+                "failure_threshold": 5,
+                "reset_timeout": 30.0
+            },
+            "providers": {
+                "local": [],
+                "hedge": True,
+                "hedge_percentile": 95,
+                "latency_window": 50
+            },
+            "model": {
+                "name": "gpt-3.5-turbo",
+                "temperature": 0.7,
+                "max_tokens": 1000
+            },
+            "chat": {
+                "context_tokens": 3000,
+                "summary_tokens": 300,
+                "max_messages": 500
+            },
+            "cache": {
+                "enabled": False,
+                "max_entries": 256,
+                "ttl_seconds": 3600,
+                "disk_enabled": False,
+                "max_disk_entries": 1024,
+                "allow_nondeterministic": False
             }
         }
         self.settings = self.load_settings()
@@ -47,22 +119,108 @@ class Settings:
             return self.default_settings.copy()
     
     def save_settings(self, settings: Dict[str, Any] = None):
-        """Salva le impostazioni nel file di configurazione"""
-        if settings is None:
-            settings = self.settings
-        
-        self.config_dir.mkdir(exist_ok=True)
-        with open(self.config_file, 'w', encoding='utf-8') as f:
-            json.dump(settings, f, indent=2)
+        """Salva subito le impostazioni, in modo atomico (file temporaneo + rename)"""
+        self._write(*self._snapshot(settings))
+    
+    def _snapshot(self, settings: Dict[str, Any] = None):
+        """(numero progressivo, JSON) delle impostazioni, preso sotto lock"""
+        with self._lock:
+            self._snapshot_seq += 1
+            return self._snapshot_seq, json.dumps(self.settings if settings is None else settings,
+                                                  indent=2)
+    
+    def _write(self, seq: int, data: str):
+        """Scrive uno snapshot; uno più vecchio di quello già su disco viene scartato"""
+        with self._write_lock:
+            if seq <= self._written_seq:
+                return
+            self.config_dir.mkdir(exist_ok=True)
+            tmp_file = self.config_file.with_suffix(".json.tmp")
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, self.config_file)
+            self._written_seq = seq
+            self.write_count += 1
     
     def get(self, key: str, default=None):
         """Ottiene un valore dalle impostazioni"""
         return self.settings.get(key, default)
     
     def set(self, key: str, value: Any):
-        """Imposta un valore nelle impostazioni"""
-        self.settings[key] = value
-        self.save_settings()
+        """Imposta un valore; la scrittura su disco avviene in modo differito"""
+        with self._lock:
+            self.settings[key] = value
+            self._dirty = True
+            if self._transaction_depth == 0:
+                self._schedule_save()
+    
+    @contextmanager
+    def transaction(self):
+        """
+        Raggruppa più modifiche in un'unica scrittura
+        
+        Esempio:
+            with settings.transaction():
+                settings.set("theme", "light")
+                settings.set("layout", layout_config)
+        """
+        with self._lock:
+            self._transaction_depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._transaction_depth -= 1
+                if self._transaction_depth == 0 and self._dirty:
+                    self._schedule_save()
+    
+    def _schedule_save(self):
+        """(Ri)avvia il timer di debounce"""
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(self.debounce_seconds, self._save_if_dirty)
+        self._timer.daemon = True
+        self._timer.start()
+    
+    def _save_if_dirty(self):
+        with self._lock:
+            self._timer = None
+            if not self._dirty:
+                return
+            try:
+                snapshot = self._snapshot()
+            except RuntimeError:
+                # Un dizionario annidato modificato durante la serializzazione: si riprova
+                self._schedule_save()
+                return
+            self._dirty = False
+        
+        # La scrittura avviene fuori da _lock: set() dal thread di Tk non aspetta il disco
+        try:
+            self._write(*snapshot)
+        except OSError as e:
+            print(f"Errore nel salvataggio delle impostazioni: {e}")
+            with self._lock:
+                self._dirty = True
+    
+    def flush(self):
+        """Scrive subito le modifiche in sospeso (es. alla chiusura)"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._dirty:
+                return
+            snapshot = self._snapshot()
+            self._dirty = False
+        try:
+            self._write(*snapshot)
+        except OSError:
+            with self._lock:
+                self._dirty = True
+            raise
     
     def get_github_api_key(self) -> str:
         """Ottiene la chiave API di GitHub Copilot"""
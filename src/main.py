@@ -2,14 +2,19 @@
 Main entry point per l'applicazione Studio App
 """
 
+import sys
 import tkinter as tk
 import customtkinter as ctk
+from src import startup_profiler
 from src.ui.main_window import MainWindow
 from src.configs.settings import Settings
 import os
 from dotenv import load_dotenv
 
 def main():
+    profiler = startup_profiler.get_profiler()
+    startup_profiler.mark("imports")
+    
     # Carica le variabili d'ambiente
     load_dotenv()
     
@@ -19,9 +24,26 @@ def main():
     
     # Inizializza le impostazioni
     settings = Settings()
+    startup_profiler.mark("settings")
     
     # Crea e avvia l'applicazione principale
-    app = MainWindow(settings)
+    try:
+        app = MainWindow(settings)
+    except tk.TclError as e:
+        if profiler is None:
+            raise
+        # Senza display si misurano solo le fasi precedenti
+        profiler.skip("widget_build", f"nessun display: {e}")
+        sys.exit(profiler.finish())
+    
+    if profiler is not None:
+        # Primo disegno completo della finestra, poi chiusura senza salvare il layout
+        app.root.update()
+        startup_profiler.mark("first_paint")
+        code = profiler.finish()
+        app.shutdown()
+        sys.exit(code)
+    
     app.run()
 
 if __name__ == "__main__":
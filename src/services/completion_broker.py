@@ -0,0 +1,314 @@
+"""
+Broker condiviso delle richieste di completamento
+
+Chat e plugin passano da un unico CopilotService invece di crearne uno a
+testa. Le richieste vengono accodate per priorità (la chat interattiva prima
+del lavoro in background dei plugin) e avviate sul RequestEngine entro un
+limite di concorrenza, con uno slot sempre riservato alla chat. Richieste
+identiche ancora in coda o in esecuzione condividono una sola chiamata
+(single-flight), identificata dalla stessa chiave della cache delle risposte.
+"""
+
+import heapq
+import itertools
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
+
+from src.services.response_cache import make_cache_key
+
+if TYPE_CHECKING:
+    from src.services.copilot_service import CopilotService
+    from src.services.request_engine import RequestEngine
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+DEFAULT_MAX_CONCURRENCY = 3
+# Slot che il lavoro in background non può occupare
+RESERVED_INTERACTIVE_SLOTS = 1
+
+
+class CompletionHandle:
+    """Riferimento di un richiedente a una richiesta del broker"""
+
+    def __init__(self):
+        self._cancelled = threading.Event()
+        self._done = threading.Event()
+        self.result: Optional[str] = None
+        self.error: Optional[Exception] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def cancel(self):
+        """
+        Rinuncia al risultato
+
+        La chiamata condivisa viene saltata solo se nessun altro richiedente
+        la sta aspettando; uno streaming si ferma al delta successivo.
+        """
+        self._cancelled.set()
+        self._done.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Attende il risultato (fuori dal thread di Tk)"""
+        return self._done.wait(timeout)
+
+
+class _Subscriber:
+    def __init__(self, handle: CompletionHandle, on_result: Optional[Callable],
+                 on_error: Optional[Callable]):
+        self.handle = handle
+        self.on_result = on_result
+        self.on_error = on_error
+
+
+class _Job:
+    def __init__(self, key: Optional[str], messages: List[Dict[str, str]], priority: int,
+                 stream: bool = False):
+        self.key = key
+        self.messages = messages
+        self.priority = priority
+        self.stream = stream
+        self.subscribers: List[_Subscriber] = []
+        self.on_done: Optional[Callable[[], None]] = None
+        self.started = False
+
+    @property
+    def cancelled(self) -> bool:
+        return all(subscriber.handle.cancelled for subscriber in self.subscribers)
+
+
+class CompletionBroker:
+    def __init__(self, service: 'CopilotService', request_engine: 'RequestEngine',
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 reserved_interactive: int = RESERVED_INTERACTIVE_SLOTS):
+        self.service = service
+        self.request_engine = request_engine
+        self.max_concurrency = max(1, max_concurrency)
+        self.reserved_interactive = min(reserved_interactive, self.max_concurrency - 1)
+
+        self._lock = threading.Lock()
+        self._queue: List[tuple] = []
+        self._sequence = itertools.count()
+        # Richieste in coda o in esecuzione, per chiave: base del single-flight
+        self._inflight: Dict[str, _Job] = {}
+        self._running = 0
+        self._closed = False
+
+        self.submitted = 0
+        self.deduplicated = 0
+        self.completed = 0
+        self.skipped = 0
+        self.peak_running = 0
+
+    # --- API pubblica -------------------------------------------------
+
+    def submit(self, messages: List[Dict[str, str]], priority: int = PRIORITY_BACKGROUND,
+               on_result: Callable[[str], None] = None,
+               on_error: Callable[[Exception], None] = None) -> CompletionHandle:
+        """
+        Accoda una richiesta di completamento
+
+        Args:
+            messages: Messaggi nel formato [{"role": "user", "content": "..."}]
+            priority: PRIORITY_INTERACTIVE o PRIORITY_BACKGROUND (più basso = prima)
+            on_result: Callback con la risposta, eseguito nel thread di Tk
+            on_error: Callback con l'eccezione, eseguito nel thread di Tk
+        """
+        handle = CompletionHandle()
+        subscriber = _Subscriber(handle, on_result, on_error)
+        key = make_cache_key(self.service.model, messages, self.service.temperature,
+                             self.service.max_tokens)
+        with self._lock:
+            self._check_open()
+            self.submitted += 1
+            job = self._inflight.get(key)
+            if job is not None:
+                # Richiesta identica già in volo: si aggiunge ai richiedenti
+                job.subscribers.append(subscriber)
+                self.deduplicated += 1
+                if priority < job.priority and not job.started:
+                    # La richiesta in coda sale alla priorità più urgente
+                    job.priority = priority
+                    self._push(job)
+                return handle
+
+            job = _Job(key, messages, priority)
+            job.subscribers.append(subscriber)
+            self._inflight[key] = job
+            self._push(job)
+        self._dispatch()
+        return handle
+
+    def submit_stream(self, messages: List[Dict[str, str]], priority: int = PRIORITY_INTERACTIVE,
+                      on_item: Callable[[str], None] = None,
+                      on_done: Callable[[], None] = None,
+                      on_error: Callable[[Exception], None] = None) -> CompletionHandle:
+        """
+        Accoda una risposta in streaming (senza deduplica)
+
+        on_item riceve ogni delta e on_done segue l'ultimo, nel thread di Tk.
+        """
+        handle = CompletionHandle()
+        job = _Job(None, messages, priority, stream=True)
+        job.subscribers.append(_Subscriber(handle, on_item, on_error))
+        job.on_done = on_done
+        with self._lock:
+            self._check_open()
+            self.submitted += 1
+            self._push(job)
+        self._dispatch()
+        return handle
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "submitted": self.submitted,
+                "deduplicated": self.deduplicated,
+                "completed": self.completed,
+                "skipped": self.skipped,
+                "queued": len(self._queued_jobs()),
+                "running": self._running,
+                "peak_running": self.peak_running
+            }
+
+    def shutdown(self):
+        """Annulla le richieste ancora in coda; quelle avviate terminano da sole"""
+        with self._lock:
+            self._closed = True
+            queued = self._queued_jobs()
+            self._queue.clear()
+        for job in queued:
+            for subscriber in job.subscribers:
+                subscriber.handle.cancel()
+
+    # --- Coda ---------------------------------------------------------
+
+    def _check_open(self):
+        if self._closed:
+            raise RuntimeError("Il broker delle richieste è stato chiuso")
+
+    def _push(self, job: _Job):
+        # Un job può comparire più volte nell'heap: vale la voce con la sua priorità attuale
+        heapq.heappush(self._queue, (job.priority, next(self._sequence), job))
+
+    def _queued_jobs(self) -> List[_Job]:
+        return [job for priority, _, job in self._queue
+                if priority == job.priority and not job.started]
+
+    def _dispatch(self):
+        """Avvia i job in testa alla coda finché ci sono slot liberi"""
+        to_start = []
+        with self._lock:
+            while self._queue:
+                priority, _, job = self._queue[0]
+                if priority != job.priority or job.started:
+                    heapq.heappop(self._queue)
+                    continue
+                if job.cancelled:
+                    heapq.heappop(self._queue)
+                    self._forget(job)
+                    self.skipped += 1
+                    continue
+                limit = self.max_concurrency
+                if priority > PRIORITY_INTERACTIVE:
+                    limit -= self.reserved_interactive
+                if self._running >= limit:
+                    break
+                heapq.heappop(self._queue)
+                job.started = True
+                self._running += 1
+                self.peak_running = max(self.peak_running, self._running)
+                to_start.append(job)
+
+        for job in to_start:
+            if job.stream:
+                self._start_stream(job)
+            else:
+                self._start_call(job)
+
+    def _forget(self, job: _Job):
+        if job.key is not None and self._inflight.get(job.key) is job:
+            del self._inflight[job.key]
+
+    def _release(self, job: _Job):
+        """Libera lo slot di un job terminato e avvia il successivo"""
+        with self._lock:
+            self._running -= 1
+            self._forget(job)
+            self.completed += 1
+        self._dispatch()
+
+    # --- Esecuzione ---------------------------------------------------
+
+    def _start_call(self, job: _Job):
+        def run():
+            with self._lock:
+                # Tutti i richiedenti hanno rinunciato mentre il job era in coda
+                skip = job.cancelled
+                if skip:
+                    self._forget(job)
+            try:
+                result = None if skip else self.service.send_message(job.messages)
+            except Exception as e:
+                self._complete(job, error=e)
+                raise
+            self._complete(job, result=result)
+            return result
+
+        self.request_engine.submit(
+            run,
+            on_result=lambda result: self._deliver(job, "on_result", result),
+            on_error=lambda error: self._deliver(job, "on_error", error)
+        )
+
+    def _complete(self, job: _Job, result: Optional[str] = None, error: Exception = None):
+        self._release(job)
+        # Il job non è più in volo: l'elenco dei richiedenti non cambia più
+        for subscriber in job.subscribers:
+            subscriber.handle.result = result
+            subscriber.handle.error = error
+            subscriber.handle._done.set()
+
+    def _deliver(self, job: _Job, callback_name: str, value: Any):
+        """Consegna il risultato condiviso a ogni richiedente non annullato (thread di Tk)"""
+        for subscriber in job.subscribers:
+            callback = getattr(subscriber, callback_name)
+            if subscriber.handle.cancelled or callback is None:
+                continue
+            try:
+                callback(value)
+            except Exception as e:
+                print(f"Errore in un callback del broker delle richieste: {e}")
+
+    def _start_stream(self, job: _Job):
+        subscriber = job.subscribers[0]
+        handle = subscriber.handle
+
+        def run():
+            try:
+                if handle.cancelled:
+                    return
+                for delta in self.service.stream_message(job.messages):
+                    if handle.cancelled:
+                        break
+                    yield delta
+            finally:
+                self._release(job)
+                handle._done.set()
+
+        def if_active(callback):
+            if callback is None:
+                return None
+            return lambda *args: None if handle.cancelled else callback(*args)
+
+        self.request_engine.submit_stream(
+            run,
+            on_item=if_active(subscriber.on_result),
+            on_done=if_active(job.on_done),
+            on_error=if_active(subscriber.on_error)
+        )
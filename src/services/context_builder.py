@@ -0,0 +1,168 @@
+"""
+Finestra di contesto della chat con budget di token
+
+I messaggi della conversazione sono tenuti in un ring buffer insieme alla
+stima dei loro token. Il payload per l'API si costruisce dal messaggio più
+recente all'indietro finché il budget non è pieno: il costo dipende dalla
+dimensione della finestra, non dalla lunghezza della conversazione. I
+messaggi rimasti fuori vengono riassunti (una riga ciascuno) in un messaggio
+di sistema di lunghezza limitata.
+"""
+
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+DEFAULT_CONTEXT_TOKENS = 3000
+DEFAULT_SUMMARY_TOKENS = 300
+DEFAULT_MAX_MESSAGES = 500
+# Token aggiunti dall'API per ogni messaggio (ruolo e separatori)
+MESSAGE_OVERHEAD_TOKENS = 4
+# Caratteri per token, stima tipica per testo in lingue europee
+CHARS_PER_TOKEN = 4
+SUMMARY_LINE_CHARS = 160
+SUMMARY_HEADER = "Riassunto della parte precedente della conversazione:"
+ROLE_LABELS = {"user": "Utente", "assistant": "Assistente"}
+
+
+def estimate_tokens(text: str) -> int:
+    """Stima veloce dei token di un testo, senza tokenizer"""
+    return -(-len(text) // CHARS_PER_TOKEN) + MESSAGE_OVERHEAD_TOKENS
+
+
+class ContextBuilder:
+    """Messaggi recenti entro il budget di token, più un riassunto dei precedenti"""
+
+    def __init__(self, max_tokens: int = DEFAULT_CONTEXT_TOKENS,
+                 summary_tokens: int = DEFAULT_SUMMARY_TOKENS,
+                 max_messages: int = DEFAULT_MAX_MESSAGES):
+        self.max_tokens = max_tokens
+        self.summary_tokens = summary_tokens
+        self.max_messages = max_messages
+        self.clear()
+
+    def clear(self):
+        # Ring buffer di (ruolo, contenuto, token)
+        self._ring: Deque[Tuple[str, str, int]] = deque()
+        # Numero progressivo del primo messaggio nel ring
+        self._first_seq = 0
+        # I messaggi con numero inferiore sono già nel riassunto
+        self._summarized_seq = 0
+        # Token dei messaggi non ancora riassunti
+        self._total_tokens = 0
+        self._summary_lines: Deque[Tuple[str, int]] = deque()
+        self._summary_total = 0
+        # Messaggi riassunti e righe di riassunto scartate per stare nel budget
+        self.summarized_count = 0
+        self.dropped_summary_lines = 0
+
+    def __len__(self) -> int:
+        return len(self._ring)
+
+    @property
+    def total_tokens(self) -> int:
+        """Token dei messaggi non ancora riassunti"""
+        return self._total_tokens
+
+    def append(self, role: str, content: str) -> int:
+        """Aggiunge un messaggio e ne restituisce il numero progressivo"""
+        tokens = estimate_tokens(content)
+        self._ring.append((role, content, tokens))
+        self._total_tokens += tokens
+        if len(self._ring) > self.max_messages:
+            # Il messaggio più vecchio esce dal ring: finisce nel riassunto
+            if self._first_seq >= self._summarized_seq:
+                self._summarize(self._ring[0])
+                self._total_tokens -= self._ring[0][2]
+                self._summarized_seq = self._first_seq + 1
+            self._ring.popleft()
+            self._first_seq += 1
+        return self._first_seq + len(self._ring) - 1
+
+    def update_last(self, content: str):
+        """Aggiorna l'ultimo messaggio (es. la risposta arrivata in streaming)"""
+        if not self._ring:
+            return
+        role, _, tokens = self._ring[-1]
+        new_tokens = estimate_tokens(content)
+        self._ring[-1] = (role, content, new_tokens)
+        if self._first_seq + len(self._ring) - 1 >= self._summarized_seq:
+            self._total_tokens += new_tokens - tokens
+
+    def build(self) -> List[Dict[str, str]]:
+        """
+        Messaggi per l'API, in ordine cronologico
+
+        Il primo è il riassunto (ruolo system) se una parte della conversazione
+        è rimasta fuori dal budget.
+        """
+        needs_summary = self._summary_lines or self._total_tokens > self.max_tokens
+        budget = self.max_tokens - (self.summary_tokens if needs_summary else 0)
+
+        selected: List[Dict[str, str]] = []
+        used = 0
+        cutoff = self._first_seq + len(self._ring)
+        for offset in range(len(self._ring) - 1, -1, -1):
+            seq = self._first_seq + offset
+            if seq < self._summarized_seq:
+                break
+            role, content, tokens = self._ring[offset]
+            if used + tokens > budget:
+                if not selected:
+                    # Il messaggio più recente va sempre inviato, al limite troncato
+                    selected.append({"role": role, "content": self._trim(content, budget)})
+                    cutoff = seq
+                break
+            used += tokens
+            cutoff = seq
+            if content:
+                selected.append({"role": role, "content": content})
+        selected.reverse()
+
+        # Quanto è rimasto fuori dalla finestra entra nel riassunto (una volta sola)
+        for seq in range(self._summarized_seq, cutoff):
+            entry = self._ring[seq - self._first_seq]
+            self._summarize(entry)
+            self._total_tokens -= entry[2]
+        self._summarized_seq = max(self._summarized_seq, cutoff)
+
+        summary = self.summary()
+        if summary:
+            selected.insert(0, {"role": "system", "content": summary})
+        return selected
+
+    def summary(self) -> Optional[str]:
+        """Testo del riassunto dei messaggi usciti dalla finestra, o None"""
+        if not self._summary_lines:
+            return None
+        lines = [SUMMARY_HEADER]
+        if self.dropped_summary_lines:
+            lines.append("…")
+        lines.extend(line for line, _ in self._summary_lines)
+        return "\n".join(lines)
+
+    def _summarize(self, entry: Tuple[str, str, int]):
+        """Aggiunge una riga di riassunto, scartando le più vecchie oltre il budget"""
+        role, content, _ = entry
+        self.summarized_count += 1
+        text = " ".join(content.split())
+        if not text:
+            return
+        if len(text) > SUMMARY_LINE_CHARS:
+            text = text[:SUMMARY_LINE_CHARS - 1] + "…"
+        line = f"- {ROLE_LABELS.get(role, role)}: {text}"
+        tokens = estimate_tokens(line)
+        self._summary_lines.append((line, tokens))
+        self._summary_total += tokens
+        header_tokens = estimate_tokens(SUMMARY_HEADER)
+        while self._summary_lines and self._summary_total + header_tokens > self.summary_tokens:
+            _, old_tokens = self._summary_lines.popleft()
+            self._summary_total -= old_tokens
+            self.dropped_summary_lines += 1
+
+    @staticmethod
+    def _trim(content: str, budget: int) -> str:
+        """Tiene la parte finale di un messaggio troppo lungo per il budget"""
+        max_chars = max(0, budget - MESSAGE_OVERHEAD_TOKENS) * CHARS_PER_TOKEN
+        if len(content) <= max_chars:
+            return content
+        return "…" + content[len(content) - max_chars + 1:]
@@ -0,0 +1,436 @@
+"""
+Archivio persistente delle conversazioni della chat
+
+Ogni sessione ha un log append-only (una riga JSON per record) e un indice
+binario di offset: per ogni messaggio (offset, lunghezza) dell'ultimo record
+che lo riguarda. Riaprire una sessione legge solo l'indice e la coda del log;
+i messaggi più vecchi si caricano a pagine con read_messages(). Un messaggio
+aggiornato (es. la risposta salvata durante lo streaming) aggiunge un nuovo
+record: quelli superati vengono eliminati dalla compattazione in background.
+
+Il catalogo delle sessioni (titolo e date) è un piccolo JSON separato; numero
+di messaggi e ultima modifica si ricavano dai file della sessione.
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from array import array
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+CATALOG_FILE = "sessions.json"
+DEFAULT_TITLE = "Nuova conversazione"
+# Byte per voce dell'indice: offset e lunghezza come uint64
+INDEX_ENTRY_BYTES = 16
+# Soglie per la compattazione automatica di un log
+COMPACT_MIN_BYTES = 256 * 1024
+COMPACT_RATIO = 2
+
+
+class _SessionState:
+    """Indice in memoria di una sessione aperta"""
+
+    def __init__(self):
+        # Coppie (offset, lunghezza) consecutive, una per messaggio
+        self.entries = array("Q")
+        self.log_size = 0
+        self.live_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self.entries) // 2
+
+    def entry(self, index: int) -> Tuple[int, int]:
+        return self.entries[2 * index], self.entries[2 * index + 1]
+
+    def set_entry(self, index: int, offset: int, length: int):
+        if index == len(self):
+            self.entries.extend((offset, length))
+        else:
+            self.live_bytes -= self.entries[2 * index + 1]
+            self.entries[2 * index] = offset
+            self.entries[2 * index + 1] = length
+        self.live_bytes += length
+
+
+class ConversationStore:
+    """Sessioni di chat su disco, con caricamento a pagine e compattazione"""
+
+    def __init__(self, data_dir: Path):
+        self.data_dir = Path(data_dir)
+        self.catalog_file = self.data_dir / CATALOG_FILE
+
+        self._lock = threading.Lock()
+        self._catalog: Optional[Dict[str, Dict]] = None
+        self._sessions: Dict[str, _SessionState] = {}
+        self._compacting = set()
+        self._compact_threads: List[threading.Thread] = []
+
+    # --- Sessioni -----------------------------------------------------
+
+    def create_session(self, title: str = DEFAULT_TITLE) -> str:
+        """Crea una sessione vuota e ne restituisce l'id"""
+        session_id = uuid.uuid4().hex
+        now = datetime.now().isoformat()
+        with self._lock:
+            catalog = self._load_catalog()
+            catalog[session_id] = {"title": title, "created_at": now}
+            self._write_catalog()
+            self._sessions[session_id] = _SessionState()
+        return session_id
+
+    def rename_session(self, session_id: str, title: str):
+        with self._lock:
+            catalog = self._load_catalog()
+            if session_id in catalog:
+                catalog[session_id]["title"] = title
+                self._write_catalog()
+
+    def delete_session(self, session_id: str):
+        """Elimina una sessione con il suo log e il suo indice"""
+        self._wait_for_compaction()
+        with self._lock:
+            catalog = self._load_catalog()
+            catalog.pop(session_id, None)
+            self._write_catalog()
+            self._sessions.pop(session_id, None)
+            for path in (self._log_path(session_id), self._index_path(session_id)):
+                if path.exists():
+                    path.unlink()
+
+    def get_session(self, session_id: str) -> Optional[Dict]:
+        with self._lock:
+            meta = self._load_catalog().get(session_id)
+            return self._session_info(session_id, meta) if meta is not None else None
+
+    def list_sessions(self, limit: Optional[int] = None) -> List[Dict]:
+        """Sessioni dalla più recente: id, title, created_at, modified_at, message_count"""
+        with self._lock:
+            sessions = [self._session_info(session_id, meta)
+                        for session_id, meta in self._load_catalog().items()]
+        sessions.sort(key=lambda session: session["modified_at"], reverse=True)
+        return sessions[:limit] if limit is not None else sessions
+
+    def search_sessions(self, query: str, limit: Optional[int] = None) -> List[Dict]:
+        """Sessioni il cui titolo contiene tutte le parole cercate (senza maiuscole)"""
+        terms = query.casefold().split()
+        matches = [session for session in self.list_sessions()
+                   if all(term in session["title"].casefold() for term in terms)]
+        return matches[:limit] if limit is not None else matches
+
+    # --- Messaggi -----------------------------------------------------
+
+    def append(self, session_id: str, role: str, content: str) -> int:
+        """Aggiunge un messaggio e ne restituisce l'indice nella sessione"""
+        with self._lock:
+            state = self._state(session_id)
+            index = len(state)
+            self._write_record(session_id, state, index, role, content)
+        return index
+
+    def update_message(self, session_id: str, index: int, content: str):
+        """Sostituisce il testo di un messaggio aggiungendo un nuovo record"""
+        with self._lock:
+            state = self._state(session_id)
+            if not 0 <= index < len(state):
+                raise IndexError(f"Messaggio {index} inesistente nella sessione {session_id}")
+            role = self._read_records(session_id, state, index, index + 1)[0]["role"]
+            self._write_record(session_id, state, index, role, content)
+        self.maybe_compact(session_id)
+
+    def message_count(self, session_id: str) -> int:
+        with self._lock:
+            return len(self._state(session_id))
+
+    def read_messages(self, session_id: str, start: int, end: int) -> List[Dict[str, str]]:
+        """Messaggi [start, end) della sessione, come {"role", "content"}"""
+        with self._lock:
+            state = self._state(session_id)
+            start, end = max(0, start), min(end, len(state))
+            if start >= end:
+                return []
+            return self._read_records(session_id, state, start, end)
+
+    def tail(self, session_id: str, count: int) -> Tuple[int, List[Dict[str, str]]]:
+        """Ultimi count messaggi: (indice del primo, messaggi)"""
+        total = self.message_count(session_id)
+        start = max(0, total - count)
+        return start, self.read_messages(session_id, start, total)
+
+    def close(self):
+        """Attende le compattazioni in corso"""
+        self._wait_for_compaction()
+        with self._lock:
+            self._sessions.clear()
+
+    # --- File ---------------------------------------------------------
+
+    def _log_path(self, session_id: str) -> Path:
+        return self.data_dir / f"{session_id}.log"
+
+    def _index_path(self, session_id: str) -> Path:
+        return self.data_dir / f"{session_id}.idx"
+
+    def _load_catalog(self) -> Dict[str, Dict]:
+        if self._catalog is None:
+            self._catalog = {}
+            if self.catalog_file.exists():
+                try:
+                    with open(self.catalog_file, 'r', encoding='utf-8') as f:
+                        self._catalog = json.load(f)
+                except (json.JSONDecodeError, OSError) as e:
+                    print(f"Errore nel caricamento del catalogo delle conversazioni: {e}")
+        return self._catalog
+
+    def _write_catalog(self):
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.catalog_file.with_suffix(".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._catalog, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.catalog_file)
+
+    def _session_info(self, session_id: str, meta: Dict) -> Dict:
+        state = self._sessions.get(session_id)
+        log_path = self._log_path(session_id)
+        if state is not None:
+            count = len(state)
+        else:
+            index_path = self._index_path(session_id)
+            count = index_path.stat().st_size // INDEX_ENTRY_BYTES if index_path.exists() else 0
+        modified_at = meta["created_at"]
+        if log_path.exists():
+            modified_at = max(modified_at, datetime.fromtimestamp(log_path.stat().st_mtime).isoformat())
+        return {
+            "id": session_id,
+            "title": meta["title"],
+            "created_at": meta["created_at"],
+            "modified_at": modified_at,
+            "message_count": count
+        }
+
+    def _state(self, session_id: str) -> _SessionState:
+        """Indice della sessione, letto dal disco (e riparato) al primo accesso"""
+        state = self._sessions.get(session_id)
+        if state is not None:
+            return state
+        if session_id not in self._load_catalog():
+            raise KeyError(f"Sessione inesistente: {session_id}")
+
+        state = _SessionState()
+        log_path = self._log_path(session_id)
+        index_path = self._index_path(session_id)
+        state.log_size = log_path.stat().st_size if log_path.exists() else 0
+        if index_path.exists():
+            with open(index_path, 'rb') as f:
+                data = f.read()
+            state.entries.frombytes(data[:len(data) // INDEX_ENTRY_BYTES * INDEX_ENTRY_BYTES])
+            state.live_bytes = sum(state.entries[1::2])
+
+        # L'ultimo record scritto è sempre referenziato: l'indice deve arrivare
+        # esattamente alla fine del log
+        end = max((state.entries[i] + state.entries[i + 1]
+                   for i in range(0, len(state.entries), 2)), default=0)
+        if end > state.log_size:
+            # Log più corto dell'indice: l'indice si ricostruisce da zero
+            state = self._rebuild_state(session_id, state.log_size)
+        elif end < state.log_size:
+            # Record scritti nel log ma non nell'indice (crash tra le due scritture)
+            self._scan_log(session_id, state, end)
+            self._write_index(session_id, state)
+        self._sessions[session_id] = state
+        return state
+
+    def _rebuild_state(self, session_id: str, log_size: int) -> _SessionState:
+        state = _SessionState()
+        state.log_size = log_size
+        self._scan_log(session_id, state, 0)
+        self._write_index(session_id, state)
+        return state
+
+    def _scan_log(self, session_id: str, state: _SessionState, start: int):
+        """Applica all'indice i record del log a partire dall'offset start"""
+        with open(self._log_path(session_id), 'rb') as f:
+            f.seek(start)
+            data = f.read()
+        state.log_size = start
+        self._apply_records(state, data)
+
+    def _write_index(self, session_id: str, state: _SessionState):
+        tmp_path = self._index_path(session_id).with_suffix(".idx.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(state.entries.tobytes())
+        os.replace(tmp_path, self._index_path(session_id))
+
+    def _write_record(self, session_id: str, state: _SessionState, index: int,
+                      role: str, content: str):
+        """Scrive un record nel log, poi la voce corrispondente dell'indice"""
+        record = {"i": index, "role": role, "content": content, "ts": time.time()}
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+
+        log_path = self._log_path(session_id)
+        with open(log_path, 'ab') as f:
+            offset = f.tell()
+            if offset != state.log_size:
+                # Riga troncata da un crash in coda al log: si riparte da una riga nuova
+                f.write(b"\n")
+                offset += 1
+            f.write(line)
+        state.log_size = offset + len(line)
+
+        entry = array("Q", (offset, len(line))).tobytes()
+        index_path = self._index_path(session_id)
+        with open(index_path, 'r+b' if index_path.exists() else 'wb') as f:
+            f.seek(index * INDEX_ENTRY_BYTES)
+            f.write(entry)
+        state.set_entry(index, offset, len(line))
+
+    def _read_records(self, session_id: str, state: _SessionState,
+                      start: int, end: int) -> List[Dict[str, str]]:
+        """Legge i messaggi [start, end) con una sola lettura del tratto di log che li contiene"""
+        entries = [state.entry(index) for index in range(start, end)]
+        first = min(offset for offset, _ in entries)
+        last = max(offset + length for offset, length in entries)
+        with open(self._log_path(session_id), 'rb') as f:
+            f.seek(first)
+            data = f.read(last - first)
+
+        messages = []
+        for offset, length in entries:
+            record = json.loads(data[offset - first:offset - first + length])
+            messages.append({"role": record["role"], "content": record["content"]})
+        return messages
+
+    # --- Compattazione ------------------------------------------------
+
+    def maybe_compact(self, session_id: str):
+        """Avvia la compattazione in background se il log contiene troppi record superati"""
+        with self._lock:
+            state = self._sessions.get(session_id)
+            if state is None or session_id in self._compacting:
+                return
+            if state.log_size < max(COMPACT_MIN_BYTES, COMPACT_RATIO * state.live_bytes):
+                return
+            self._compacting.add(session_id)
+            thread = threading.Thread(target=self.compact, args=(session_id,), daemon=True)
+            self._compact_threads.append(thread)
+            # Avviato sotto lock: _wait_for_compaction non vede mai un thread da avviare
+            thread.start()
+
+    def compact(self, session_id: str):
+        """
+        Riscrive il log con un solo record per messaggio
+
+        Copia, fsync e indice del nuovo log si preparano senza bloccare le
+        scritture; sotto lock restano solo gli ultimi record arrivati nel
+        frattempo e lo scambio dei file.
+        """
+        log_path = self._log_path(session_id)
+        tmp_path = log_path.with_suffix(".log.tmp")
+        index_tmp_path = self._index_path(session_id).with_suffix(".idx.tmp")
+        compacted = None
+        try:
+            with self._lock:
+                self._compacting.add(session_id)
+                state = self._state(session_id)
+                snapshot = array("Q", state.entries)
+                snapshot_size = state.log_size
+
+            compacted = _SessionState()
+            with open(log_path, 'rb') as src, open(tmp_path, 'wb') as dst:
+                for i in range(0, len(snapshot), 2):
+                    offset, length = snapshot[i], snapshot[i + 1]
+                    src.seek(offset)
+                    compacted.set_entry(i // 2, dst.tell(), length)
+                    dst.write(src.read(length))
+                compacted.log_size = dst.tell()
+
+                # Record arrivati durante la copia, ancora fuori dal lock
+                src.seek(snapshot_size)
+                snapshot_size += self._apply_records(compacted, src.read(), dst)
+                dst.flush()
+                os.fsync(dst.fileno())
+            with open(index_tmp_path, 'wb') as f:
+                f.write(compacted.entries.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+            with self._lock:
+                # Di solito pochi record o nessuno: niente fsync sotto lock, come
+                # per le normali scritture
+                touched = set()
+                with open(log_path, 'rb') as src, open(tmp_path, 'ab') as dst:
+                    src.seek(snapshot_size)
+                    self._apply_records(compacted, src.read(), dst, touched)
+                # Nell'indice si riscrivono solo le voci toccate dagli ultimi record
+                with open(index_tmp_path, 'r+b') as f:
+                    for index in sorted(touched):
+                        f.seek(index * INDEX_ENTRY_BYTES)
+                        f.write(array("Q", compacted.entry(index)).tobytes())
+
+                # Il log compattato è più corto del vecchio: se un crash lascia il
+                # vecchio indice, questo punta oltre la fine e viene ricostruito
+                os.replace(tmp_path, log_path)
+                os.replace(index_tmp_path, self._index_path(session_id))
+                self._sessions[session_id] = compacted
+        except Exception as e:
+            print(f"Errore nella compattazione della conversazione {session_id}: {e}")
+            compacted = None
+            for path in (tmp_path, index_tmp_path):
+                if path.exists():
+                    path.unlink()
+        finally:
+            with self._lock:
+                self._compacting.discard(session_id)
+            if compacted is not None:
+                # I record arrivati durante la compattazione possono già superare la soglia
+                self.maybe_compact(session_id)
+            with self._lock:
+                current = threading.current_thread()
+                if current in self._compact_threads:
+                    self._compact_threads.remove(current)
+
+    @staticmethod
+    def _apply_records(state: _SessionState, data: bytes, dst=None,
+                       touched: Optional[set] = None) -> int:
+        """
+        Applica all'indice i record di un tratto di log che inizia a state.log_size
+
+        Restituisce i byte delle righe complete, copiate anche in dst se indicato;
+        in touched finiscono gli indici dei messaggi aggiornati.
+        """
+        offset = start = state.log_size
+        for line in data.splitlines(keepends=True):
+            if not line.endswith(b"\n"):
+                # Riga finale troncata: la prossima scrittura riparte da una riga nuova
+                break
+            try:
+                index = json.loads(line)["i"]
+            except (ValueError, KeyError, TypeError):
+                # Record illeggibile: i record precedenti restano validi
+                offset += len(line)
+                continue
+            if index <= len(state):
+                state.set_entry(index, offset, len(line))
+                if touched is not None:
+                    touched.add(index)
+            offset += len(line)
+        state.log_size = offset
+        if dst is not None:
+            dst.write(data[:offset - start])
+        return offset - start
+
+    def _wait_for_compaction(self):
+        # Una compattazione può avviarne un'altra prima di uscire dall'elenco
+        while True:
+            with self._lock:
+                threads = list(self._compact_threads)
+            if not threads:
+                return
+            for thread in threads:
+                thread.join()
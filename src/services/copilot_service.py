@@ -2,10 +2,12 @@
 Servizio per l'integrazione con GitHub Copilot API
 """
 
-import requests
-import json
-from typing import List, Dict, Any, TYPE_CHECKING
+import time
+from typing import List, Dict, Any, Iterator, Optional, TYPE_CHECKING
 import os
+from src.services.providers import HTTPProvider, MockProvider, ProviderError, ProviderRegistry
+from src.services.resilience import CircuitBreaker, RetryPolicy
+from src.services.response_cache import get_shared_cache, make_cache_key
 
 if TYPE_CHECKING:
     from src.configs.settings import Settings
@@ -25,6 +27,51 @@ class CopilotService:
             "Content-Type": "application/json",
             "Accept": "application/vnd.github.v3+json"
         }
+        
+        # Endpoint compatibile OpenAI (sovrascrivibile, es. per il server mock locale)
+        self.openai_base_url = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1").rstrip("/")
+        
+        network_config = settings.get("network", {})
+        resilience_config = settings.get("resilience", {})
+        provider_config = settings.get("providers", {})
+        model_config = settings.get("model", {})
+        self.model = model_config.get("name", "gpt-3.5-turbo")
+        
+        # Backend dei modelli: API hosted, server locali e risposte mock come ultima risorsa
+        self.providers = ProviderRegistry(
+            hedge=provider_config.get("hedge", True),
+            hedge_percentile=provider_config.get("hedge_percentile", 95)
+        )
+        # Il provider hosted esiste sempre: retry_policy, breaker e timeout puntano a lui
+        self.hosted = self._create_http_provider(
+            "hosted", self.openai_base_url, os.getenv("OPENAI_API_KEY", ""), "hosted",
+            None, network_config, resilience_config, provider_config
+        )
+        self.hosted.breaker.on_transition.append(self._on_breaker_transition)
+        if self.hosted.api_key:
+            self.providers.register(self.hosted)
+        for index, local in enumerate(provider_config.get("local", [])):
+            try:
+                self.providers.register(self._create_http_provider(
+                    local.get("name", f"local-{index + 1}"), local["base_url"],
+                    local.get("api_key", ""), "local", local.get("model"),
+                    network_config, resilience_config, provider_config
+                ))
+            except Exception as e:
+                print(f"Provider locale non valido nelle impostazioni: {e}")
+        self.providers.register(MockProvider(self._mock_response))
+        self.last_provider: Optional[str] = None
+        
+        # Parametri del modello
+        self.temperature = model_config.get("temperature", 0.7)
+        self.max_tokens = model_config.get("max_tokens", 1000)
+        
+        # Cache opzionale delle risposte, condivisa tra i pannelli
+        self.cache_config = settings.get("cache", {})
+        self.cache = get_shared_cache(self.cache_config)
+        
+        # Latenza del primo token dell'ultimo streaming, in secondi
+        self.last_time_to_first_token: Optional[float] = None
     
     def send_message(self, messages: List[Dict[str, str]]) -> str:
         """
@@ -36,47 +83,168 @@ class CopilotService:
         Returns:
             Risposta del modello
         """
-        if not self.api_key:
-            return "⚠️ Errore: API key di GitHub Copilot non configurata. Vai nelle impostazioni per configurarla."
+        if not self.is_configured():
+            return ("⚠️ Errore: nessun modello configurato. Imposta l'API key nelle impostazioni, "
+                    "OPENAI_API_KEY o un server locale in providers.local.")
+        
+        cache_key = self._cache_key(messages)
+        if cache_key:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
         
         try:
             # Per ora, dato che GitHub Copilot non ha un'API pubblica per chat,
-            # usiamo OpenAI come fallback (se disponibile)
-            return self._send_to_openai_fallback(messages)
+            # la richiesta va ai provider compatibili OpenAI configurati
+            provider, content = self.providers.complete(messages, self._request_params())
+            self.last_provider = provider.name
+            
+            # Solo le risposte reali finiscono in cache, mai quelle mock
+            if cache_key and provider.kind != "mock":
+                self.cache.put(cache_key, content)
+            return content
             
         except Exception as e:
             return f"❌ Errore nella comunicazione con l'API: {str(e)}"
     
-    def _send_to_openai_fallback(self, messages: List[Dict[str, str]]) -> str:
+    def is_configured(self) -> bool:
+        """
+        True se c'è almeno un backend a cui inviare le richieste
+        
+        Basta un provider reale (API hosted o server locale); con la sola API
+        key di GitHub Copilot rispondono i mock.
+        """
+        return self.providers.has_backends() or bool(self.api_key)
+    
+    def _cache_key(self, messages: List[Dict[str, str]]) -> Optional[str]:
+        """
+        Chiave di cache per la richiesta, o None se non va messa in cache
+        
+        Con temperature > 0 le risposte non sono deterministiche: vengono
+        messe in cache solo se l'utente lo consente esplicitamente.
         """
-        Fallback usando OpenAI API (se configurata)
+        if self.cache is None:
+            return None
+        if self.temperature > 0 and not self.cache_config.get("allow_nondeterministic", False):
+            return None
+        return make_cache_key(self.model, messages, self.temperature, self.max_tokens)
+    
+    def _request_params(self) -> Dict[str, Any]:
+        return {"model": self.model, "temperature": self.temperature, "max_tokens": self.max_tokens}
+    
+    def stream_message(self, messages: List[Dict[str, str]]) -> Iterator[str]:
+        """
+        Invia un messaggio e restituisce la risposta un delta alla volta
+        
+        Args:
+            messages: Lista di messaggi nel formato [{"role": "user", "content": "..."}]
+        
+        Yields:
+            Frammenti di testo della risposta, nell'ordine di arrivo
         """
-        openai_key = os.getenv("OPENAI_API_KEY")
-        if not openai_key:
-            return self._mock_response(messages)
+        start = time.perf_counter()
+        self.last_time_to_first_token = None
         
+        configured = self.is_configured()
+        cache_key = self._cache_key(messages) if configured else None
+        cached = self.cache.get(cache_key) if cache_key else None
+        
+        if not configured:
+            deltas = iter([self.send_message(messages)])
+        elif cached is not None:
+            deltas = iter([cached])
+        else:
+            deltas = self._stream_from_providers(messages, cache_key)
+        
+        for delta in deltas:
+            if self.last_time_to_first_token is None:
+                self.last_time_to_first_token = time.perf_counter() - start
+            yield delta
+    
+    def _stream_from_providers(self, messages: List[Dict[str, str]],
+                               cache_key: str = None) -> Iterator[str]:
+        """
+        Streaming dal provider più rapido, con le risposte mock come ultima risorsa
+        """
+        provider, deltas = self.providers.stream(messages, self._request_params())
+        self.last_provider = provider.name
+        
+        received = []
         try:
-            url = "https://api.openai.com/v1/chat/completions"
-            headers = {
-                "Authorization": f"Bearer {openai_key}",
-                "Content-Type": "application/json"
-            }
-            
-            data = {
-                "model": "gpt-3.5-turbo",
-                "messages": messages,
-                "max_tokens": 1000,
-                "temperature": 0.7
-            }
-            
-            response = requests.post(url, headers=headers, json=data, timeout=30)
-            response.raise_for_status()
-            
-            result = response.json()
-            return result["choices"][0]["message"]["content"]
-            
+            for delta in deltas:
+                received.append(delta)
+                yield delta
         except Exception as e:
-            return self._mock_response(messages)
+            # Il testo già ricevuto resta al chiamante, ma la risposta non è completa:
+            # l'errore risale fino a on_error invece di chiudere lo stream come finito
+            raise ProviderError([(provider.name, e)]) from e
+        finally:
+            deltas.close()
+        
+        # In cache solo gli stream reali arrivati fino in fondo
+        if cache_key and received and provider.kind != "mock":
+            self.cache.put(cache_key, "".join(received))
+    
+    @property
+    def retry_policy(self) -> RetryPolicy:
+        """Politica di retry del provider hosted"""
+        return self.hosted.retry_policy
+    
+    @retry_policy.setter
+    def retry_policy(self, policy: RetryPolicy):
+        self.hosted.retry_policy = policy
+    
+    @property
+    def breaker(self) -> CircuitBreaker:
+        """Circuit breaker del provider hosted"""
+        return self.hosted.breaker
+    
+    @breaker.setter
+    def breaker(self, breaker: CircuitBreaker):
+        self.hosted.breaker = breaker
+    
+    @property
+    def timeout(self):
+        """Timeout (connessione, lettura) del provider hosted"""
+        return self.hosted.timeout
+    
+    @timeout.setter
+    def timeout(self, timeout):
+        self.hosted.timeout = timeout
+    
+    def _create_http_provider(self, name: str, base_url: str, api_key: str, kind: str,
+                              model: Optional[str], network_config: Dict, resilience_config: Dict,
+                              provider_config: Dict) -> HTTPProvider:
+        """
+        Provider HTTP con pool, timeout, retry e circuit breaker propri
+        """
+        return HTTPProvider(
+            name, base_url, api_key=api_key, kind=kind, model=model,
+            # Timeout separati: connessione breve, lettura lunga quanto una risposta
+            timeout=(network_config.get("connect_timeout", 3.05),
+                     network_config.get("read_timeout", 30)),
+            # Retry sui 429/5xx e circuit breaker: un upstream lento o giù non blocca la chat
+            retry_policy=RetryPolicy(
+                max_attempts=resilience_config.get("max_attempts", 3),
+                base_delay=resilience_config.get("base_delay", 0.5),
+                max_delay=resilience_config.get("max_delay", 8.0),
+                max_retry_after=resilience_config.get("max_retry_after", 30.0)
+            ),
+            breaker=CircuitBreaker(
+                failure_threshold=resilience_config.get("failure_threshold", 5),
+                reset_timeout=resilience_config.get("reset_timeout", 30.0)
+            ),
+            pool_connections=network_config.get("pool_connections", 4),
+            pool_maxsize=network_config.get("pool_maxsize", 10),
+            latency_window=provider_config.get("latency_window", 50)
+        )
+    
+    def _on_breaker_transition(self, previous: str, state: str):
+        """Segnala i cambi di stato del circuito verso l'API"""
+        if state == "open":
+            print(f"⚡ API non raggiungibile: risposte locali per {self.breaker.reset_timeout:.0f} s")
+        elif state == "closed" and previous != "closed":
+            print("✅ API di nuovo raggiungibile")
     
     def _mock_response(self, messages: List[Dict[str, str]]) -> str:
         """
@@ -111,9 +279,9 @@ class CopilotService:
     
     def get_models(self) -> List[str]:
         """
-        Ottiene la lista dei modelli disponibili
+        Ottiene la lista dei modelli disponibili dai provider configurati
         """
-        return [
+        return self.providers.list_models() or [
             "github-copilot-chat",
             "gpt-3.5-turbo",
             "gpt-4"
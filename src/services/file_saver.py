@@ -0,0 +1,86 @@
+"""
+Salvataggio dei file a blocchi, in un thread di scrittura dedicato
+
+Il contenuto viene scritto in un file temporaneo accanto alla destinazione,
+forzato su disco con fsync e poi sostituito in modo atomico con os.replace:
+un salvataggio interrotto lascia sempre intatto il file precedente.
+"""
+
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import BinaryIO, Callable, Iterable, Optional, Union
+
+ENCODING = "utf-8"
+TMP_SUFFIX = ".tmp"
+
+
+def temp_path(path: str) -> str:
+    return path + TMP_SUFFIX
+
+
+def _fsync_dir(path: str):
+    """Rende persistente anche la rinomina (solo dove le directory si possono aprire)"""
+    if os.name == "nt":
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def write_atomic(path: str, write: Callable[[BinaryIO], None], replace: bool = True) -> str:
+    """
+    Scrive un file tramite la funzione write e lo sostituisce in modo atomico
+
+    Args:
+        path: File di destinazione
+        write: Riceve il file temporaneo aperto in binario
+        replace: Se False il file temporaneo resta da rinominare al chiamante
+
+    Returns:
+        Il percorso del file temporaneo
+    """
+    tmp_name = temp_path(path)
+    try:
+        with open(tmp_name, 'wb') as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        if replace:
+            os.replace(tmp_name, path)
+            _fsync_dir(path)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.remove(tmp_name)
+        raise
+    return tmp_name
+
+
+def write_chunks(out: BinaryIO, chunks: Iterable[Union[str, bytes]]):
+    """Scrive i blocchi man mano che arrivano, codificando quelli testuali"""
+    for chunk in chunks:
+        out.write(chunk.encode(ENCODING) if isinstance(chunk, str) else chunk)
+
+
+class BackgroundSaver:
+    """Un solo thread di scrittura: i salvataggi vengono eseguiti in ordine"""
+
+    def __init__(self):
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def submit(self, path: str, write: Callable[[BinaryIO], None], replace: bool = True) -> Future:
+        """Come write_atomic(), ma nel thread di scrittura: restituisce un Future"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="file-saver")
+        return self._executor.submit(write_atomic, path, write, replace)
+
+    def save_chunks(self, path: str, chunks: Iterable[Union[str, bytes]]) -> Future:
+        """Salva i blocchi in ordine, senza unirli in un'unica stringa"""
+        return self.submit(path, lambda out: write_chunks(out, chunks))
+
+    def shutdown(self, wait: bool = True):
+        """Attende (o abbandona) i salvataggi in corso e ferma il thread"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
@@ -0,0 +1,55 @@
+"""
+Sessioni HTTP condivise con pool di connessioni keep-alive
+"""
+
+import threading
+from typing import Dict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_POOL_CONNECTIONS = 4
+DEFAULT_POOL_MAXSIZE = 10
+
+_sessions: Dict[str, requests.Session] = {}
+_lock = threading.Lock()
+
+
+def create_session(pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+                   pool_maxsize: int = DEFAULT_POOL_MAXSIZE) -> requests.Session:
+    """Crea una sessione con un HTTPAdapter dimensionato"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["Connection"] = "keep-alive"
+    return session
+
+
+def get_session(name: str = "default", pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+                pool_maxsize: int = DEFAULT_POOL_MAXSIZE) -> requests.Session:
+    """
+    Restituisce la sessione condivisa con questo nome, creandola se necessario
+
+    La dimensione del pool conta solo alla prima creazione: le chiamate
+    successive riusano la sessione (e le sue connessioni) già esistente.
+    """
+    with _lock:
+        session = _sessions.get(name)
+        if session is None:
+            session = create_session(pool_connections, pool_maxsize)
+            _sessions[name] = session
+        return session
+
+
+def close_sessions():
+    """Chiude tutte le sessioni condivise e le relative connessioni"""
+    with _lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+
+    for session in sessions:
+        try:
+            session.close()
+        except Exception as e:
+            print(f"Errore nella chiusura della sessione HTTP: {e}")
@@ -0,0 +1,217 @@
+"""
+Server HTTP locale che simula l'endpoint OpenAI chat completions
+
+Utile per testare lo streaming SSE e il resto del client senza rete:
+
+    python -m src.services.mock_server --port 8765
+
+e poi OPENAI_BASE_URL=http://127.0.0.1:8765/v1 con una OPENAI_API_KEY qualsiasi.
+"""
+
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional, Tuple
+
+DEFAULT_REPLY = (
+    "Questa è una risposta del server mock locale. "
+    "Ogni parola viene inviata come delta SSE separato."
+)
+DEFAULT_MODEL = "mock-model"
+
+
+class _CompletionHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 per supportare keep-alive e transfer-encoding chunked
+    protocol_version = "HTTP/1.1"
+    # Header e corpo sono scritti separatamente: senza TCP_NODELAY Nagle
+    # e il delayed ACK aggiungono ~40 ms alle connessioni riusate
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        """Silenzia il log di default su stderr"""
+        pass
+
+    def do_GET(self):
+        server: 'MockCompletionServer' = self.server.owner
+        if not self.path.rstrip("/").endswith("/models"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+        self._send_json(200, {
+            "object": "list",
+            "data": [{"id": server.model, "object": "model", "owned_by": "mock"}]
+        })
+
+    def do_POST(self):
+        server: 'MockCompletionServer' = self.server.owner
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            body = {}
+
+        server.request_count += 1
+
+        failure = server.next_failure()
+        if failure is not None:
+            status, retry_after = failure
+            self._send_json(status, {"error": {"message": f"errore simulato {status}"}},
+                            {"Retry-After": retry_after} if retry_after is not None else None)
+            return
+
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+
+        if server.response_delay:
+            time.sleep(server.response_delay)
+
+        reply = server.reply
+        model = body.get("model") or server.model
+
+        if body.get("stream"):
+            self._send_stream(reply, model, server.token_delay, server.break_after)
+        else:
+            self._send_json(200, {
+                "id": "chatcmpl-mock",
+                "object": "chat.completion",
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": reply},
+                    "finish_reason": "stop"
+                }]
+            })
+
+    def _send_json(self, status: int, payload: dict, headers: Optional[dict] = None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, reply: str, model: str, token_delay: float,
+                     break_after: Optional[int] = None):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        # Un delta per parola, spazio incluso, come fanno i modelli reali
+        words = reply.split(" ")
+        for i, word in enumerate(words):
+            delta = word if i == len(words) - 1 else word + " "
+            event = {
+                "id": "chatcmpl-mock",
+                "object": "chat.completion.chunk",
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": delta}, "finish_reason": None}]
+            }
+            self._write_chunk(f"data: {json.dumps(event)}\n\n")
+            if break_after is not None and i + 1 >= break_after:
+                # Connessione chiusa senza [DONE] né chunk finale, come un backend caduto
+                self.close_connection = True
+                return
+            if token_delay:
+                time.sleep(token_delay)
+
+        self._write_chunk("data: [DONE]\n\n")
+        # Chunk finale vuoto: chiude il corpo mantenendo viva la connessione
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _write_chunk(self, text: str):
+        data = text.encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+
+class _QuietHTTPServer(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        # Il client ha già chiuso la connessione (es. per un timeout di lettura)
+        if isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            return
+        super().handle_error(request, client_address)
+
+
+class MockCompletionServer:
+    """Server mock compatibile con /v1/chat/completions e /v1/models, in un thread separato"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, reply: str = DEFAULT_REPLY,
+                 token_delay: float = 0.0, response_delay: float = 0.0,
+                 model: str = DEFAULT_MODEL, break_after: Optional[int] = None):
+        self.host = host
+        self.port = port
+        self.reply = reply
+        self.model = model
+        self.token_delay = token_delay
+        self.response_delay = response_delay
+        # Numero di delta dopo cui gli stream si interrompono (None: mai)
+        self.break_after = break_after
+        self.request_count = 0
+        # Errori da restituire alle prossime richieste: (stato HTTP, Retry-After)
+        self._failures: List[Tuple[int, Optional[str]]] = []
+        self._failures_lock = threading.Lock()
+
+        self._httpd: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def fail_next(self, status: int, count: int = 1, retry_after: Optional[str] = None):
+        """Le prossime count richieste ricevono lo stato indicato (es. 429 o 503)"""
+        with self._failures_lock:
+            self._failures.extend([(status, retry_after)] * count)
+
+    def next_failure(self) -> Optional[Tuple[int, Optional[str]]]:
+        with self._failures_lock:
+            return self._failures.pop(0) if self._failures else None
+
+    @property
+    def base_url(self) -> str:
+        """URL base da usare come OPENAI_BASE_URL"""
+        return f"http://{self.host}:{self.port}/v1"
+
+    def start(self) -> 'MockCompletionServer':
+        """Avvia il server in background"""
+        self._httpd = _QuietHTTPServer((self.host, self.port), _CompletionHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.owner = self
+        self.port = self._httpd.server_address[1]
+
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Ferma il server"""
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Server mock per chat completions")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--token-delay", type=float, default=0.05)
+    args = parser.parse_args()
+
+    server = MockCompletionServer(port=args.port, token_delay=args.token_delay).start()
+    print(f"🧪 Server mock in ascolto su {server.base_url}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,297 @@
+"""
+Archivio persistente delle note
+
+NotesStore usa SQLite in modalità WAL con un indice full-text FTS5 su
+titolo e contenuto. JournalNotesStore legge, senza modificarli, i formati
+precedenti (journal append-only e notes.json) per la migrazione.
+"""
+
+import json
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Numero di corpi di nota tenuti in memoria da NotesStore
+BODY_CACHE_SIZE = 32
+
+
+class JournalNotesStore:
+    """Lettore in sola lettura del journal delle note e del vecchio notes.json"""
+
+    def __init__(self, data_dir: Path):
+        self.data_dir = Path(data_dir)
+        self.journal_file = self.data_dir / "notes.journal"
+        self.legacy_file = self.data_dir / "notes.json"
+
+    def source(self) -> Optional[Path]:
+        """File da migrare: il journal se esiste, altrimenti notes.json"""
+        for path in (self.journal_file, self.legacy_file):
+            if path.exists():
+                return path
+        return None
+
+    def load(self) -> Dict[str, Dict]:
+        """Ricostruisce le note dal formato precedente"""
+        source = self.source()
+        if source is None:
+            return {}
+
+        try:
+            with open(source, 'r', encoding='utf-8', errors='replace') as f:
+                if source == self.legacy_file:
+                    return json.load(f)
+                return self._replay_lines(f)
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"Errore nella lettura di {source.name}: {e}")
+            return {}
+
+    @staticmethod
+    def _replay_lines(lines) -> Dict[str, Dict]:
+        """Applica i record in ordine; le righe troncate da un crash vengono ignorate"""
+        notes: Dict[str, Dict] = {}
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # Scrittura interrotta da un crash: i record precedenti restano validi
+                continue
+
+            if record.get("op") == "put":
+                note = record["note"]
+                notes[note["id"]] = note
+            elif record.get("op") == "delete":
+                notes.pop(record.get("id"), None)
+        return notes
+
+
+class NotesStore:
+    """Note su SQLite (WAL), indicizzate per id e cercabili con FTS5"""
+
+    def __init__(self, data_dir: Path, body_cache_size: int = BODY_CACHE_SIZE):
+        self.data_dir = Path(data_dir)
+        self.db_file = self.data_dir / "notes.db"
+        self.fts_enabled = False
+
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+        # LRU delle note complete caricate su richiesta
+        self.body_cache_size = body_cache_size
+        self._bodies: "OrderedDict[str, Dict]" = OrderedDict()
+
+    def open(self):
+        """Apre il database, crea lo schema e migra i formati precedenti"""
+        if self._conn is not None:
+            return
+
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.db_file, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+        self._migrate()
+
+    def _create_schema(self):
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS notes (
+                    id TEXT PRIMARY KEY,
+                    title TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    created_at TEXT,
+                    modified_at TEXT,
+                    size INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+            columns = [row["name"] for row in self._conn.execute("PRAGMA table_info(notes)")]
+            if "size" not in columns:
+                self._conn.execute("ALTER TABLE notes ADD COLUMN size INTEGER NOT NULL DEFAULT 0")
+                self._conn.execute("UPDATE notes SET size = length(content)")
+
+            # Indice coprente: l'elenco dei metadati non legge mai i contenuti
+            self._conn.execute("""
+                CREATE INDEX IF NOT EXISTS notes_meta_idx
+                ON notes (created_at, id, title, modified_at, size)
+            """)
+
+        try:
+            with self._conn:
+                # Tabella FTS "external content": l'indice segue notes tramite trigger
+                self._conn.execute("""
+                    CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5(
+                        title, content, content='notes', content_rowid='rowid'
+                    )
+                """)
+                self._conn.executescript("""
+                    CREATE TRIGGER IF NOT EXISTS notes_ai AFTER INSERT ON notes BEGIN
+                        INSERT INTO notes_fts(rowid, title, content)
+                        VALUES (new.rowid, new.title, new.content);
+                    END;
+                    CREATE TRIGGER IF NOT EXISTS notes_ad AFTER DELETE ON notes BEGIN
+                        INSERT INTO notes_fts(notes_fts, rowid, title, content)
+                        VALUES ('delete', old.rowid, old.title, old.content);
+                    END;
+                    CREATE TRIGGER IF NOT EXISTS notes_au AFTER UPDATE ON notes BEGIN
+                        INSERT INTO notes_fts(notes_fts, rowid, title, content)
+                        VALUES ('delete', old.rowid, old.title, old.content);
+                        INSERT INTO notes_fts(rowid, title, content)
+                        VALUES (new.rowid, new.title, new.content);
+                    END;
+                """)
+            self.fts_enabled = True
+        except sqlite3.OperationalError as e:
+            # SQLite compilato senza FTS5: la ricerca ripiega su LIKE
+            print(f"FTS5 non disponibile, ricerca semplificata: {e}")
+
+    def _migrate(self):
+        """Importa una sola volta il journal o il vecchio notes.json"""
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'migrated'").fetchone()
+        if row is not None:
+            return
+
+        journal = JournalNotesStore(self.data_dir)
+        source = journal.source()
+        notes = journal.load()
+
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO notes (id, title, content, created_at, modified_at, size) "
+                "VALUES (:id, :title, :content, :created_at, :modified_at, :size)",
+                [self._row_params(note) for note in notes.values()]
+            )
+            self._conn.execute("INSERT INTO meta (key, value) VALUES ('migrated', ?)",
+                               (source.name if source else "",))
+
+        if notes:
+            print(f"Migrate {len(notes)} note da {source.name} al database SQLite")
+
+    @staticmethod
+    def _row_params(note: Dict) -> Dict:
+        return {
+            "id": note["id"],
+            "title": note.get("title", ""),
+            "content": note.get("content", ""),
+            "created_at": note.get("created_at"),
+            "modified_at": note.get("modified_at"),
+            "size": len(note.get("content", ""))
+        }
+
+    def load(self) -> Dict[str, Dict]:
+        """Restituisce tutte le note complete, nell'ordine di creazione"""
+        self.open()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, title, content, created_at, modified_at FROM notes "
+                "ORDER BY created_at, rowid"
+            ).fetchall()
+        return {row["id"]: dict(row) for row in rows}
+
+    def list_meta(self) -> Dict[str, Dict]:
+        """
+        Indice compatto delle note (id, title, modified_at, size)
+
+        Letto solo dall'indice coprente: il costo non dipende dalla
+        lunghezza dei contenuti.
+        """
+        self.open()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, title, modified_at, size FROM notes ORDER BY created_at"
+            ).fetchall()
+        return {row["id"]: dict(row) for row in rows}
+
+    def get(self, note_id: str) -> Optional[Dict]:
+        """Restituisce una nota completa, dalla LRU o dal database"""
+        self.open()
+        with self._lock:
+            note = self._bodies.get(note_id)
+            if note is not None:
+                self._bodies.move_to_end(note_id)
+                return dict(note)
+
+            row = self._conn.execute(
+                "SELECT id, title, content, created_at, modified_at FROM notes WHERE id = ?",
+                (note_id,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            note = dict(row)
+            self._cache_body(note)
+            return dict(note)
+
+    def _cache_body(self, note: Dict):
+        self._bodies[note["id"]] = note
+        self._bodies.move_to_end(note["id"])
+        while len(self._bodies) > self.body_cache_size:
+            self._bodies.popitem(last=False)
+
+    def put(self, note: Dict):
+        """Inserisce o aggiorna una nota"""
+        self.open()
+        with self._lock, self._conn:
+            self._conn.execute("""
+                INSERT INTO notes (id, title, content, created_at, modified_at, size)
+                VALUES (:id, :title, :content, :created_at, :modified_at, :size)
+                ON CONFLICT(id) DO UPDATE SET
+                    title = excluded.title,
+                    content = excluded.content,
+                    modified_at = excluded.modified_at,
+                    size = excluded.size
+            """, self._row_params(note))
+            if note["id"] in self._bodies:
+                self._cache_body(dict(self._bodies[note["id"]], **note))
+
+    def delete(self, note_id: str):
+        """Elimina una nota"""
+        self.open()
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM notes WHERE id = ?", (note_id,))
+            self._bodies.pop(note_id, None)
+
+    def search(self, query: str, limit: int = 50) -> List[Dict]:
+        """
+        Cerca nelle note, risultati ordinati per rilevanza (bm25)
+
+        Returns:
+            Lista di {"id", "title", "snippet"}
+        """
+        terms = re.findall(r"\w+", query, flags=re.UNICODE)
+        if not terms:
+            return []
+
+        self.open()
+        with self._lock:
+            if self.fts_enabled:
+                # Ogni termine tra virgolette (niente sintassi FTS dall'utente),
+                # l'ultimo come prefisso per la ricerca mentre si digita
+                match = " ".join(f'"{term}"' for term in terms) + "*"
+                rows = self._conn.execute("""
+                    SELECT notes.id AS id, notes.title AS title,
+                           snippet(notes_fts, 1, '', '', '…', 12) AS snippet
+                    FROM notes_fts JOIN notes ON notes.rowid = notes_fts.rowid
+                    WHERE notes_fts MATCH ?
+                    ORDER BY bm25(notes_fts, 5.0, 1.0)
+                    LIMIT ?
+                """, (match, limit)).fetchall()
+            else:
+                pattern = f"%{' '.join(terms)}%"
+                rows = self._conn.execute("""
+                    SELECT id, title, substr(content, 1, 80) AS snippet FROM notes
+                    WHERE title LIKE ? OR content LIKE ?
+                    LIMIT ?
+                """, (pattern, pattern, limit)).fetchall()
+        return [dict(row) for row in rows]
+
+    def close(self):
+        """Chiude il database"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,434 @@
+"""
+Provider dei modelli e instradamento in base alla latenza
+
+Ogni backend (API hosted, server locale compatibile OpenAI, mock) è un
+Provider con il proprio pool di connessioni, il proprio circuit breaker e le
+latenze recenti. ProviderRegistry sceglie per ogni richiesta il backend sano
+con il p50 migliore e, se non risponde entro il percentile configurato delle
+sue latenze, invia la stessa richiesta (hedging) al secondo backend: vince la
+prima risposta. Il provider mock entra in gioco solo se nessun altro risponde.
+"""
+
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from functools import partial
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+import requests
+
+from src.services.http_session import get_session
+from src.services.resilience import CircuitBreaker, RetryPolicy
+
+DEFAULT_LATENCY_WINDOW = 50
+DEFAULT_HEDGE_PERCENTILE = 95
+# Attesa minima prima di un hedge, e quella usata finché mancano misure
+HEDGE_MIN_DELAY = 0.05
+HEDGE_DEFAULT_DELAY = 2.0
+MODELS_TIMEOUT = 2.0
+
+
+class ProviderError(Exception):
+    """Nessun provider ha risposto"""
+
+    def __init__(self, errors: List[Tuple[str, Exception]]):
+        detail = "; ".join(f"{name}: {error}" for name, error in errors) or "nessun provider disponibile"
+        super().__init__(detail)
+        self.errors = errors
+
+
+class LatencyTracker:
+    """Latenze recenti (secondi) in una finestra scorrevole"""
+
+    def __init__(self, window: int = DEFAULT_LATENCY_WINDOW):
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Percentile q (0-100) con interpolazione lineare, None senza campioni"""
+        with self._lock:
+            ordered = sorted(self._samples)
+        if not ordered:
+            return None
+        position = (len(ordered) - 1) * q / 100
+        lower = int(position)
+        upper = min(lower + 1, len(ordered) - 1)
+        return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+class Provider(ABC):
+    """Backend dei modelli: invio, streaming, elenco modelli e statistiche"""
+
+    kind = "base"
+    # Usato solo quando nessun altro provider risponde
+    fallback_only = False
+
+    def __init__(self, name: str, model: Optional[str] = None,
+                 latency_window: int = DEFAULT_LATENCY_WINDOW,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.name = name
+        self.model = model
+        self.breaker = breaker or CircuitBreaker()
+        # Tempo di risposta completo per send, tempo al primo delta per stream
+        self.latency = {"send": LatencyTracker(latency_window), "stream": LatencyTracker(latency_window)}
+        self.requests = 0
+        self.wins = 0
+
+    def available(self) -> bool:
+        return self.breaker.available()
+
+    @abstractmethod
+    def send(self, messages: List[Dict[str, str]], params: Dict[str, Any]) -> str:
+        """Restituisce la risposta completa"""
+        pass
+
+    @abstractmethod
+    def stream(self, messages: List[Dict[str, str]], params: Dict[str, Any]) -> Iterator[str]:
+        """Restituisce la risposta un delta alla volta"""
+        pass
+
+    def list_models(self) -> List[str]:
+        return [self.model] if self.model else []
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "requests": self.requests,
+            "wins": self.wins,
+            "p50_send": self.latency["send"].percentile(50),
+            "p50_stream": self.latency["stream"].percentile(50),
+            "breaker": self.breaker.stats()
+        }
+
+
+class HTTPProvider(Provider):
+    """Endpoint compatibile OpenAI /chat/completions (hosted o server locale)"""
+
+    def __init__(self, name: str, base_url: str, api_key: str = "", kind: str = "hosted",
+                 model: Optional[str] = None, timeout: Tuple[float, float] = (3.05, 30),
+                 retry_policy: Optional[RetryPolicy] = None,
+                 pool_connections: int = 4, pool_maxsize: int = 10, **kwargs):
+        super().__init__(name, model, **kwargs)
+        self.kind = kind
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.timeout = timeout
+        self.retry_policy = retry_policy or RetryPolicy()
+        # Pool di connessioni separato per ogni provider
+        self.session = get_session(f"provider-{name}", pool_connections=pool_connections,
+                                   pool_maxsize=pool_maxsize)
+        self._models: Optional[List[str]] = None
+
+    def _post(self, messages: List[Dict[str, str]], params: Dict[str, Any], stream: bool = False):
+        url = f"{self.base_url}/chat/completions"
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        data = {
+            "model": self.model or params.get("model"),
+            "messages": messages,
+            "max_tokens": params.get("max_tokens"),
+            "temperature": params.get("temperature")
+        }
+        if stream:
+            data["stream"] = True
+
+        response = self.retry_policy.call(
+            lambda: self.session.post(url, headers=headers, json=data, stream=stream,
+                                      timeout=self.timeout),
+            self.breaker
+        )
+        if not response.ok:
+            response.close()
+            response.raise_for_status()
+        return response
+
+    def send(self, messages: List[Dict[str, str]], params: Dict[str, Any]) -> str:
+        response = self._post(messages, params)
+        return response.json()["choices"][0]["message"]["content"]
+
+    def stream(self, messages: List[Dict[str, str]], params: Dict[str, Any]) -> Iterator[str]:
+        with self._post(messages, params, stream=True) as response:
+            try:
+                yield from iter_sse_deltas(response)
+            except (requests.ConnectionError, requests.Timeout,
+                    requests.exceptions.ChunkedEncodingError):
+                # Stream interrotto a metà: conta come fallimento del backend
+                self.breaker.record_failure()
+                raise
+
+    def list_models(self) -> List[str]:
+        """Modelli esposti da GET /models (letti una volta), o quello configurato"""
+        if self._models is None:
+            headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+            try:
+                response = self.session.get(f"{self.base_url}/models", headers=headers,
+                                            timeout=MODELS_TIMEOUT)
+                response.raise_for_status()
+                self._models = [model["id"] for model in response.json().get("data", [])]
+            except Exception as e:
+                print(f"Elenco dei modelli non disponibile da '{self.name}': {e}")
+                return super().list_models()
+        return self._models or super().list_models()
+
+
+class MockProvider(Provider):
+    """Risposte simulate in locale, senza rete"""
+
+    kind = "mock"
+
+    def __init__(self, responder: Callable[[List[Dict[str, str]]], str], name: str = "mock",
+                 fallback_only: bool = True, delay: float = 0.0, **kwargs):
+        super().__init__(name, model="mock", **kwargs)
+        self.responder = responder
+        self.fallback_only = fallback_only
+        self.delay = delay
+
+    def available(self) -> bool:
+        return True
+
+    def send(self, messages: List[Dict[str, str]], params: Dict[str, Any]) -> str:
+        if self.delay:
+            time.sleep(self.delay)
+        return self.responder(messages)
+
+    def stream(self, messages: List[Dict[str, str]], params: Dict[str, Any]) -> Iterator[str]:
+        if self.delay:
+            time.sleep(self.delay)
+        words = self.responder(messages).split(" ")
+        for i, word in enumerate(words):
+            yield word if i == len(words) - 1 else word + " "
+
+
+def iter_sse_deltas(response) -> Iterator[str]:
+    """Estrae il testo dei delta da una risposta Server-Sent Events"""
+    # Decodifica esplicita: senza charset requests assumerebbe ISO-8859-1
+    for raw_line in response.iter_lines():
+        line = raw_line.decode("utf-8", errors="replace")
+        if not line or not line.startswith("data:"):
+            continue
+
+        payload = line[len("data:"):].strip()
+        if payload == "[DONE]":
+            break
+
+        try:
+            event = json.loads(payload)
+        except json.JSONDecodeError:
+            continue
+
+        choices = event.get("choices") or [{}]
+        content = choices[0].get("delta", {}).get("content")
+        if content:
+            yield content
+
+
+class ProviderRegistry:
+    def __init__(self, hedge: bool = True, hedge_percentile: float = DEFAULT_HEDGE_PERCENTILE):
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self._providers: Dict[str, Provider] = {}
+        self._lock = threading.Lock()
+
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+        self.fallbacks = 0
+        self.last_provider: Optional[str] = None
+
+    # --- Registro -----------------------------------------------------
+
+    def register(self, provider: Provider) -> Provider:
+        with self._lock:
+            self._providers[provider.name] = provider
+        return provider
+
+    def unregister(self, name: str):
+        with self._lock:
+            self._providers.pop(name, None)
+
+    def get(self, name: str) -> Optional[Provider]:
+        return self._providers.get(name)
+
+    def providers(self) -> List[Provider]:
+        with self._lock:
+            return list(self._providers.values())
+
+    def has_backends(self) -> bool:
+        """True se è registrato almeno un provider reale (non solo il fallback)"""
+        return any(not provider.fallback_only for provider in self.providers())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "providers": [provider.stats() for provider in self.providers()],
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "failovers": self.failovers,
+            "fallbacks": self.fallbacks
+        }
+
+    # --- Instradamento ------------------------------------------------
+
+    def ranked(self, op: str = "send") -> List[Provider]:
+        """
+        Provider sani dal p50 più basso
+
+        Quelli ancora senza misure vengono prima, così ognuno viene provato;
+        a parità resta l'ordine di registrazione.
+        """
+        candidates = [p for p in self.providers() if not p.fallback_only and p.available()]
+        return sorted(candidates, key=lambda p: p.latency[op].percentile(50) or 0.0)
+
+    def hedge_delay(self, provider: Provider, op: str) -> float:
+        """Attesa prima di coinvolgere il secondo provider"""
+        latency = provider.latency[op].percentile(self.hedge_percentile)
+        if latency is None:
+            return HEDGE_DEFAULT_DELAY
+        return max(HEDGE_MIN_DELAY, latency)
+
+    def complete(self, messages: List[Dict[str, str]], params: Dict[str, Any]) -> Tuple[Provider, str]:
+        """Risposta completa: (provider che ha risposto, testo)"""
+        return self._route("send", lambda provider: provider.send(messages, params))
+
+    def stream(self, messages: List[Dict[str, str]], params: Dict[str, Any]) -> Tuple[Provider, Iterator[str]]:
+        """
+        Risposta in streaming: (provider scelto, iteratore dei delta)
+
+        L'hedging riguarda il primo delta: continua lo stream che lo produce
+        per primo, l'altro viene chiuso.
+        """
+        def first_delta(provider):
+            deltas = provider.stream(messages, params)
+            try:
+                return next(deltas), deltas
+            except StopIteration:
+                return None, deltas
+
+        provider, (first, deltas) = self._route("stream", first_delta, on_loser=self._close_stream)
+
+        def chain():
+            try:
+                if first is not None:
+                    yield first
+                yield from deltas
+            finally:
+                deltas.close()
+
+        return provider, chain()
+
+    @staticmethod
+    def _discard(on_loser: Callable[[Any], None], future: Future):
+        """Libera il risultato di un tentativo arrivato dopo il vincitore"""
+        if future.exception() is None:
+            on_loser(future.result())
+
+    @staticmethod
+    def _close_stream(result):
+        _, deltas = result
+        deltas.close()
+
+    def _route(self, op: str, attempt: Callable[[Provider], Any],
+               on_loser: Optional[Callable[[Any], None]] = None) -> Tuple[Provider, Any]:
+        candidates = self.ranked(op)
+        try:
+            provider, result = self._race(candidates, op, attempt, on_loser)
+        except ProviderError as e:
+            fallback = next((p for p in self.providers() if p.fallback_only), None)
+            if fallback is None:
+                raise
+            if e.errors:
+                print(f"Nessun provider ha risposto, uso '{fallback.name}': {e}")
+            self.fallbacks += 1
+            provider, result = fallback, self._timed(fallback, op, attempt)
+        provider.wins += 1
+        self.last_provider = provider.name
+        return provider, result
+
+    def _race(self, candidates: List[Provider], op: str, attempt: Callable[[Provider], Any],
+              on_loser: Optional[Callable[[Any], None]]) -> Tuple[Provider, Any]:
+        """
+        Prova i candidati in ordine: un hedge se il primo tarda, poi failover sugli errori
+        """
+        remaining = list(candidates)
+        pending: Dict[Future, Provider] = {}
+        errors: List[Tuple[str, Exception]] = []
+        hedged = False
+        first_provider = remaining[0] if remaining else None
+
+        def launch():
+            provider = remaining.pop(0)
+            pending[self._launch(provider, op, attempt)] = provider
+
+        if remaining:
+            launch()
+        while pending:
+            timeout = None
+            if self.hedge and remaining and not hedged and len(pending) == 1:
+                timeout = self.hedge_delay(first_provider, op)
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                # Il primo provider è più lento del solito: la richiesta parte anche sul secondo
+                hedged = True
+                self.hedged += 1
+                launch()
+                continue
+
+            for future in done:
+                provider = pending.pop(future)
+                error = future.exception()
+                if error is None:
+                    if hedged and provider is not first_provider:
+                        self.hedge_wins += 1
+                    if on_loser is not None:
+                        for loser in pending:
+                            loser.add_done_callback(partial(self._discard, on_loser))
+                    return provider, future.result()
+                errors.append((provider.name, error))
+
+            if not pending and remaining:
+                self.failovers += 1
+                launch()
+        raise ProviderError(errors)
+
+    def _launch(self, provider: Provider, op: str, attempt: Callable[[Provider], Any]) -> Future:
+        """Esegue il tentativo in un thread daemon: un backend bloccato non trattiene l'uscita"""
+        future: Future = Future()
+
+        def run():
+            try:
+                future.set_result(self._timed(provider, op, attempt))
+            except BaseException as e:
+                future.set_exception(e)
+
+        threading.Thread(target=run, name=f"provider-{provider.name}", daemon=True).start()
+        return future
+
+    @staticmethod
+    def _timed(provider: Provider, op: str, attempt: Callable[[Provider], Any]) -> Any:
+        provider.requests += 1
+        start = time.perf_counter()
+        result = attempt(provider)
+        provider.latency[op].record(time.perf_counter() - start)
+        return result
+
+    def list_models(self) -> List[str]:
+        """Modelli di tutti i provider reali, senza duplicati"""
+        models: List[str] = []
+        for provider in self.providers():
+            if provider.fallback_only:
+                continue
+            for model in provider.list_models():
+                if model not in models:
+                    models.append(model)
+        return models
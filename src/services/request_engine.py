@@ -0,0 +1,233 @@
+"""
+Motore asyncio condiviso per le chiamate ai servizi
+
+Un unico event loop in un thread di background esegue tutte le richieste
+con concorrenza limitata. I risultati tornano al thread di Tk attraverso
+una sola coda, svuotata periodicamente con after().
+"""
+
+import asyncio
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterator, Optional, Set
+
+DEFAULT_MAX_CONCURRENCY = 4
+DEFAULT_POLL_MS = 20
+
+
+class RequestHandle:
+    """Riferimento a una richiesta in corso, permette di annullarla"""
+
+    def __init__(self):
+        self._cancelled = threading.Event()
+        self._started = False
+        self._done = threading.Event()
+        self._future = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def done(self) -> bool:
+        """True quando la richiesta è terminata (anche per annullamento)"""
+        return self._done.is_set()
+
+    def cancel(self):
+        """
+        Annulla la richiesta
+
+        Una richiesta ancora in coda non parte affatto; uno streaming si ferma
+        al delta successivo. In ogni caso nessun callback viene più eseguito.
+        """
+        self._cancelled.set()
+        if not self._started and self._future is not None:
+            self._future.cancel()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Attende la fine della richiesta (utile fuori dalla UI)"""
+        return self._done.wait(timeout)
+
+
+class RequestEngine:
+    def __init__(self, max_concurrency: int = DEFAULT_MAX_CONCURRENCY):
+        self.max_concurrency = max_concurrency
+
+        self._callbacks: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._handles: Set[RequestHandle] = set()
+        self._handles_lock = threading.Lock()
+
+        # I thread dell'executor vengono riusati tra una richiesta e l'altra
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrency,
+            thread_name_prefix="request-engine"
+        )
+        self._loop = asyncio.new_event_loop()
+        self._loop.set_default_executor(self._executor)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+        self._poll_widget = None
+        self._poll_job = None
+        self._poll_ms = DEFAULT_POLL_MS
+
+        ready = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run_loop,
+            args=(ready,),
+            name="request-engine-loop",
+            daemon=True
+        )
+        self._thread.start()
+        ready.wait()
+
+    def _run_loop(self, ready: threading.Event):
+        """Corpo del thread che ospita l'event loop"""
+        asyncio.set_event_loop(self._loop)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        ready.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            self._loop.close()
+
+    @property
+    def active_requests(self) -> int:
+        """Numero di richieste in coda o in esecuzione"""
+        with self._handles_lock:
+            return len(self._handles)
+
+    def submit(self, func: Callable[..., Any], *args,
+               on_result: Callable[[Any], None] = None,
+               on_error: Callable[[Exception], None] = None) -> RequestHandle:
+        """
+        Esegue una chiamata bloccante sul motore
+
+        Args:
+            func: Funzione da eseguire fuori dal thread della UI
+            on_result: Callback con il risultato, eseguito nel thread di Tk
+            on_error: Callback con l'eccezione, eseguito nel thread di Tk
+        """
+        handle = RequestHandle()
+        self._schedule(handle, self._run_call(handle, func, args, on_result, on_error))
+        return handle
+
+    def submit_stream(self, func: Callable[..., Iterator[Any]], *args,
+                      on_item: Callable[[Any], None] = None,
+                      on_done: Callable[[], None] = None,
+                      on_error: Callable[[Exception], None] = None) -> RequestHandle:
+        """
+        Esegue una funzione che restituisce un iteratore (es. uno streaming)
+
+        Ogni elemento prodotto viene consegnato a on_item nel thread di Tk;
+        on_done segue l'ultimo elemento se lo stream non è stato annullato.
+        """
+        handle = RequestHandle()
+        self._schedule(handle, self._run_stream(handle, func, args, on_item, on_done, on_error))
+        return handle
+
+    def _schedule(self, handle: RequestHandle, coro):
+        with self._handles_lock:
+            self._handles.add(handle)
+        handle._future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        handle._future.add_done_callback(lambda _: self._finish(handle))
+
+    def _finish(self, handle: RequestHandle):
+        with self._handles_lock:
+            self._handles.discard(handle)
+        handle._done.set()
+
+    async def _run_call(self, handle, func, args, on_result, on_error):
+        async with self._semaphore:
+            if handle.cancelled:
+                return
+            handle._started = True
+            try:
+                result = await self._loop.run_in_executor(None, func, *args)
+            except Exception as e:
+                self._post(handle, on_error, e)
+            else:
+                self._post(handle, on_result, result)
+
+    async def _run_stream(self, handle, func, args, on_item, on_done, on_error):
+        async with self._semaphore:
+            if handle.cancelled:
+                return
+            handle._started = True
+            try:
+                await self._loop.run_in_executor(None, self._drain_iterator, handle, func, args, on_item)
+            except Exception as e:
+                self._post(handle, on_error, e)
+            else:
+                self._post(handle, on_done)
+
+    def _drain_iterator(self, handle: RequestHandle, func, args, on_item):
+        """Consuma l'iteratore nel thread dell'executor, fermandosi se annullato"""
+        iterator = func(*args)
+        try:
+            for item in iterator:
+                if handle.cancelled:
+                    break
+                self._post(handle, on_item, item)
+        finally:
+            # Chiude il generatore (e la connessione HTTP sottostante)
+            close = getattr(iterator, "close", None)
+            if close:
+                close()
+
+    def _post(self, handle: RequestHandle, callback: Optional[Callable], *args):
+        if callback is not None:
+            self._callbacks.put((handle, callback, args))
+
+    def process_callbacks(self, max_items: Optional[int] = None) -> int:
+        """
+        Esegue i callback in attesa nel thread chiamante
+
+        Returns:
+            Numero di callback eseguiti
+        """
+        processed = 0
+        while max_items is None or processed < max_items:
+            try:
+                handle, callback, args = self._callbacks.get_nowait()
+            except queue.Empty:
+                break
+
+            if handle.cancelled:
+                continue
+
+            try:
+                callback(*args)
+            except Exception as e:
+                print(f"Errore in un callback del motore delle richieste: {e}")
+            processed += 1
+        return processed
+
+    def attach(self, widget, poll_ms: int = DEFAULT_POLL_MS):
+        """Consegna i callback nel thread di Tk controllando la coda con after()"""
+        self._poll_widget = widget
+        self._poll_ms = poll_ms
+        self._poll()
+
+    def _poll(self):
+        self.process_callbacks()
+        if self._poll_widget is not None:
+            self._poll_job = self._poll_widget.after(self._poll_ms, self._poll)
+
+    def shutdown(self):
+        """Annulla le richieste in corso e ferma l'event loop"""
+        if self._poll_widget is not None and self._poll_job is not None:
+            try:
+                self._poll_widget.after_cancel(self._poll_job)
+            except Exception:
+                pass
+        self._poll_widget = None
+
+        with self._handles_lock:
+            handles = list(self._handles)
+        for handle in handles:
+            handle.cancel()
+
+        if self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=2)
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,227 @@
+"""
+Retry con backoff esponenziale e circuit breaker per le chiamate HTTP
+
+RetryPolicy ripete le richieste fallite per errori transitori (connessione,
+timeout, 429 e 5xx) con un'attesa esponenziale con jitter, rispettando
+l'header Retry-After. CircuitBreaker smette di contattare un upstream dopo
+N fallimenti consecutivi: finché è aperto le chiamate ripiegano subito sul
+fallback, e dopo reset_timeout una sola richiesta di prova decide se
+richiuderlo.
+"""
+
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+import requests
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_BASE_DELAY = 0.5
+DEFAULT_MAX_DELAY = 8.0
+# Un Retry-After più lungo di così non si aspetta: si ripiega subito
+DEFAULT_MAX_RETRY_AFTER = 30.0
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 30.0
+HISTORY_SIZE = 100
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Il circuito è aperto: la richiesta non è stata inviata"""
+
+
+class RetryableStatusError(Exception):
+    """Risposta HTTP con uno stato transitorio (429 o 5xx)"""
+
+    def __init__(self, status_code: int, retry_after: Optional[float] = None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value: Optional[str], now: Optional[float] = None) -> Optional[float]:
+    """Secondi di attesa indicati da Retry-After (secondi o data HTTP), o None"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    now = time.time() if now is None else now
+    return max(0.0, moment.timestamp() - now)
+
+
+class RetryPolicy:
+    def __init__(self, max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+                 base_delay: float = DEFAULT_BASE_DELAY,
+                 max_delay: float = DEFAULT_MAX_DELAY,
+                 max_retry_after: float = DEFAULT_MAX_RETRY_AFTER,
+                 retry_statuses=RETRY_STATUSES,
+                 sleep: Callable[[float], None] = time.sleep,
+                 rng: Optional[random.Random] = None):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self.retry_statuses = retry_statuses
+        self.sleep = sleep
+        self._rng = rng or random.Random()
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> Optional[float]:
+        """
+        Attesa prima del tentativo successivo (attempt parte da 0)
+
+        "Full jitter": un valore a caso tra 0 e il backoff esponenziale, così
+        i client non riprovano tutti nello stesso istante. Un Retry-After del
+        server ha la precedenza; None se è troppo lungo per aspettare.
+        """
+        if retry_after is not None:
+            return retry_after if retry_after <= self.max_retry_after else None
+        return self._rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def call(self, request: Callable[[], requests.Response],
+             breaker: Optional['CircuitBreaker'] = None) -> requests.Response:
+        """
+        Esegue request() con retry; restituisce la prima risposta non transitoria
+
+        Solleva CircuitOpenError se il breaker blocca la richiesta, altrimenti
+        l'ultimo errore quando i tentativi sono esauriti.
+        """
+        for attempt in range(self.max_attempts):
+            if breaker is not None and not breaker.allow_request():
+                raise CircuitOpenError("Circuito aperto: upstream temporaneamente escluso")
+            try:
+                response = request()
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error, retry_after = e, None
+            except Exception:
+                # Errore non transitorio: niente retry, ma la prova half-open va chiusa
+                if breaker is not None:
+                    breaker.record_failure()
+                raise
+            else:
+                if response.status_code not in self.retry_statuses:
+                    if breaker is not None:
+                        breaker.record_success()
+                    return response
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                error = RetryableStatusError(response.status_code, retry_after)
+                response.close()
+
+            if breaker is not None:
+                breaker.record_failure()
+            delay = self.delay(attempt, retry_after)
+            if attempt == self.max_attempts - 1 or delay is None:
+                raise error
+            self.sleep(delay)
+        raise RuntimeError("RetryPolicy senza tentativi")
+
+
+class CircuitBreaker:
+    """Circuito closed -> open -> half_open con metriche sulle transizioni"""
+
+    def __init__(self, failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+                 reset_timeout: float = DEFAULT_RESET_TIMEOUT,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        # Rientrante: i callback delle transizioni possono leggere stats()
+        self._lock = threading.RLock()
+
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+        # Metriche
+        self.transitions: Dict[str, int] = {}
+        # Ultime transizioni: (time.time(), stato precedente, nuovo stato)
+        self.history: Deque[Tuple[float, str, str]] = deque(maxlen=HISTORY_SIZE)
+        self.successes = 0
+        self.failures = 0
+        self.short_circuited = 0
+        self.on_transition: List[Callable[[str, str], None]] = []
+
+    def allow_request(self) -> bool:
+        """True se la richiesta può partire; da aperto lascia passare una sola prova"""
+        with self._lock:
+            if self.state == OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                self._transition(HALF_OPEN)
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self.short_circuited += 1
+            return False
+
+    def available(self) -> bool:
+        """
+        Come allow_request(), ma senza cambiare stato né prenotare la prova
+
+        Serve a escludere un upstream prima di scegliere a chi inviare: una
+        richiesta esclusa conta comunque come short_circuited.
+        """
+        with self._lock:
+            if self.state == OPEN:
+                allowed = self._clock() - self._opened_at >= self.reset_timeout
+            else:
+                allowed = self.state == CLOSED or not self._probe_in_flight
+            if not allowed:
+                self.short_circuited += 1
+            return allowed
+
+    def record_success(self):
+        with self._lock:
+            self.successes += 1
+            self.consecutive_failures = 0
+            self._probe_in_flight = False
+            # Da aperto il circuito si richiude solo con la prova half-open: il
+            # successo di una richiesta partita prima dell'apertura non basta
+            if self.state == HALF_OPEN:
+                self._transition(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.consecutive_failures += 1
+            self._probe_in_flight = False
+            if self.state == HALF_OPEN or (self.state == CLOSED and
+                                           self.consecutive_failures >= self.failure_threshold):
+                self._opened_at = self._clock()
+                self._transition(OPEN)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "successes": self.successes,
+                "failures": self.failures,
+                "short_circuited": self.short_circuited,
+                "transitions": dict(self.transitions)
+            }
+
+    def _transition(self, state: str):
+        previous, self.state = self.state, state
+        name = f"{previous}->{state}"
+        self.transitions[name] = self.transitions.get(name, 0) + 1
+        self.history.append((time.time(), previous, state))
+        for callback in self.on_transition:
+            try:
+                callback(previous, state)
+            except Exception as e:
+                print(f"Errore in un callback del circuit breaker: {e}")
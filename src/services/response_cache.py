@@ -0,0 +1,198 @@
+"""
+Cache delle risposte del modello con eviction LRU e scadenza TTL
+
+Un livello in memoria (LRU) e un livello opzionale su disco, un file JSON
+per chiave sotto ~/.studio_app/cache.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+DEFAULT_CACHE_DIR = Path.home() / ".studio_app" / "cache"
+
+_shared_cache: Optional['ResponseCache'] = None
+_shared_lock = threading.Lock()
+
+
+def make_cache_key(model: str, messages: List[Dict[str, str]], temperature: float,
+                   max_tokens: int) -> str:
+    """
+    Hash normalizzato di (model, messages, temperature, max_tokens)
+
+    Ruoli in minuscolo e spazi del contenuto compattati, così domande che
+    differiscono solo per spaziatura condividono la stessa voce.
+    """
+    normalized = {
+        "model": model,
+        "messages": [
+            {
+                "role": message.get("role", "").strip().lower(),
+                "content": " ".join(message.get("content", "").split())
+            }
+            for message in messages
+        ],
+        "temperature": round(float(temperature), 4),
+        "max_tokens": int(max_tokens)
+    }
+    payload = json.dumps(normalized, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 3600,
+                 disk_dir: Optional[Path] = None, max_disk_entries: int = 1024):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.max_disk_entries = max_disk_entries
+
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.evictions = 0
+
+        if self.disk_dir:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+
+    def get(self, key: str) -> Optional[str]:
+        """Restituisce la risposta in cache, o None se assente o scaduta"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                created_at, response = entry
+                if now - created_at <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return response
+                del self._entries[key]
+
+        response = self._disk_get(key, now)
+        with self._lock:
+            if response is None:
+                self.misses += 1
+                return None
+            # Promuove la voce nel livello in memoria
+            self.hits += 1
+            self.disk_hits += 1
+            self._store(key, now, response)
+            return response
+
+    def put(self, key: str, response: str):
+        """Salva una risposta in cache"""
+        now = time.time()
+        with self._lock:
+            self._store(key, now, response)
+        self._disk_put(key, now, response)
+
+    def _store(self, key: str, created_at: float, response: str):
+        self._entries[key] = (created_at, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """Svuota entrambi i livelli della cache"""
+        with self._lock:
+            self._entries.clear()
+        if self.disk_dir:
+            for path in self.disk_dir.glob("*.json"):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+    def stats(self) -> Dict[str, Any]:
+        """Contatori di hit/miss e occupazione"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "disk_hits": self.disk_hits,
+                "evictions": self.evictions,
+                "entries": len(self._entries)
+            }
+
+    # --- Livello su disco ---------------------------------------------
+
+    def _disk_path(self, key: str) -> Path:
+        return self.disk_dir / f"{key}.json"
+
+    def _disk_get(self, key: str, now: float) -> Optional[str]:
+        if not self.disk_dir:
+            return None
+
+        path = self._disk_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+        if now - entry.get("created_at", 0) > self.ttl_seconds:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+            return None
+        return entry.get("response")
+
+    def _disk_put(self, key: str, created_at: float, response: str):
+        if not self.disk_dir:
+            return
+
+        path = self._disk_path(key)
+        tmp_path = path.with_suffix(".tmp")
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"created_at": created_at, "response": response}, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+            self._prune_disk()
+        except OSError as e:
+            print(f"Errore nel salvataggio della cache su disco: {e}")
+
+    def _prune_disk(self):
+        """Rimuove i file più vecchi oltre il limite di voci su disco"""
+        files = list(self.disk_dir.glob("*.json"))
+        excess = len(files) - self.max_disk_entries
+        if excess <= 0:
+            return
+
+        files.sort(key=lambda p: p.stat().st_mtime)
+        for path in files[:excess]:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+
+def get_shared_cache(cache_config: Dict[str, Any]) -> Optional[ResponseCache]:
+    """
+    Restituisce la cache condivisa tra i servizi, o None se disabilitata
+
+    La configurazione viene letta solo alla prima creazione.
+    """
+    global _shared_cache
+
+    if not cache_config.get("enabled", False):
+        return None
+
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = ResponseCache(
+                max_entries=cache_config.get("max_entries", 256),
+                ttl_seconds=cache_config.get("ttl_seconds", 3600),
+                disk_dir=DEFAULT_CACHE_DIR if cache_config.get("disk_enabled", False) else None,
+                max_disk_entries=cache_config.get("max_disk_entries", 1024)
+            )
+        return _shared_cache
@@ -0,0 +1,383 @@
+"""
+Evidenziazione della sintassi incrementale, eseguita in background
+
+Il lexer lavora riga per riga e restituisce, oltre ai token, lo stato di
+fine riga (es. dentro una stringa tripla o un commento a blocchi). Dopo una
+modifica si rianalizzano solo le righe toccate e le successive finché lo
+stato di fine riga non torna uguale a quello precedente.
+"""
+
+import queue
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+# (inizio, fine, tag) all'interno della riga
+Token = Tuple[int, int, str]
+
+LANGUAGES = ("Python", "JavaScript", "HTML", "CSS", "JSON", "Markdown")
+ROOT = "root"
+DEFAULT_BATCH_LINES = 500
+
+TAG_COLORS = {
+    "hl_keyword": "#c678dd",
+    "hl_builtin": "#56b6c2",
+    "hl_string": "#98c379",
+    "hl_comment": "#7f848e",
+    "hl_number": "#d19a66",
+    "hl_decorator": "#e5c07b",
+    "hl_tag": "#e06c75",
+    "hl_attribute": "#d19a66",
+    "hl_property": "#61afef",
+    "hl_heading": "#e06c75",
+    "hl_emphasis": "#e5c07b",
+    "hl_code": "#98c379",
+}
+
+_PY_KEYWORDS = (
+    "False None True and as assert async await break class continue def del elif else "
+    "except finally for from global if import in is lambda nonlocal not or pass raise "
+    "return try while with yield match case"
+)
+_PY_BUILTINS = (
+    "print len range str int float list dict set tuple bool open super isinstance "
+    "enumerate zip map filter sorted min max sum abs any all type object self cls"
+)
+_JS_KEYWORDS = (
+    "break case catch class const continue debugger default delete do else export extends "
+    "finally for function if import in instanceof let new return super switch this throw "
+    "try typeof var void while with yield async await of true false null undefined"
+)
+_JS_BUILTINS = "console window document Math JSON Object Array String Number Promise Map Set"
+
+
+def _words(words: str) -> str:
+    return r"\b(?:" + "|".join(words.split()) + r")\b"
+
+
+_NUMBER = r"\b(?:0[xXoObB][\da-fA-F_]+|\d[\d_]*(?:\.[\d_]*)?(?:[eE][+-]?\d+)?j?)\b"
+_DQ_STRING = r'"(?:[^"\\]|\\.)*"?'
+_SQ_STRING = r"'(?:[^'\\]|\\.)*'?"
+
+# Per linguaggio e stato: lista di (regex, tag o None, stato successivo o None)
+_RULES: Dict[str, Dict[str, list]] = {
+    "Python": {
+        ROOT: [
+            (r"#.*", "hl_comment", None),
+            (r'[rRbBuUfF]{0,2}"""(?:[^"\\]|\\.|"(?!""))*"""', "hl_string", None),
+            (r"[rRbBuUfF]{0,2}'''(?:[^'\\]|\\.|'(?!''))*'''", "hl_string", None),
+            (r'[rRbBuUfF]{0,2}""".*', "hl_string", "py_dq3"),
+            (r"[rRbBuUfF]{0,2}'''.*", "hl_string", "py_sq3"),
+            (r"[rRbBuUfF]{0,2}" + _DQ_STRING, "hl_string", None),
+            (r"[rRbBuUfF]{0,2}" + _SQ_STRING, "hl_string", None),
+            (r"@[\w.]+", "hl_decorator", None),
+            (_words(_PY_KEYWORDS), "hl_keyword", None),
+            (_words(_PY_BUILTINS), "hl_builtin", None),
+            (_NUMBER, "hl_number", None),
+        ],
+        "py_dq3": [
+            (r'(?:[^"\\]|\\.|"(?!""))*"""', "hl_string", ROOT),
+            (r".*", "hl_string", None),
+        ],
+        "py_sq3": [
+            (r"(?:[^'\\]|\\.|'(?!''))*'''", "hl_string", ROOT),
+            (r".*", "hl_string", None),
+        ],
+    },
+    "JavaScript": {
+        ROOT: [
+            (r"//.*", "hl_comment", None),
+            (r"/\*.*?\*/", "hl_comment", None),
+            (r"/\*.*", "hl_comment", "js_comment"),
+            (r"`(?:[^`\\]|\\.)*`", "hl_string", None),
+            (r"`.*", "hl_string", "js_template"),
+            (_DQ_STRING, "hl_string", None),
+            (_SQ_STRING, "hl_string", None),
+            (_words(_JS_KEYWORDS), "hl_keyword", None),
+            (_words(_JS_BUILTINS), "hl_builtin", None),
+            (_NUMBER, "hl_number", None),
+        ],
+        "js_comment": [
+            (r".*?\*/", "hl_comment", ROOT),
+            (r".*", "hl_comment", None),
+        ],
+        "js_template": [
+            (r"(?:[^`\\]|\\.)*`", "hl_string", ROOT),
+            (r".*", "hl_string", None),
+        ],
+    },
+    "HTML": {
+        ROOT: [
+            (r"<!--.*?-->", "hl_comment", None),
+            (r"<!--.*", "hl_comment", "html_comment"),
+            (r"</?[\w:-]+", "hl_tag", "html_tag"),
+            (r"<!\w+[^>]*>", "hl_keyword", None),
+            (r"&#?\w+;", "hl_keyword", None),
+            (r"[^<&]+", None, None),
+        ],
+        "html_tag": [
+            (r"/?>", "hl_tag", ROOT),
+            (r'"[^"]*"|\'[^\']*\'', "hl_string", None),
+            (r"[\w:-]+", "hl_attribute", None),
+        ],
+        "html_comment": [
+            (r".*?-->", "hl_comment", ROOT),
+            (r".*", "hl_comment", None),
+        ],
+    },
+    "CSS": {
+        ROOT: [
+            (r"/\*.*?\*/", "hl_comment", None),
+            (r"/\*.*", "hl_comment", "css_comment"),
+            (r"@[\w-]+", "hl_keyword", None),
+            (r"!important\b", "hl_keyword", None),
+            (_DQ_STRING, "hl_string", None),
+            (_SQ_STRING, "hl_string", None),
+            (r"#[\da-fA-F]{3,8}\b", "hl_number", None),
+            (r"[\w-]+(?=\s*:(?!:))", "hl_property", None),
+            (r"[.#][\w-]+", "hl_tag", None),
+            (r"-?\d*\.?\d+(?:px|em|rem|%|vh|vw|s|ms|deg|fr)?", "hl_number", None),
+        ],
+        "css_comment": [
+            (r".*?\*/", "hl_comment", ROOT),
+            (r".*", "hl_comment", None),
+        ],
+    },
+    "JSON": {
+        ROOT: [
+            (r'"(?:[^"\\]|\\.)*"(?=\s*:)', "hl_property", None),
+            (_DQ_STRING, "hl_string", None),
+            (r"-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?", "hl_number", None),
+            (r"\b(?:true|false|null)\b", "hl_keyword", None),
+        ],
+    },
+    "Markdown": {
+        ROOT: [
+            (r"^```.*", "hl_code", "md_fence"),
+            (r"^#{1,6}\s.*", "hl_heading", None),
+            (r"^>.*", "hl_comment", None),
+            (r"^\s*(?:[-*+]|\d+\.)\s", "hl_keyword", None),
+            (r"`[^`]*`", "hl_code", None),
+            (r"\*\*[^*]+\*\*|__[^_]+__", "hl_emphasis", None),
+            (r"\*[^*\s][^*]*\*|_[^_\s][^_]*_", "hl_emphasis", None),
+            (r"\[[^\]]*\]\([^)]*\)", "hl_property", None),
+        ],
+        "md_fence": [
+            (r"^```\s*$", "hl_code", ROOT),
+            (r".*", "hl_code", None),
+        ],
+    },
+}
+
+
+def _compile(rules: list):
+    """Unisce le regole di uno stato in un'unica regex con gruppi nominati"""
+    parts = []
+    actions = {}
+    for i, (pattern, tag, next_state) in enumerate(rules):
+        name = f"r{i}"
+        parts.append(f"(?P<{name}>{pattern})")
+        actions[name] = (tag, next_state)
+    # Identificatori, spazi o un carattere qualsiasi: avanzano senza token
+    parts.append(r"(?P<skip>\w+|\s+|.)")
+    actions["skip"] = (None, None)
+    return re.compile("|".join(parts)), actions
+
+
+_COMPILED = {
+    language: {state: _compile(rules) for state, rules in states.items()}
+    for language, states in _RULES.items()
+}
+
+
+def lex_line(language: str, line: str, state: str = ROOT) -> Tuple[List[Token], str]:
+    """
+    Analizza una riga partendo dallo stato di fine della riga precedente
+
+    Returns:
+        (token della riga, stato alla fine della riga)
+    """
+    states = _COMPILED.get(language)
+    if states is None:
+        return [], ROOT
+
+    tokens: List[Token] = []
+    pos = 0
+    length = len(line)
+    while pos < length:
+        regex, actions = states.get(state, states[ROOT])
+        match = regex.match(line, pos)
+        tag, next_state = actions[match.lastgroup]
+        end = match.end()
+        if tag is not None and end > pos:
+            tokens.append((pos, end, tag))
+        if next_state is not None:
+            state = next_state
+        pos = end if end > pos else pos + 1
+    return tokens, state
+
+
+class HighlightDocument:
+    """Righe, token e stati di fine riga di un documento; non thread-safe"""
+
+    def __init__(self, language: str = "Python"):
+        self.language = language
+        self.lines: List[str] = [""]
+        self.end_states: List[str] = [ROOT]
+        # None: la riga deve ancora essere analizzata
+        self.tokens: List[Optional[List[Token]]] = [None]
+        self._pending: List[int] = [0]
+        self.lexed_lines = 0
+
+    def set_text(self, text: str):
+        self.lines = text.split("\n")
+        self.end_states = [ROOT] * len(self.lines)
+        self.tokens = [None] * len(self.lines)
+        self._pending = [0]
+
+    def set_language(self, language: str):
+        if language == self.language:
+            return
+        self.language = language
+        self.set_text("\n".join(self.lines))
+
+    def replace_lines(self, start: int, end: int, new_lines: List[str]):
+        """Sostituisce le righe [start, end) e segna da rianalizzare quelle nuove"""
+        start = max(0, min(start, len(self.lines)))
+        end = max(start, min(end, len(self.lines)))
+        if not new_lines and end - start == len(self.lines):
+            # Il documento ha sempre almeno una riga, anche se vuota
+            new_lines = [""]
+        delta = len(new_lines) - (end - start)
+
+        self.lines[start:end] = new_lines
+        self.end_states[start:end] = [ROOT] * len(new_lines)
+        self.tokens[start:end] = [None] * len(new_lines)
+
+        # Le righe in attesa dopo la modifica si spostano con il testo
+        self._pending = [line + delta if line >= end else min(line, start) for line in self._pending]
+        self._pending.append(min(start, len(self.lines) - 1))
+
+    @property
+    def pending(self) -> bool:
+        return bool(self._pending)
+
+    def relex(self, max_lines: int = DEFAULT_BATCH_LINES) -> Optional[Tuple[int, int]]:
+        """
+        Analizza al massimo max_lines righe a partire dalla prima in attesa
+
+        Returns:
+            Intervallo [prima, ultima) delle righe con token aggiornati, o None
+        """
+        if not self._pending:
+            return None
+
+        start = min(self._pending)
+        self._pending = [line for line in self._pending if line != start]
+        count = len(self.lines)
+        if start >= count:
+            return None
+
+        line = start
+        state = self.end_states[start - 1] if start > 0 else ROOT
+        while line < count:
+            if line - start >= max_lines:
+                # Batch esaurito: si riprende da qui al prossimo giro
+                self._pending.append(line)
+                break
+            old_state = self.end_states[line]
+            was_lexed = self.tokens[line] is not None
+            tokens, state = lex_line(self.language, self.lines[line], state)
+            self.tokens[line] = tokens
+            self.end_states[line] = state
+            self.lexed_lines += 1
+            line += 1
+            # Convergenza: stato invariato e riga successiva già valida
+            if (was_lexed and state == old_state and
+                    (line >= count or self.tokens[line] is not None)):
+                break
+
+        # Le righe in attesa già coperte da questo batch non servono più
+        self._pending = [p for p in self._pending if p >= line or p < start]
+        return start, line
+
+
+class BackgroundHighlighter:
+    """Esegue il lexing in un thread e segnala le righe aggiornate"""
+
+    def __init__(self, language: str = "Python", batch_lines: int = DEFAULT_BATCH_LINES):
+        self.document = HighlightDocument(language)
+        self.batch_lines = batch_lines
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._changes: "queue.SimpleQueue[Tuple[int, int]]" = queue.SimpleQueue()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="syntax-highlighter", daemon=True)
+        self._thread.start()
+
+    @property
+    def language(self) -> str:
+        return self.document.language
+
+    @property
+    def line_count(self) -> int:
+        return len(self.document.lines)
+
+    def set_text(self, text: str):
+        with self._lock:
+            self.document.set_text(text)
+        self._wakeup.set()
+
+    def set_language(self, language: str):
+        with self._lock:
+            self.document.set_language(language)
+        self._wakeup.set()
+
+    def replace_lines(self, start: int, end: int, new_lines: List[str]):
+        with self._lock:
+            self.document.replace_lines(start, end, new_lines)
+        self._wakeup.set()
+
+    def tokens_for(self, first: int, last: int) -> List[Tuple[int, Optional[List[Token]]]]:
+        """[(riga, token)] per le righe [first, last); token None se non ancora pronti"""
+        with self._lock:
+            tokens = self.document.tokens
+            last = min(last, len(tokens))
+            return [(line, tokens[line]) for line in range(max(0, first), last)]
+
+    def drain_changes(self) -> List[Tuple[int, int]]:
+        """Intervalli di righe aggiornati dall'ultima chiamata"""
+        changes = []
+        while True:
+            try:
+                changes.append(self._changes.get_nowait())
+            except queue.Empty:
+                return changes
+
+    def wait_idle(self, timeout: float = 5.0) -> bool:
+        """Attende che non ci siano righe da analizzare (utile nei test)"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._lock:
+                if not self.document.pending:
+                    return True
+            time.sleep(0.01)
+        return False
+
+    def _run(self):
+        while not self._stopped:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            while not self._stopped:
+                # Il lock viene rilasciato tra un batch e l'altro: la UI non aspetta mai a lungo
+                with self._lock:
+                    changed = self.document.relex(self.batch_lines)
+                if changed is None:
+                    break
+                self._changes.put(changed)
+
+    def stop(self):
+        self._stopped = True
+        self._wakeup.set()
+        self._thread.join(timeout=2)
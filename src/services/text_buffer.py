@@ -0,0 +1,279 @@
+"""
+Buffer di testo per file grandi, basato su mmap
+
+Il file non viene mai letto tutto in memoria: un thread di background
+costruisce l'indice degli offset di inizio riga e le righe si decodificano
+solo quando servono. Le modifiche sono tenute in una piece table a righe:
+ogni pezzo è un intervallo di righe del file originale oppure una lista di
+righe modificate.
+"""
+
+import mmap
+import threading
+from array import array
+from bisect import bisect_right
+from typing import BinaryIO, List, Optional, Tuple
+
+# Righe indicizzate in modo sincrono all'apertura, per mostrare subito l'inizio
+INITIAL_INDEX_BYTES = 1024 * 1024
+INDEX_CHUNK_BYTES = 4 * 1024 * 1024
+# Dimensione massima dei blocchi copiati dal file mappato durante il salvataggio
+WRITE_CHUNK_BYTES = 4 * 1024 * 1024
+ENCODING = "utf-8"
+
+
+class MappedTextFile:
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # mmap non accetta file vuoti
+            self._mm = b""
+        self.size = len(self._mm)
+
+        # Offset di inizio di ogni riga nel file originale
+        self._offsets = array("Q", [0])
+        self._indexed_bytes = 0
+        self.index_ready = threading.Event()
+        self._index_lock = threading.Lock()
+        self._index_thread: Optional[threading.Thread] = None
+        self._closed = False
+
+        # Piece table: ("file", prima_riga, ultima_riga_esclusa o None) | ("edit", [righe])
+        # None indica "fino alla fine dell'indice", che può ancora crescere
+        self._pieces: List[tuple] = [("file", 0, None)]
+        self.modified = False
+
+        self._index_until(min(self.size, INITIAL_INDEX_BYTES))
+
+    # --- Indice delle righe --------------------------------------------
+
+    def start_indexing(self):
+        """Completa l'indice delle righe in un thread di background"""
+        if self.index_ready.is_set() or self._index_thread is not None:
+            return
+        self._index_thread = threading.Thread(target=self._index_rest, name="text-index", daemon=True)
+        self._index_thread.start()
+
+    def _index_rest(self):
+        while not self._closed and self._indexed_bytes < self.size:
+            self._index_until(min(self.size, self._indexed_bytes + INDEX_CHUNK_BYTES))
+
+    def _index_until(self, limit: int):
+        """Aggiunge all'indice le righe che iniziano prima di limit"""
+        new_offsets = array("Q")
+        pos = self._indexed_bytes
+        mm = self._mm
+        while True:
+            pos = mm.find(b"\n", pos, limit)
+            if pos < 0:
+                break
+            pos += 1
+            new_offsets.append(pos)
+        with self._index_lock:
+            self._offsets.extend(new_offsets)
+            self._indexed_bytes = limit
+            if limit >= self.size:
+                self.index_ready.set()
+
+    def wait_indexed(self, timeout: Optional[float] = None) -> bool:
+        """Attende il completamento dell'indice"""
+        self.start_indexing()
+        return self.index_ready.wait(timeout)
+
+    def _file_line_count(self) -> int:
+        """Righe del file originale indicizzate finora"""
+        with self._index_lock:
+            if self.index_ready.is_set():
+                return len(self._offsets)
+            # L'ultima riga indicizzata potrebbe non essere ancora completa
+            return max(0, len(self._offsets) - 1)
+
+    def _line_span(self, line: int) -> Tuple[int, int]:
+        """(inizio, fine) in byte di una riga del file originale, senza '\\n'"""
+        start = self._offsets[line]
+        end = self._offsets[line + 1] - 1 if line + 1 < len(self._offsets) else self.size
+        return start, end
+
+    def _range_bytes(self, first: int, last: int) -> Tuple[int, int]:
+        """(inizio, fine) in byte delle righe originali [first, last)"""
+        start = self._offsets[first]
+        end = self._line_span(last - 1)[1]
+        return start, end
+
+    # --- Piece table ---------------------------------------------------
+
+    def _piece_length(self, piece: tuple) -> int:
+        if piece[0] == "edit":
+            return len(piece[1])
+        end = piece[2] if piece[2] is not None else self._file_line_count()
+        return max(0, end - piece[1])
+
+    @property
+    def line_count(self) -> int:
+        """Righe del documento (finora indicizzate, se l'indice non è completo)"""
+        return sum(self._piece_length(piece) for piece in self._pieces)
+
+    def get_lines(self, start: int, end: int) -> List[str]:
+        """Righe [start, end) del documento corrente"""
+        lines: List[str] = []
+        piece_start = 0
+        for piece in self._pieces:
+            length = self._piece_length(piece)
+            piece_end = piece_start + length
+            if length and piece_end > start and piece_start < end:
+                first = max(start, piece_start) - piece_start
+                last = min(end, piece_end) - piece_start
+                if piece[0] == "edit":
+                    lines.extend(piece[1][first:last])
+                else:
+                    lo, hi = self._range_bytes(piece[1] + first, piece[1] + last)
+                    text = self._mm[lo:hi].decode(ENCODING, errors="replace")
+                    lines.extend(text.split("\n"))
+            if piece_end >= end:
+                break
+            piece_start = piece_end
+        return lines
+
+    def get_text(self, start: int, end: int) -> str:
+        return "\n".join(self.get_lines(start, end))
+
+    def replace_lines(self, start: int, end: int, new_lines: List[str]):
+        """
+        Sostituisce le righe [start, end) del documento con new_lines
+
+        Non attende l'indice: le righe modificate sono già indicizzate e la
+        coda del file resta un pezzo aperto ("None") che cresce con l'indice.
+        """
+        # Con l'indice completo la coda del file ha una lunghezza definitiva
+        growing = not self.index_ready.is_set()
+        result: List[tuple] = []
+        piece_start = 0
+        inserted = False
+        for piece in self._pieces:
+            length = self._piece_length(piece)
+            piece_end = piece_start + length
+            # Parte del pezzo prima dell'intervallo sostituito
+            if piece_start < start:
+                keep = min(length, start - piece_start)
+                result.append(self._slice_piece(piece, 0, keep))
+            if not inserted and piece_end >= start:
+                result.append(("edit", list(new_lines)))
+                inserted = True
+            # Parte del pezzo dopo l'intervallo sostituito; la coda aperta resta
+            # anche se per ora è vuota, perché l'indice la allungherà
+            if piece_end > end or (growing and self._open_ended(piece)):
+                skip = max(0, end - piece_start)
+                result.append(self._slice_piece(piece, skip))
+            piece_start = piece_end
+        if not inserted:
+            result.append(("edit", list(new_lines)))
+
+        self._pieces = self._merge_pieces(result)
+        self.modified = True
+
+    def snapshot(self) -> List[tuple]:
+        """
+        Stato corrente del documento, da passare a write_to()
+
+        replace_lines() non modifica mai i pezzi esistenti ma ne crea di nuovi,
+        quindi la lista resta valida anche se il documento cambia dopo. Non
+        attende l'indice: la coda aperta del file viene risolta da write_to().
+        """
+        return self._pieces
+
+    def write_to(self, out: BinaryIO, pieces: Optional[List[tuple]] = None):
+        """
+        Scrive il documento in un file binario
+
+        Le righe non modificate vengono copiate a blocchi direttamente dal
+        file mappato, senza decodificarle; solo le righe modificate vengono
+        codificate.
+        """
+        if pieces is None:
+            pieces = self.snapshot()
+        self.wait_indexed()
+        for i, piece in enumerate(pieces):
+            if i:
+                out.write(b"\n")
+            if piece[0] == "edit":
+                out.write("\n".join(piece[1]).encode(ENCODING))
+                continue
+            end = piece[2] if piece[2] is not None else len(self._offsets)
+            lo, hi = self._range_bytes(piece[1], end)
+            for pos in range(lo, hi, WRITE_CHUNK_BYTES):
+                out.write(self._mm[pos:min(hi, pos + WRITE_CHUNK_BYTES)])
+
+    @staticmethod
+    def _open_ended(piece: tuple) -> bool:
+        return piece[0] == "file" and piece[2] is None
+
+    def _slice_piece(self, piece: tuple, first: int, last: Optional[int] = None) -> tuple:
+        """Righe [first, last) del pezzo; senza last fino alla sua fine"""
+        if piece[0] == "edit":
+            return ("edit", piece[1][first:last])
+        if last is None:
+            # Una coda aperta resta aperta: comprende le righe non ancora indicizzate
+            return ("file", piece[1] + first, piece[2])
+        return ("file", piece[1] + first, piece[1] + last)
+
+    @staticmethod
+    def _merge_pieces(pieces: List[tuple]) -> List[tuple]:
+        merged: List[tuple] = []
+        for piece in pieces:
+            if piece[0] == "edit" and not piece[1]:
+                continue
+            if piece[0] == "file" and piece[1] == piece[2]:
+                continue
+            if merged and merged[-1][0] == "edit" and piece[0] == "edit":
+                merged[-1] = ("edit", merged[-1][1] + piece[1])
+            elif merged and merged[-1][0] == "file" and piece[0] == "file" and merged[-1][2] == piece[1]:
+                merged[-1] = ("file", merged[-1][1], piece[2])
+            else:
+                merged.append(piece)
+        # Il documento ha sempre almeno una riga, anche se vuota
+        return merged or [("edit", [""])]
+
+    # --- Ricerca -------------------------------------------------------
+
+    def find(self, query: str, start_line: int = 0) -> Optional[Tuple[int, int]]:
+        """
+        Cerca query a partire da start_line, direttamente nel file mappato
+
+        Returns:
+            (riga, colonna) del primo risultato, o None
+        """
+        if not query:
+            return None
+        needle = query.encode(ENCODING)
+        piece_start = 0
+        for piece in self._pieces:
+            length = self._piece_length(piece)
+            piece_end = piece_start + length
+            if length and piece_end > start_line:
+                skip = max(0, start_line - piece_start)
+                if piece[0] == "edit":
+                    for i, line in enumerate(piece[1][skip:], start=skip):
+                        column = line.find(query)
+                        if column >= 0:
+                            return piece_start + i, column
+                else:
+                    lo, hi = self._range_bytes(piece[1] + skip, piece[1] + length)
+                    pos = self._mm.find(needle, lo, hi)
+                    if pos >= 0:
+                        line = bisect_right(self._offsets, pos) - 1
+                        prefix = self._mm[self._offsets[line]:pos].decode(ENCODING, errors="replace")
+                        return piece_start + (line - piece[1]), len(prefix)
+            piece_start = piece_end
+        return None
+
+    def close(self):
+        """Rilascia il mapping del file"""
+        self._closed = True
+        if self._index_thread is not None:
+            self._index_thread.join(timeout=2)
+        if isinstance(self._mm, mmap.mmap):
+            self._mm.close()
+        self._file.close()
@@ -0,0 +1,247 @@
+"""
+Profilazione dell'avvio (--profile-startup)
+
+Misura le fasi dell'avvio (interprete, import, impostazioni, discovery dei
+plugin, costruzione dei widget, primo disegno) e il tempo di import di ogni
+modulo tramite un finder in sys.meta_path. Il report viene scritto in JSON;
+se il tempo totale o quello degli import supera il budget il controllo
+fallisce (codice di uscita 1).
+
+Questo modulo viene importato prima di tutto il resto: deve restare leggero.
+"""
+
+import json
+import os
+import sys
+import time
+from importlib.abc import MetaPathFinder
+from typing import Any, Dict, List, Optional
+
+PROFILE_FLAG = "--profile-startup"
+# Istante di avvio del launcher (time.time()), passato al processo rilanciato nel venv
+LAUNCH_TIME_ENV = "STUDIO_LAUNCH_TIME"
+DEFAULT_TOTAL_BUDGET_MS = 3000.0
+DEFAULT_IMPORT_BUDGET_MS = 1500.0
+DEFAULT_REPORT_FILE = "startup_profile.json"
+TOP_MODULES = 15
+
+_active: Optional["StartupProfiler"] = None
+
+
+def process_start_time() -> Optional[float]:
+    """Istante di creazione del processo (time.time()), se il sistema lo espone"""
+    try:
+        with open("/proc/self/stat", 'r') as f:
+            # Il nome del processo può contenere spazi: si parte dall'ultima ')'
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime", 'r') as f:
+            uptime = float(f.read().split()[0])
+        # starttime è in tick dall'avvio del sistema
+        age = uptime - int(fields[19]) / os.sysconf("SC_CLK_TCK")
+        return time.time() - max(0.0, age)
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class _TimedLoader:
+    """Avvolge il loader di un modulo per misurarne l'esecuzione"""
+
+    def __init__(self, loader, timer: "ImportTimer"):
+        self._loader = loader
+        self._timer = timer
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        # Il modulo deve vedere il proprio loader, non questo wrapper
+        module.__loader__ = self._loader
+        if module.__spec__ is not None:
+            module.__spec__.loader = self._loader
+        self._timer.enter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._timer.exit(module.__name__)
+
+
+class ImportTimer(MetaPathFinder):
+    """Tempo di import di ogni modulo: proprio (self) e cumulativo (con i sotto-import)"""
+
+    def __init__(self):
+        self.modules: Dict[str, Dict[str, float]] = {}
+        # [inizio, tempo dei sotto-import] per ogni import in corso
+        self._stack: List[List[float]] = []
+        self._searching = set()
+
+    def install(self):
+        if self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+
+    def uninstall(self):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, fullname, path, target=None):
+        if fullname in self._searching:
+            return None
+        self._searching.add(fullname)
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                        spec.loader = _TimedLoader(spec.loader, self)
+                    return spec
+            return None
+        finally:
+            self._searching.discard(fullname)
+
+    def enter(self):
+        self._stack.append([time.perf_counter(), 0.0])
+
+    def exit(self, name: str):
+        start, children = self._stack.pop()
+        cumulative = time.perf_counter() - start
+        if self._stack:
+            self._stack[-1][1] += cumulative
+        self.modules[name] = {
+            "self_ms": (cumulative - children) * 1000,
+            "cumulative_ms": cumulative * 1000
+        }
+
+    def top(self, count: int = TOP_MODULES) -> List[Dict[str, Any]]:
+        ordered = sorted(self.modules.items(), key=lambda item: item[1]["self_ms"], reverse=True)
+        return [{"module": name, **times} for name, times in ordered[:count]]
+
+
+class StartupProfiler:
+    def __init__(self, total_budget_ms: float = DEFAULT_TOTAL_BUDGET_MS,
+                 import_budget_ms: float = DEFAULT_IMPORT_BUDGET_MS,
+                 report_file: str = DEFAULT_REPORT_FILE):
+        self.total_budget_ms = total_budget_ms
+        self.import_budget_ms = import_budget_ms
+        self.report_file = report_file
+
+        now = time.time()
+        self._started = time.perf_counter()
+        self._last = self._started
+        self.phases: Dict[str, float] = {}
+        self.notes: Dict[str, str] = {}
+
+        # Fase "interprete": dal lancio (o dalla creazione del processo) a qui
+        launch_time = os.environ.get(LAUNCH_TIME_ENV)
+        origin = float(launch_time) if launch_time else process_start_time()
+        if origin is not None and origin <= now:
+            self.phases["interpreter"] = (now - origin) * 1000
+        else:
+            self.notes["interpreter"] = "non disponibile su questo sistema"
+
+        self.imports = ImportTimer()
+        self.imports.install()
+
+    def mark(self, phase: str):
+        """Chiude una fase: il tempo trascorso dalla fase precedente"""
+        now = time.perf_counter()
+        self.phases[phase] = self.phases.get(phase, 0.0) + (now - self._last) * 1000
+        self._last = now
+
+    def skip(self, phase: str, reason: str):
+        self.notes[phase] = reason
+        self._last = time.perf_counter()
+
+    @property
+    def total_ms(self) -> float:
+        return sum(self.phases.values())
+
+    def report(self) -> Dict[str, Any]:
+        import_ms = self.phases.get("imports", 0.0)
+        failures = []
+        if self.total_ms > self.total_budget_ms:
+            failures.append(f"avvio {self.total_ms:.0f} ms > budget {self.total_budget_ms:.0f} ms")
+        if import_ms > self.import_budget_ms:
+            failures.append(f"import {import_ms:.0f} ms > budget {self.import_budget_ms:.0f} ms")
+        return {
+            "phases_ms": self.phases,
+            "total_ms": self.total_ms,
+            "notes": self.notes,
+            "budget": {"total_ms": self.total_budget_ms, "imports_ms": self.import_budget_ms},
+            "failures": failures,
+            "modules": [{"module": name, **times} for name, times in self.imports.modules.items()],
+            "python": sys.version.split()[0]
+        }
+
+    def finish(self) -> int:
+        """Scrive e stampa il report; restituisce il codice di uscita del controllo"""
+        self.imports.uninstall()
+        report = self.report()
+        try:
+            with open(self.report_file, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+        except OSError as e:
+            print(f"Errore nella scrittura del report di avvio: {e}")
+
+        print("⏱️ Profilo di avvio")
+        for phase, ms in report["phases_ms"].items():
+            print(f"  {phase:<18} {ms:9.1f} ms")
+        for phase, reason in report["notes"].items():
+            print(f"  {phase:<18} {'-':>9}    ({reason})")
+        print(f"  {'totale':<18} {report['total_ms']:9.1f} ms")
+        print("📦 Moduli più lenti da importare (tempo proprio / cumulativo):")
+        for item in self.imports.top():
+            print(f"  {item['module']:<40} {item['self_ms']:8.1f} / {item['cumulative_ms']:8.1f} ms")
+        print(f"💾 Report completo in {os.path.abspath(self.report_file)}")
+
+        if report["failures"]:
+            for failure in report["failures"]:
+                print(f"❌ Budget superato: {failure}")
+            return 1
+        print("✅ Avvio entro il budget")
+        return 0
+
+
+def parse_args(argv: List[str]) -> Dict[str, Any]:
+    """
+    Legge le opzioni del profilo dalla riga di comando
+
+    --profile-startup [--startup-budget MS] [--import-budget MS] [--startup-report FILE]
+    """
+    options = {}
+    names = {
+        "--startup-budget": ("total_budget_ms", float),
+        "--import-budget": ("import_budget_ms", float),
+        "--startup-report": ("report_file", str)
+    }
+    for i, arg in enumerate(argv):
+        key, _, value = arg.partition("=")
+        if key in names:
+            if not value and i + 1 < len(argv):
+                value = argv[i + 1]
+            name, convert = names[key]
+            options[name] = convert(value)
+    return options
+
+
+def start_from_argv(argv: Optional[List[str]] = None) -> Optional[StartupProfiler]:
+    """Attiva il profilo se la riga di comando contiene --profile-startup"""
+    global _active
+    argv = sys.argv[1:] if argv is None else argv
+    if PROFILE_FLAG not in argv or _active is not None:
+        return _active
+    _active = StartupProfiler(**parse_args(argv))
+    return _active
+
+
+def get_profiler() -> Optional[StartupProfiler]:
+    return _active
+
+
+def mark(phase: str):
+    """Chiude una fase del profilo attivo (nessun effetto se il profilo è spento)"""
+    if _active is not None:
+        _active.mark(phase)
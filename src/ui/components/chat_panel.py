@@ -3,26 +3,68 @@ Pannello chat per l'integrazione con GitHub Copilot
 """
 
 import customtkinter as ctk
+import time
 import tkinter as tk
+from pathlib import Path
 from typing import TYPE_CHECKING, List, Dict
-import asyncio
-import threading
-from src.services.copilot_service import CopilotService
+from src.services.completion_broker import PRIORITY_INTERACTIVE
+from src.services.context_builder import ContextBuilder
+from src.services.conversation_store import ConversationStore
+from src.ui.components.message_list import VirtualMessageList, MessageStore
 
 if TYPE_CHECKING:
     from src.configs.settings import Settings
     from src.ui.plugins.plugin_manager import PluginManager
+    from src.services.completion_broker import CompletionHandle
+
+# Intervallo (ms) con cui i delta in arrivo vengono disegnati nella chat
+STREAM_FLUSH_MS = 50
+# Intervallo (s) con cui la risposta parziale viene salvata su disco
+STREAM_SAVE_SECONDS = 2.0
+# Messaggi caricati alla riapertura e a ogni pagina scorrendo verso l'alto
+HISTORY_PAGE_SIZE = 50
+# Conversazioni recenti mostrate nel dropdown
+SESSION_MENU_LIMIT = 20
+SESSION_TITLE_CHARS = 40
+NEW_SESSION_LABEL = "Nuova conversazione"
 
 class ChatPanel(ctk.CTkFrame):
     def __init__(self, parent, settings: 'Settings', plugin_manager: 'PluginManager'):
         super().__init__(parent)
         self.settings = settings
         self.plugin_manager = plugin_manager
-        self.copilot_service = CopilotService(settings)
+        # Le richieste al modello passano dal broker condiviso con i plugin
+        self.broker = plugin_manager.get_completion_broker()
+        
+        # Archivio dei messaggi, creato insieme alla lista virtualizzata
+        self.messages: MessageStore = None
+        
+        # Contesto inviato all'API: messaggi recenti entro il budget di token
+        chat_config = settings.get("chat", {})
+        self.context = ContextBuilder(
+            max_tokens=chat_config.get("context_tokens", 3000),
+            summary_tokens=chat_config.get("summary_tokens", 300),
+            max_messages=chat_config.get("max_messages", 500)
+        )
         
-        self.messages: List[Dict[str, str]] = []
+        # Conversazioni salvate: la sessione nasce con il primo messaggio inviato
+        self.conversations = ConversationStore(Path.home() / ".studio_app" / "conversations")
+        self.session_id: str = None
+        # Indice (nella sessione) del primo messaggio caricato nella lista
+        self._history_start = 0
+        # Etichetta mostrata nel dropdown -> id della sessione
+        self.session_ids: Dict[str, str] = {}
+        
+        # Stato dello streaming in corso
+        self._stream_handle: 'CompletionHandle' = None
+        self._stream_index: int = None
+        self._stream_saved_index: int = None
+        self._stream_saved_at = 0.0
+        self._pending_chunks: List[str] = []
+        self._flush_job = None
         
         self.setup_ui()
+        self.load_last_session()
     
     def setup_ui(self):
         """Configura l'interfaccia del pannello chat"""
@@ -42,14 +84,23 @@ class ChatPanel(ctk.CTkFrame):
         )
         self.title_label.grid(row=0, column=0, padx=10, pady=10, sticky="w")
         
-        # Pulsante per pulire la chat
+        # Dropdown delle conversazioni salvate
+        self.session_selector = ctk.CTkOptionMenu(
+            self.header,
+            values=[NEW_SESSION_LABEL],
+            width=180,
+            command=self.on_session_selected
+        )
+        self.session_selector.grid(row=0, column=1, padx=5, pady=10)
+        
+        # Pulsante per pulire la chat (la conversazione resta salvata)
         self.clear_btn = ctk.CTkButton(
             self.header,
             text="🗑️",
             width=30,
             command=self.clear_chat
         )
-        self.clear_btn.grid(row=0, column=1, padx=10, pady=10)
+        self.clear_btn.grid(row=0, column=2, padx=10, pady=10)
         
         # Area messaggi con scrollbar
         self.chat_frame = ctk.CTkFrame(self)
@@ -57,10 +108,12 @@ class ChatPanel(ctk.CTkFrame):
         self.chat_frame.grid_columnconfigure(0, weight=1)
         self.chat_frame.grid_rowconfigure(0, weight=1)
         
-        # Scrollable frame per i messaggi
-        self.scrollable_frame = ctk.CTkScrollableFrame(self.chat_frame)
-        self.scrollable_frame.grid(row=0, column=0, sticky="nsew", padx=5, pady=5)
-        self.scrollable_frame.grid_columnconfigure(0, weight=1)
+        # Lista virtualizzata: widget solo per i messaggi visibili
+        self.message_list = VirtualMessageList(self.chat_frame)
+        self.message_list.grid(row=0, column=0, sticky="nsew", padx=5, pady=5)
+        self.messages = self.message_list.store
+        # I messaggi più vecchi si caricano quando la lista arriva in cima
+        self.message_list.on_reach_top = self.load_older_messages
         
         # Frame per l'input
         self.input_frame = ctk.CTkFrame(self)
@@ -86,41 +139,17 @@ class ChatPanel(ctk.CTkFrame):
         
         # Bind eventi
         self.input_textbox.bind("<Control-Return>", lambda e: self.send_message())
-        
-        # Messaggio di benvenuto
-        self.add_system_message("Benvenuto! Scrivi un messaggio per iniziare a chattare con GitHub Copilot.")
-    
-    def add_message(self, role: str, content: str):
-        """Aggiunge un messaggio alla chat"""
-        message_frame = ctk.CTkFrame(self.scrollable_frame)
-        message_frame.grid(sticky="ew", padx=5, pady=2)
-        message_frame.grid_columnconfigure(1, weight=1)
-        
-        # Icona del ruolo
-        icon = "🤖" if role == "assistant" else "👤" if role == "user" else "🛠️"
-        role_label = ctk.CTkLabel(
-            message_frame,
-            text=icon,
-            font=ctk.CTkFont(size=16)
-        )
-        role_label.grid(row=0, column=0, padx=(10, 5), pady=10, sticky="nw")
-        
-        # Contenuto del messaggio
-        content_label = ctk.CTkLabel(
-            message_frame,
-            text=content,
-            font=ctk.CTkFont(size=12),
-            wraplength=400,
-            justify="left",
-            anchor="w"
-        )
-        content_label.grid(row=0, column=1, padx=(0, 10), pady=10, sticky="ew")
+    
+    def add_message(self, role: str, content: str) -> int:
+        """Aggiunge un messaggio alla chat e ne restituisce l'indice"""
+        index = self.message_list.append(role, content)
+        if role in ("user", "assistant"):
+            self.context.append(role, content)
         
         # Scroll automatico verso il basso
-        self.after(100, self._scroll_to_bottom)
+        self.message_list.scroll_to_bottom()
         
-        # Salva il messaggio
-        self.messages.append({"role": role, "content": content})
+        return index
     
     def add_system_message(self, content: str):
         """Aggiunge un messaggio di sistema"""
@@ -129,7 +158,7 @@ class ChatPanel(ctk.CTkFrame):
     def send_message(self):
         """Invia un messaggio al chatbot"""
         content = self.input_textbox.get("1.0", "end-1c").strip()
-        if not content:
+        if not content or self._stream_index is not None:
             return
         
         # Pulisci l'input
@@ -137,58 +166,213 @@ class ChatPanel(ctk.CTkFrame):
         
         # Aggiungi il messaggio dell'utente
         self.add_message("user", content)
+        if self.session_id is None:
+            self._start_session(content)
+        self._persist("append", "user", content)
+        
+        # Il pulsante di invio diventa "stop" durante la generazione
+        self.send_btn.configure(text="⏹ Stop", command=self.stop_generating)
+        
+        # Prepara i messaggi per l'API: lo snapshot è preso nel thread della UI
+        api_messages = self.context.build()
         
-        # Disabilita il pulsante di invio
-        self.send_btn.configure(state="disabled", text="...")
+        # Messaggio "live" dell'assistente, riempito man mano che arrivano i delta
+        self._stream_index = self.add_message("assistant", "")
+        self._stream_saved_at = time.monotonic()
         
-        # Invia la richiesta in un thread separato
-        threading.Thread(
-            target=self._send_message_async,
-            args=(content,),
-            daemon=True
-        ).start()
+        # La chat ha la precedenza sulle richieste in background dei plugin
+        self._stream_handle = self.broker.submit_stream(
+            api_messages,
+            priority=PRIORITY_INTERACTIVE,
+            on_item=self._on_stream_delta,
+            on_done=self._finish_stream,
+            on_error=lambda e: self._finish_stream(f"Errore: {str(e)}")
+        )
     
-    def _send_message_async(self, content: str):
-        """Invia il messaggio in modo asincrono"""
-        try:
-            # Prepara i messaggi per l'API
-            api_messages = [
-                {"role": msg["role"], "content": msg["content"]}
-                for msg in self.messages
-                if msg["role"] in ["user", "assistant"]
-            ][-10:]  # Mantieni solo gli ultimi 10 messaggi
-            
-            # Chiamata all'API
-            response = self.copilot_service.send_message(api_messages)
-            
-            # Aggiungi la risposta alla UI nel thread principale
-            self.after(0, lambda: self._handle_response(response))
-            
-        except Exception as e:
-            error_msg = f"Errore: {str(e)}"
-            self.after(0, lambda: self._handle_error(error_msg))
+    def stop_generating(self):
+        """Interrompe la generazione in corso mantenendo il testo già ricevuto"""
+        if self._stream_handle is not None:
+            self._stream_handle.cancel()
+            self._finish_stream()
+    
+    def _on_stream_delta(self, delta: str):
+        """Accumula un delta; il disegno avviene al massimo ogni STREAM_FLUSH_MS"""
+        self._pending_chunks.append(delta)
+        if self._flush_job is None:
+            self._flush_job = self.after(STREAM_FLUSH_MS, self._flush_stream)
+    
+    def _flush_stream(self):
+        """Disegna in un colpo solo i delta arrivati dall'ultimo flush"""
+        self._flush_job = None
+        if not self._pending_chunks or self._stream_index is None:
+            return
+        
+        content = self.messages.content(self._stream_index) + "".join(self._pending_chunks)
+        self._pending_chunks.clear()
+        self.message_list.update_message(self._stream_index, content)
+        
+        # La risposta parziale sopravvive a un crash durante la generazione
+        if time.monotonic() - self._stream_saved_at >= STREAM_SAVE_SECONDS:
+            self._save_stream(content)
     
-    def _handle_response(self, response: str):
-        """Gestisce la risposta dall'API"""
-        self.add_message("assistant", response)
-        self.send_btn.configure(state="normal", text="Invia")
+    def _finish_stream(self, error_msg: str = None):
+        """Chiude lo streaming corrente e ripristina il pulsante di invio"""
+        if self._flush_job is not None:
+            self.after_cancel(self._flush_job)
+        self._flush_stream()
+        if self._stream_index is not None:
+            # Il contesto riceve la risposta completa, non i singoli delta
+            content = self.messages.content(self._stream_index)
+            self.context.update_last(content)
+            self._save_stream(content)
+        
+        self._stream_handle = None
+        self._stream_index = None
+        self._stream_saved_index = None
+        
+        if error_msg:
+            self._handle_error(error_msg)
+        else:
+            self.send_btn.configure(state="normal", text="Invia", command=self.send_message)
     
     def _handle_error(self, error_msg: str):
         """Gestisce gli errori"""
         self.add_system_message(error_msg)
-        self.send_btn.configure(state="normal", text="Invia")
+        self.send_btn.configure(state="normal", text="Invia", command=self.send_message)
     
-    def _scroll_to_bottom(self):
-        """Scrolla automaticamente verso il basso"""
-        try:
-            self.scrollable_frame._parent_canvas.yview_moveto(1.0)
-        except:
-            pass
+    def _save_stream(self, content: str):
+        """Salva il testo corrente della risposta in streaming"""
+        if self._stream_saved_index is not None:
+            self._persist("update_message", self._stream_saved_index, content)
+        elif content:
+            # Il record nasce con il primo testo: niente risposte vuote nell'archivio
+            self._stream_saved_index = self._persist("append", "assistant", content)
+        self._stream_saved_at = time.monotonic()
     
     def clear_chat(self):
-        """Pulisce la chat"""
-        for widget in self.scrollable_frame.winfo_children():
-            widget.destroy()
+        """Pulisce la chat; la conversazione resta salvata e il prossimo messaggio ne apre una nuova"""
+        self.stop_generating()
         
-        self.messages.clear()
+        self.message_list.clear()
+        self.context.clear()
+        self.session_id = None
+        self._history_start = 0
+        self.update_session_selector()
         self.add_system_message("Chat pulita. Scrivi un messaggio per ricominciare.")
+    
+    # --- Conversazioni salvate ---------------------------------------
+    
+    def _persist(self, operation: str, *args):
+        """
+        Esegue un'operazione sull'archivio della sessione corrente
+
+        È una scrittura breve nel thread di Tk: la compattazione tiene il lock
+        dell'archivio solo per gli ultimi record e lo scambio dei file, e un
+        errore viene solo segnalato senza interrompere la chat.
+        """
+        if self.session_id is None:
+            return None
+        try:
+            return getattr(self.conversations, operation)(self.session_id, *args)
+        except Exception as e:
+            print(f"Errore nel salvataggio della conversazione: {e}")
+            return None
+    
+    def _start_session(self, first_message: str):
+        """Crea la sessione, intitolata con l'inizio del primo messaggio"""
+        title = " ".join(first_message.split())
+        if len(title) > SESSION_TITLE_CHARS:
+            title = title[:SESSION_TITLE_CHARS - 1] + "…"
+        try:
+            self.session_id = self.conversations.create_session(title)
+            self._history_start = 0
+        except Exception as e:
+            print(f"Errore nella creazione della conversazione: {e}")
+        self.update_session_selector()
+    
+    def load_last_session(self):
+        """Riapre la conversazione più recente, o mostra il benvenuto"""
+        try:
+            sessions = self.conversations.list_sessions(limit=1)
+        except Exception as e:
+            print(f"Errore nel caricamento delle conversazioni: {e}")
+            sessions = []
+        if sessions and sessions[0]["message_count"]:
+            self.open_session(sessions[0]["id"])
+        else:
+            self.update_session_selector()
+            self.add_system_message("Benvenuto! Scrivi un messaggio per iniziare a chattare con GitHub Copilot.")
+    
+    def open_session(self, session_id: str):
+        """Mostra una conversazione salvata: solo l'ultima pagina, le altre su richiesta"""
+        self.stop_generating()
+        try:
+            start, messages = self.conversations.tail(session_id, HISTORY_PAGE_SIZE)
+        except Exception as e:
+            print(f"Errore nell'apertura della conversazione: {e}")
+            return
+        
+        self.message_list.clear()
+        self.context.clear()
+        self.session_id = session_id
+        self._history_start = start
+        for message in messages:
+            self.add_message(message["role"], message["content"])
+        self.update_session_selector()
+    
+    def load_older_messages(self):
+        """Carica in testa alla lista la pagina di messaggi precedente"""
+        if self.session_id is None or self._history_start == 0:
+            return
+        start = max(0, self._history_start - HISTORY_PAGE_SIZE)
+        try:
+            messages = self.conversations.read_messages(self.session_id, start, self._history_start)
+        except Exception as e:
+            print(f"Errore nel caricamento dei messaggi precedenti: {e}")
+            return
+        
+        self._history_start = start
+        self.message_list.prepend(messages)
+        # La lista è scalata: l'indice del messaggio in streaming va aggiornato
+        if self._stream_index is not None:
+            self._stream_index += len(messages)
+    
+    def on_session_selected(self, selection: str):
+        """Gestisce la selezione di una conversazione dal dropdown"""
+        if selection == NEW_SESSION_LABEL:
+            if self.session_id is not None:
+                self.clear_chat()
+            return
+        session_id = self.session_ids.get(selection)
+        if session_id and session_id != self.session_id:
+            self.open_session(session_id)
+    
+    def update_session_selector(self):
+        """Aggiorna il dropdown con le conversazioni più recenti"""
+        try:
+            sessions = self.conversations.list_sessions(limit=SESSION_MENU_LIMIT)
+        except Exception as e:
+            print(f"Errore nel caricamento delle conversazioni: {e}")
+            sessions = []
+        
+        self.session_ids.clear()
+        current = NEW_SESSION_LABEL
+        for session in sessions:
+            label = session["title"]
+            # Titoli duplicati: aggiunge un contatore per distinguerli
+            counter = 2
+            while label in self.session_ids or label == NEW_SESSION_LABEL:
+                label = f"{session['title']} ({counter})"
+                counter += 1
+            self.session_ids[label] = session["id"]
+            if session["id"] == self.session_id:
+                current = label
+        
+        self.session_selector.configure(values=[NEW_SESSION_LABEL] + list(self.session_ids))
+        self.session_selector.set(current)
+    
+    def destroy(self):
+        """Salva la risposta in corso e chiude l'archivio delle conversazioni"""
+        self.stop_generating()
+        self.conversations.close()
+        super().destroy()
@@ -0,0 +1,386 @@
+"""
+Lista messaggi virtualizzata per il pannello chat
+
+Solo i messaggi visibili hanno un widget: un piccolo pool di righe viene
+riassegnato ai messaggi nel viewport durante lo scroll, mentre il testo
+resta in un archivio compatto.
+"""
+
+import customtkinter as ctk
+import tkinter as tk
+from array import array
+from bisect import bisect_right
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+ROLES = ("system", "user", "assistant")
+ROLE_ICONS = {"assistant": "🤖", "user": "👤", "system": "🛠️"}
+
+# Spazio occupato da icona e padding a sinistra del testo (px non scalati)
+CONTENT_MARGIN = 70
+# Padding verticale interno di una riga + spazio tra le righe
+ROW_PADDING = 24
+ROW_SPACING = 4
+# Passo di scroll per una "unità" (rotella o frecce della scrollbar)
+SCROLL_STEP = 40
+# Distanza (px) dalla cima entro cui si chiedono i messaggi più vecchi
+LOAD_OLDER_MARGIN = 200
+
+
+class MessageStore:
+    """Archivio compatto dei messaggi: ruoli codificati in un array di byte"""
+
+    def __init__(self):
+        self._roles = array("B")
+        self._contents: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._contents)
+
+    def __getitem__(self, index: int) -> Dict[str, str]:
+        return {"role": ROLES[self._roles[index]], "content": self._contents[index]}
+
+    def __iter__(self) -> Iterator[Dict[str, str]]:
+        for index in range(len(self._contents)):
+            yield self[index]
+
+    def append(self, role: str, content: str) -> int:
+        """Aggiunge un messaggio e ne restituisce l'indice"""
+        self._roles.append(ROLES.index(role) if role in ROLES else 0)
+        self._contents.append(content)
+        return len(self._contents) - 1
+
+    def prepend(self, messages: List[Dict[str, str]]):
+        """Inserisce messaggi più vecchi in testa; gli indici esistenti scalano"""
+        roles = array("B", (ROLES.index(m["role"]) if m["role"] in ROLES else 0 for m in messages))
+        self._roles = roles + self._roles
+        self._contents[:0] = [m["content"] for m in messages]
+
+    def role(self, index: int) -> str:
+        return ROLES[self._roles[index]]
+
+    def content(self, index: int) -> str:
+        return self._contents[index]
+
+    def set_content(self, index: int, content: str):
+        self._contents[index] = content
+
+    def clear(self):
+        self._roles = array("B")
+        self._contents.clear()
+
+
+def estimate_line_count(text: str, chars_per_line: int) -> int:
+    """Stima le righe occupate da un testo a capo automatico"""
+    chars_per_line = max(1, chars_per_line)
+    lines = 0
+    for paragraph in text.split("\n"):
+        lines += max(1, -(-len(paragraph) // chars_per_line))
+    return lines
+
+
+class _MessageRow(ctk.CTkFrame):
+    """Riga riutilizzabile: icona del ruolo + testo del messaggio"""
+
+    def __init__(self, parent, font: ctk.CTkFont):
+        super().__init__(parent)
+        self.grid_columnconfigure(1, weight=1)
+        self.bound_index = -1
+        self._bound: Tuple[str, str, int] = None
+
+        self.role_label = ctk.CTkLabel(self, text="", font=ctk.CTkFont(size=16))
+        self.role_label.grid(row=0, column=0, padx=(10, 5), pady=10, sticky="nw")
+
+        self.content_label = ctk.CTkLabel(
+            self,
+            text="",
+            font=font,
+            wraplength=400,
+            justify="left",
+            anchor="w"
+        )
+        self.content_label.grid(row=0, column=1, padx=(0, 10), pady=10, sticky="ew")
+
+    def show(self, index: int, role: str, content: str, wraplength: int):
+        """Associa la riga a un messaggio, riconfigurando solo ciò che cambia"""
+        self.bound_index = index
+        bound = (role, content, wraplength)
+        if bound == self._bound:
+            return
+
+        if self._bound is None or self._bound[0] != role:
+            self.role_label.configure(text=ROLE_ICONS.get(role, "🛠️"))
+        if self._bound is None or self._bound[2] != wraplength:
+            self.content_label.configure(wraplength=wraplength)
+        if self._bound is None or self._bound[1] != content:
+            self.content_label.configure(text=content)
+        self._bound = bound
+
+
+class VirtualMessageList(ctk.CTkFrame):
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.store = MessageStore()
+
+        # Altezze (px reali) e offset cumulativi di ogni messaggio
+        self._heights = array("I")
+        self._offsets = array("I")
+        self._dirty_from = 0
+        self._top = 0
+        # Segue i nuovi messaggi finché l'utente non scorre verso l'alto
+        self._stick_to_bottom = True
+
+        # Chiamata quando il viewport si avvicina alla cima (caricamento a pagine)
+        self.on_reach_top: Optional[Callable[[], None]] = None
+        self._reach_top_job = None
+
+        self._pool: List[_MessageRow] = []
+        self._pool_items: List[int] = []
+        self._render_job = None
+        self._width = 0
+
+        self._font = ctk.CTkFont(size=12)
+        self._metrics = None
+
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(0, weight=1)
+
+        self.canvas = ctk.CTkCanvas(
+            self,
+            highlightthickness=0,
+            bg=self._apply_appearance_mode(self.cget("fg_color"))
+        )
+        self.canvas.grid(row=0, column=0, sticky="nsew", padx=(5, 0), pady=5)
+
+        self.scrollbar = ctk.CTkScrollbar(self, command=self.yview)
+        self.scrollbar.grid(row=0, column=1, sticky="ns", padx=(0, 5), pady=5)
+
+        self.canvas.bind("<Configure>", self._on_configure)
+        self._bind_wheel(self.canvas)
+
+    # --- API pubblica -------------------------------------------------
+
+    def append(self, role: str, content: str) -> int:
+        """Aggiunge un messaggio e ne restituisce l'indice"""
+        index = self.store.append(role, content)
+        self._heights.append(self._estimate_height(content))
+        self._offsets.append(0)
+        self._invalidate(index)
+        self._schedule_render()
+        return index
+
+    def update_message(self, index: int, content: str):
+        """Sostituisce il testo di un messaggio (es. durante lo streaming)"""
+        self.store.set_content(index, content)
+        self._heights[index] = self._estimate_height(content)
+        self._invalidate(index)
+        self._schedule_render()
+
+    def prepend(self, messages: List[Dict[str, str]]):
+        """Inserisce in testa messaggi più vecchi senza spostare ciò che è visibile"""
+        if not messages:
+            return
+        count = len(messages)
+        self.store.prepend(messages)
+        heights = array("I", (self._estimate_height(m["content"]) for m in messages))
+        self._heights = heights + self._heights
+        self._offsets = array("I", bytes(self._offsets.itemsize * count)) + self._offsets
+        self._dirty_from = 0
+        # Il viewport scende dell'altezza aggiunta: il contenuto resta fermo
+        if not self._stick_to_bottom:
+            self._top += sum(heights)
+        for row in self._pool:
+            if row.bound_index >= 0:
+                row.bound_index += count
+        self._schedule_render()
+
+    def clear(self):
+        """Rimuove tutti i messaggi, mantenendo il pool di righe"""
+        self.store.clear()
+        self._heights = array("I")
+        self._offsets = array("I")
+        self._dirty_from = 0
+        self._top = 0
+        self._stick_to_bottom = True
+        for row in self._pool:
+            row.bound_index = -1
+        self._schedule_render()
+
+    def scroll_to_bottom(self):
+        """Porta il viewport in fondo alla lista"""
+        self._stick_to_bottom = True
+        self._schedule_render()
+
+    def yview(self, *args):
+        """Comando della scrollbar (moveto / scroll units|pages)"""
+        total = self._total_height()
+        viewport = self.canvas.winfo_height()
+        if not args:
+            return
+
+        if args[0] == "moveto":
+            self._top = int(float(args[1]) * total)
+        elif args[0] == "scroll":
+            amount = int(args[1])
+            step = viewport if args[2] == "pages" else SCROLL_STEP
+            self._top += amount * step
+        self._stick_to_bottom = self._top >= total - viewport
+        self._render()
+
+    # --- Geometria ----------------------------------------------------
+
+    def _font_metrics(self) -> Tuple[int, int]:
+        """(larghezza media carattere, altezza riga) in px reali"""
+        if self._metrics is None:
+            scaling = self._get_widget_scaling()
+            sample = "abcdefghijklmnopqrstuvwxyz ABCDEFGHIJ0123456789"
+            char_width = self._font.measure(sample) / len(sample) * scaling
+            line_height = self._font.metrics("linespace") * scaling
+            self._metrics = (max(1, int(char_width)), max(1, int(line_height)))
+        return self._metrics
+
+    def _wraplength(self) -> int:
+        """Wraplength in px non scalati, come si aspetta CTkLabel"""
+        scaling = self._get_widget_scaling()
+        return max(100, int(self._width / scaling) - CONTENT_MARGIN)
+
+    def _estimate_height(self, content: str) -> int:
+        char_width, line_height = self._font_metrics()
+        chars_per_line = int(self._wraplength() * self._get_widget_scaling()) // char_width
+        lines = estimate_line_count(content, chars_per_line)
+        padding = int((ROW_PADDING + ROW_SPACING) * self._get_widget_scaling())
+        return lines * line_height + padding
+
+    def _invalidate(self, index: int):
+        self._dirty_from = min(self._dirty_from, index)
+
+    def _ensure_offsets(self):
+        """Ricalcola gli offset cumulativi a partire dal primo indice modificato"""
+        count = len(self._heights)
+        if self._dirty_from >= count:
+            return
+        start = self._dirty_from
+        offset = self._offsets[start - 1] + self._heights[start - 1] if start > 0 else 0
+        for index in range(start, count):
+            self._offsets[index] = offset
+            offset += self._heights[index]
+        self._dirty_from = count
+
+    def _total_height(self) -> int:
+        self._ensure_offsets()
+        if not self._heights:
+            return 0
+        return self._offsets[-1] + self._heights[-1]
+
+    # --- Rendering ----------------------------------------------------
+
+    def _schedule_render(self):
+        if self._render_job is None:
+            self._render_job = self.after_idle(self._render)
+
+    def _render(self):
+        """Associa le righe del pool ai soli messaggi visibili"""
+        if self._render_job is not None:
+            self.after_cancel(self._render_job)
+            self._render_job = None
+
+        total = self._total_height()
+        viewport = self.canvas.winfo_height()
+        if self._stick_to_bottom:
+            self._top = total - viewport
+        self._top = max(0, min(self._top, total - viewport))
+
+        visible: List[int] = []
+        if self._heights:
+            index = max(0, bisect_right(self._offsets, self._top) - 1)
+            while index < len(self._heights) and self._offsets[index] < self._top + viewport:
+                visible.append(index)
+                index += 1
+
+        # Le righe già associate a un messaggio visibile restano dove sono
+        visible_set = set(visible)
+        assigned = {row.bound_index: slot for slot, row in enumerate(self._pool)
+                    if row.bound_index in visible_set}
+        free_slots = [slot for slot, row in enumerate(self._pool)
+                      if row.bound_index not in visible_set]
+
+        wraplength = self._wraplength()
+        for index in visible:
+            slot = assigned.get(index)
+            if slot is None:
+                slot = free_slots.pop() if free_slots else self._grow_pool()
+            row = self._pool[slot]
+            row.show(index, self.store.role(index), self.store.content(index), wraplength)
+            item = self._pool_items[slot]
+            self.canvas.coords(item, 0, self._offsets[index] - self._top)
+            self.canvas.itemconfigure(item, state="normal", width=self._width)
+
+        for slot in free_slots:
+            self._pool[slot].bound_index = -1
+            self.canvas.itemconfigure(self._pool_items[slot], state="hidden")
+
+        if total > 0:
+            self.scrollbar.set(self._top / total, min(1.0, (self._top + viewport) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+        if visible:
+            self.after_idle(self._measure_visible)
+
+        if self.on_reach_top is not None and self._top < LOAD_OLDER_MARGIN and self._reach_top_job is None:
+            self._reach_top_job = self.after_idle(self._reach_top)
+
+    def _reach_top(self):
+        self._reach_top_job = None
+        self.on_reach_top()
+
+    def _grow_pool(self) -> int:
+        row = _MessageRow(self.canvas, self._font)
+        item = self.canvas.create_window(0, 0, window=row, anchor="nw", width=self._width)
+        self._bind_wheel(row)
+        for child in row.winfo_children():
+            self._bind_wheel(child)
+        self._pool.append(row)
+        self._pool_items.append(item)
+        return len(self._pool) - 1
+
+    def _measure_visible(self):
+        """Sostituisce le altezze stimate con quelle reali delle righe visibili"""
+        changed = False
+        spacing = int(ROW_SPACING * self._get_widget_scaling())
+        for row in self._pool:
+            index = row.bound_index
+            if index < 0 or index >= len(self._heights):
+                continue
+            height = row.winfo_reqheight() + spacing
+            if height != self._heights[index]:
+                self._heights[index] = height
+                self._invalidate(index)
+                changed = True
+
+        if changed:
+            self._render()
+
+    def _on_configure(self, event):
+        if event.width != self._width:
+            self._width = event.width
+            # La larghezza cambia il wrapping: le altezze vanno ristimate
+            for index in range(len(self._heights)):
+                self._heights[index] = self._estimate_height(self.store.content(index))
+            self._invalidate(0)
+        self._render()
+
+    def _set_appearance_mode(self, mode_string):
+        super()._set_appearance_mode(mode_string)
+        self.canvas.configure(bg=self._apply_appearance_mode(self.cget("fg_color")))
+
+    # --- Rotella del mouse -------------------------------------------
+
+    def _bind_wheel(self, widget):
+        widget.bind("<MouseWheel>", self._on_mousewheel, add="+")
+        widget.bind("<Button-4>", lambda e: self.yview("scroll", -1, "units"), add="+")
+        widget.bind("<Button-5>", lambda e: self.yview("scroll", 1, "units"), add="+")
+
+    def _on_mousewheel(self, event):
+        # Windows usa multipli di 120, macOS valori piccoli
+        units = -int(event.delta / 120) if abs(event.delta) >= 120 else -event.delta
+        self.yview("scroll", units, "units")
@@ -6,10 +6,18 @@ import customtkinter as ctk
 import tkinter as tk
 from typing import Dict, List, TYPE_CHECKING
 import uuid
-import json
 from pathlib import Path
 import datetime
 import tkinter.messagebox
+from src.services.notes_store import NotesStore
+from src.ui.event_coalescer import EventCoalescer
+
+# Attesa (ms) dopo l'ultimo tasto prima di eseguire la ricerca
+SEARCH_DELAY_MS = 150
+# Numero massimo di risultati mostrati
+SEARCH_LIMIT = 20
+# Attesa (ms) dopo l'ultima modifica prima del salvataggio automatico
+AUTO_SAVE_DELAY_MS = 2000
 
 if TYPE_CHECKING:
     from src.configs.settings import Settings
@@ -18,8 +26,13 @@ class NotesPanel(ctk.CTkFrame):
     def __init__(self, parent, settings: 'Settings'):
         super().__init__(parent)
         self.settings = settings
+        # Solo metadati (id, title, modified_at, size): i contenuti si caricano su richiesta
         self.notes: Dict[str, Dict] = {}
         self.active_note_id: str = None
+        self.store = NotesStore(Path.home() / ".studio_app")
+        
+        # Etichetta mostrata nel dropdown -> id della nota (i titoli possono ripetersi)
+        self.selector_ids: Dict[str, str] = {}
         
         self.setup_ui()
         self.load_notes()
@@ -28,7 +41,7 @@ class NotesPanel(ctk.CTkFrame):
         """Configura l'interfaccia del pannello note"""
         # Configura il layout
         self.grid_columnconfigure(0, weight=1)
-        self.grid_rowconfigure(1, weight=1)
+        self.grid_rowconfigure(3, weight=1)
         
         # Header con controlli
         self.header = ctk.CTkFrame(self)
@@ -76,9 +89,23 @@ class NotesPanel(ctk.CTkFrame):
         )
         self.save_btn.grid(row=0, column=4, padx=(2, 10), pady=10)
         
+        # Ricerca full-text
+        self.search_entry = ctk.CTkEntry(
+            self,
+            placeholder_text="🔍 Cerca nelle note..."
+        )
+        self.search_entry.grid(row=1, column=0, sticky="ew", padx=5, pady=(5, 0))
+        self.search_entry.bind("<KeyRelease>", self.on_search_changed)
+        self.search_entry.bind("<Escape>", lambda e: self.clear_search())
+        self.search_timer = None
+        
+        # Risultati della ricerca, visibili solo durante una ricerca
+        self.results_frame = ctk.CTkScrollableFrame(self, height=140)
+        self.results_frame.grid_columnconfigure(0, weight=1)
+        
         # Area principale per le note
         self.content_frame = ctk.CTkFrame(self)
-        self.content_frame.grid(row=1, column=0, sticky="nsew", padx=5, pady=5)
+        self.content_frame.grid(row=3, column=0, sticky="nsew", padx=5, pady=5)
         self.content_frame.grid_columnconfigure(0, weight=1)
         self.content_frame.grid_rowconfigure(1, weight=1)
         
@@ -102,7 +129,8 @@ class NotesPanel(ctk.CTkFrame):
         self.text_area.bind("<KeyRelease>", self.on_content_changed)
         
         # Timer per auto-save
-        self.auto_save_timer = None
+        # Un solo timer per raffica di tasti, invece di uno nuovo a ogni tasto
+        self.auto_save_events = EventCoalescer(self, self.auto_save, debounce_ms=AUTO_SAVE_DELAY_MS)
     
     def create_new_note(self):
         """Crea una nuova nota"""
@@ -117,9 +145,9 @@ class NotesPanel(ctk.CTkFrame):
             "modified_at": datetime.datetime.now().isoformat()
         }
         
-        self.notes[note_id] = note_data
+        self.store.put(note_data)
+        self.notes[note_id] = self._meta(note_data)
         self.update_note_selector()
-        self.note_selector.set(note_title)
         self.load_note(note_id)
     
     def delete_current_note(self):
@@ -135,10 +163,10 @@ class NotesPanel(ctk.CTkFrame):
         
         if result:
             del self.notes[self.active_note_id]
+            self.store.delete(self.active_note_id)
             self.active_note_id = None
             self.update_note_selector()
             self.clear_content()
-            self.save_notes()
     
     def save_current_note(self):
         """Salva la nota corrente"""
@@ -151,14 +179,22 @@ class NotesPanel(ctk.CTkFrame):
         if not title:
             title = f"Nota {len(self.notes)}"
         
-        self.notes[self.active_note_id].update({
+        note_data = self.store.get(self.active_note_id)
+        if note_data is None:
+            return
+        if note_data["title"] == title and note_data["content"] == content:
+            return
+        
+        note_data.update({
             "title": title,
             "content": content,
             "modified_at": datetime.datetime.now().isoformat()
         })
         
+        # Scrive solo il record della nota modificata
+        self.store.put(note_data)
+        self.notes[self.active_note_id] = self._meta(note_data)
         self.update_note_selector()
-        self.save_notes()
     
     def on_note_selected(self, selection: str):
         """Gestisce la selezione di una nota"""
@@ -166,19 +202,22 @@ class NotesPanel(ctk.CTkFrame):
             self.create_new_note()
             return
         
-        # Trova la nota per titolo
-        for note_id, note_data in self.notes.items():
-            if note_data["title"] == selection:
-                self.load_note(note_id)
-                break
+        note_id = self.selector_ids.get(selection)
+        if note_id:
+            self.load_note(note_id)
     
     def load_note(self, note_id: str):
         """Carica una nota nell'editor"""
         if note_id not in self.notes:
             return
         
+        # Il contenuto arriva dalla LRU dell'archivio o dal database
+        note_data = self.store.get(note_id)
+        if note_data is None:
+            return
+        
         self.active_note_id = note_id
-        note_data = self.notes[note_id]
+        self.note_selector.set(self._selector_label(note_id))
         
         # Carica il contenuto
         self.title_entry.delete(0, "end")
@@ -187,6 +226,16 @@ class NotesPanel(ctk.CTkFrame):
         self.text_area.delete("1.0", "end")
         self.text_area.insert("1.0", note_data["content"])
     
+    @staticmethod
+    def _meta(note_data: Dict) -> Dict:
+        """Metadati di una nota, come restituiti da NotesStore.list_meta"""
+        return {
+            "id": note_data["id"],
+            "title": note_data["title"],
+            "modified_at": note_data.get("modified_at"),
+            "size": len(note_data.get("content", ""))
+        }
+    
     def clear_content(self):
         """Pulisce il contenuto dell'editor"""
         self.title_entry.delete(0, "end")
@@ -194,17 +243,79 @@ class NotesPanel(ctk.CTkFrame):
     
     def update_note_selector(self):
         """Aggiorna il dropdown delle note"""
-        note_titles = ["Nuova Nota"] + [note["title"] for note in self.notes.values()]
-        self.note_selector.configure(values=note_titles)
+        self.selector_ids.clear()
+        for note_id, note in self.notes.items():
+            label = note["title"]
+            # Titoli duplicati: aggiunge un contatore per distinguerli
+            counter = 2
+            while label in self.selector_ids or label == "Nuova Nota":
+                label = f"{note['title']} ({counter})"
+                counter += 1
+            self.selector_ids[label] = note_id
+        
+        self.note_selector.configure(values=["Nuova Nota"] + list(self.selector_ids))
+        if self.active_note_id in self.notes:
+            self.note_selector.set(self._selector_label(self.active_note_id))
+    
+    def _selector_label(self, note_id: str) -> str:
+        """Etichetta del dropdown associata a una nota"""
+        for label, label_note_id in self.selector_ids.items():
+            if label_note_id == note_id:
+                return label
+        return self.notes[note_id]["title"]
+    
+    def on_search_changed(self, event=None):
+        """Avvia la ricerca poco dopo l'ultimo tasto premuto"""
+        if self.search_timer:
+            self.after_cancel(self.search_timer)
+        self.search_timer = self.after(SEARCH_DELAY_MS, self.run_search)
+    
+    def run_search(self):
+        """Esegue la ricerca full-text e mostra i risultati per rilevanza"""
+        self.search_timer = None
+        query = self.search_entry.get().strip()
+        
+        for widget in self.results_frame.winfo_children():
+            widget.destroy()
+        
+        if not query:
+            self.results_frame.grid_remove()
+            return
+        
+        results = self.store.search(query, limit=SEARCH_LIMIT)
+        self.results_frame.grid(row=2, column=0, sticky="ew", padx=5, pady=(5, 0))
+        
+        if not results:
+            ctk.CTkLabel(
+                self.results_frame,
+                text="Nessun risultato",
+                text_color="gray"
+            ).grid(row=0, column=0, sticky="w", padx=10, pady=5)
+            return
+        
+        for row, result in enumerate(results):
+            snippet = " ".join(result["snippet"].split())
+            ctk.CTkButton(
+                self.results_frame,
+                text=f"{result['title']}  —  {snippet}",
+                anchor="w",
+                fg_color="transparent",
+                command=lambda note_id=result["id"]: self.open_search_result(note_id)
+            ).grid(row=row, column=0, sticky="ew", padx=2, pady=1)
+    
+    def open_search_result(self, note_id: str):
+        """Apre una nota dai risultati della ricerca"""
+        self.auto_save()
+        self.load_note(note_id)
+    
+    def clear_search(self):
+        """Svuota la ricerca e nasconde i risultati"""
+        self.search_entry.delete(0, "end")
+        self.run_search()
     
     def on_content_changed(self, event=None):
         """Gestisce i cambiamenti nel contenuto per l'auto-save"""
-        # Cancella il timer precedente
-        if self.auto_save_timer:
-            self.after_cancel(self.auto_save_timer)
-        
-        # Imposta un nuovo timer per il salvataggio automatico
-        self.auto_save_timer = self.after(2000, self.auto_save)
+        self.auto_save_events(event)
     
     def auto_save(self):
         """Salvataggio automatico"""
@@ -212,31 +323,22 @@ class NotesPanel(ctk.CTkFrame):
             self.save_current_note()
     
     def load_notes(self):
-        """Carica le note dal file"""
-        notes_file = Path.home() / ".studio_app" / "notes.json"
-        
-        if notes_file.exists():
-            try:
-                with open(notes_file, 'r', encoding='utf-8') as f:
-                    self.notes = json.load(f)
-                self.update_note_selector()
-                
-                # Carica la prima nota se disponibile
-                if self.notes:
-                    first_note_id = list(self.notes.keys())[0]
-                    self.load_note(first_note_id)
-                    self.note_selector.set(self.notes[first_note_id]["title"])
-                    
-            except (json.JSONDecodeError, Exception) as e:
-                print(f"Errore nel caricamento delle note: {e}")
-    
-    def save_notes(self):
-        """Salva le note nel file"""
-        notes_file = Path.home() / ".studio_app" / "notes.json"
-        notes_file.parent.mkdir(exist_ok=True)
-        
+        """Carica l'indice delle note; i contenuti vengono letti solo quando servono"""
         try:
-            with open(notes_file, 'w', encoding='utf-8') as f:
-                json.dump(self.notes, f, indent=2, ensure_ascii=False)
+            self.notes = self.store.list_meta()
+            self.update_note_selector()
+            
+            # Carica la prima nota se disponibile
+            if self.notes:
+                first_note_id = next(iter(self.notes))
+                self.load_note(first_note_id)
+                
         except Exception as e:
-            print(f"Errore nel salvataggio delle note: {e}")
+            print(f"Errore nel caricamento delle note: {e}")
+    
+    def destroy(self):
+        """Chiude l'archivio delle note insieme al pannello"""
+        # Le modifiche ancora in attesa di auto-save vengono salvate subito
+        self.auto_save_events.flush()
+        self.store.close()
+        super().destroy()
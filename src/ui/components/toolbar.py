@@ -10,11 +10,15 @@ if TYPE_CHECKING:
     from src.ui.plugins.plugin_manager import PluginManager
     from src.configs.settings import Settings
 
+SPINNER_FRAMES = "⠋⠙⠹⠸⠼⠴⠦⠧⠇⠏"
+SPINNER_INTERVAL_MS = 100
+
 class Toolbar(ctk.CTkFrame):
     def __init__(self, parent, plugin_manager: 'PluginManager', settings: 'Settings'):
         super().__init__(parent)
         self.plugin_manager = plugin_manager
         self.settings = settings
+        self.editor_window = None
         
         self.setup_ui()
     
@@ -119,8 +123,42 @@ class Toolbar(ctk.CTkFrame):
     
     def toggle_editor(self):
         """Attiva/disattiva l'editor di codice"""
-        print("Toggle code editor")
-        # TODO: Implementa la logica per l'editor di codice
+        # La finestra viene nascosta, non distrutta: il plugin tiene il suo widget
+        if self.editor_window is not None and self.editor_window.winfo_exists():
+            if self.editor_window.state() == "withdrawn":
+                self.editor_window.deiconify()
+            else:
+                self.editor_window.withdraw()
+            return
+        
+        # Primo utilizzo: il plugin viene importato e inizializzato solo ora
+        self.editor_window = ctk.CTkToplevel(self)
+        self.editor_window.title("Editor di Codice")
+        self.editor_window.geometry("800x600")
+        self.editor_window.protocol("WM_DELETE_WINDOW", self.editor_window.withdraw)
+        
+        widget = self.plugin_manager.mount_plugin("code_editor", self.editor_window)
+        if widget is None:
+            print("Plugin code_editor non disponibile")
+            self.editor_window.destroy()
+            self.editor_window = None
+            return
+        widget.pack(fill="both", expand=True)
+    
+    def watch_plugin(self, plugin_name: str, button: ctk.CTkButton):
+        """Mostra uno spinner sul pulsante finché il plugin non è pronto"""
+        future = self.plugin_manager.get_ready_future(plugin_name)
+        if future is None:
+            return
+        self._spin(future, button, button.cget("text"), 0)
+    
+    def _spin(self, future, button: ctk.CTkButton, text: str, frame: int):
+        # Il future si completa in un thread di background: qui lo si controlla con after()
+        if future.done():
+            button.configure(text=text)
+            return
+        button.configure(text=f"{SPINNER_FRAMES[frame % len(SPINNER_FRAMES)]} {text}")
+        self.after(SPINNER_INTERVAL_MS, self._spin, future, button, text, frame + 1)
     
     def open_plugin_manager(self):
         """Apre il gestore dei plugin"""
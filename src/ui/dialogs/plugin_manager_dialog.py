@@ -10,6 +10,9 @@ if TYPE_CHECKING:
     from src.ui.plugins.plugin_manager import PluginManager
     from src.configs.settings import Settings
 
+# Aggiornamento della lista mentre un plugin è in caricamento (ms)
+LOADING_REFRESH_MS = 250
+
 class PluginManagerDialog(ctk.CTkToplevel):
     def __init__(self, parent, plugin_manager: 'PluginManager', settings: 'Settings'):
         super().__init__(parent)
@@ -24,9 +27,16 @@ class PluginManagerDialog(ctk.CTkToplevel):
         # Centra la finestra
         self.center_window()
         
+        self._refresh_job = None
         self.setup_ui()
         self.refresh_plugin_list()
     
+    def destroy(self):
+        if self._refresh_job is not None:
+            self.after_cancel(self._refresh_job)
+            self._refresh_job = None
+        super().destroy()
+    
     def center_window(self):
         """Centra la finestra rispetto al parent"""
         self.update_idletasks()
@@ -105,13 +115,15 @@ class PluginManagerDialog(ctk.CTkToplevel):
     
     def refresh_plugin_list(self):
         """Aggiorna la lista dei plugin"""
+        if self._refresh_job is not None:
+            self.after_cancel(self._refresh_job)
+            self._refresh_job = None
         # Pulisci la lista corrente
         for widget in self.scrollable_frame.winfo_children():
             widget.destroy()
         
         # Ottieni i plugin disponibili
         available_plugins = self.plugin_manager.get_available_plugins()
-        loaded_plugins = self.plugin_manager.get_loaded_plugins()
         
         if not available_plugins:
             # Messaggio se non ci sono plugin
@@ -133,6 +145,7 @@ class PluginManagerDialog(ctk.CTkToplevel):
             return
         
         # Crea i widget per ogni plugin
+        any_loading = False
         for plugin_name in available_plugins:
             plugin_frame = ctk.CTkFrame(self.scrollable_frame)
             plugin_frame.pack(fill="x", padx=5, pady=2)
@@ -146,8 +159,18 @@ class PluginManagerDialog(ctk.CTkToplevel):
             name_label.pack(side="left", padx=15, pady=10)
             
             # Status
-            is_loaded = plugin_name in loaded_plugins
-            status_text = "✅ Caricato" if is_loaded else "⭕ Non caricato"
+            is_loading = self.plugin_manager.is_plugin_loading(plugin_name)
+            is_pending = self.plugin_manager.is_plugin_pending(plugin_name)
+            is_loaded = self.plugin_manager.is_plugin_loaded(plugin_name) or is_pending
+            any_loading = any_loading or is_loading
+            if is_loading:
+                status_text = "⏳ Caricamento..."
+            elif is_pending:
+                status_text = "💤 Al primo utilizzo"
+            elif is_loaded:
+                status_text = "✅ Caricato"
+            else:
+                status_text = "⭕ Non caricato"
             status_label = ctk.CTkLabel(
                 plugin_frame,
                 text=status_text,
@@ -155,7 +178,9 @@ class PluginManagerDialog(ctk.CTkToplevel):
             )
             status_label.pack(side="left", padx=(10, 0))
             
-            # Pulsanti azione
+            # Pulsanti azione: nessuno durante il caricamento, che finisce da solo
+            if is_loading:
+                continue
             if is_loaded:
                 # Info button
                 info_btn = ctk.CTkButton(
@@ -183,9 +208,16 @@ class PluginManagerDialog(ctk.CTkToplevel):
                     command=lambda p=plugin_name: self.load_plugin(p)
                 )
                 load_btn.pack(side="right", padx=(5, 15), pady=5)
+        
+        if any_loading:
+            self._refresh_job = self.after(LOADING_REFRESH_MS, self.refresh_plugin_list)
     
     def load_plugin(self, plugin_name: str):
         """Carica un plugin"""
+        if self.plugin_manager.is_plugin_loading(plugin_name):
+            # Già in caricamento in background: la lista si aggiorna da sola
+            self.refresh_plugin_list()
+            return
         success = self.plugin_manager.load_plugin(plugin_name)
         if success:
             self.show_message("Successo", f"Plugin '{plugin_name}' caricato con successo!")
@@ -206,8 +238,17 @@ class PluginManagerDialog(ctk.CTkToplevel):
     
     def show_plugin_info(self, plugin_name: str):
         """Mostra informazioni sul plugin"""
-        plugin = self.plugin_manager.get_plugin(plugin_name)
-        if plugin:
+        # Il manifest evita di importare il plugin solo per mostrarne i dati
+        manifest = self.plugin_manager.get_manifest(plugin_name)
+        plugin = None if manifest else self.plugin_manager.get_plugin(plugin_name)
+        if manifest:
+            info_text = f"Nome: {manifest.get('name', plugin_name)}\\n"
+            info_text += f"Descrizione: {manifest.get('description', '')}\\n"
+            info_text += f"Versione: {manifest.get('version', '')}"
+            
+            self.info_text.delete("1.0", "end")
+            self.info_text.insert("1.0", info_text)
+        elif plugin:
             info_text = f"Nome: {plugin.get_name()}\\n"
             info_text += f"Descrizione: {plugin.get_description()}\\n"
             info_text += f"Versione: {plugin.get_version()}"
@@ -153,18 +153,20 @@ class SettingsDialog(ctk.CTkToplevel):
 
     def save_settings(self):
         """Salva le impostazioni"""
-        # Salva API Key
-        api_key = self.api_key_entry.get().strip()
-        self.settings.set_github_api_key(api_key)
-
-        # Salva tema
-        theme = self.theme_option.get()
-        self.settings.set("theme", theme)
-
-        # Salva layout
-        layout_config = self.settings.get("layout", {})
-        layout_config["notes_panel_visible"] = self.notes_visible_var.get()
-        self.settings.set("layout", layout_config)
+        # Tutte le modifiche in un'unica scrittura di config.json
+        with self.settings.transaction():
+            # Salva API Key
+            api_key = self.api_key_entry.get().strip()
+            self.settings.set_github_api_key(api_key)
+
+            # Salva tema
+            theme = self.theme_option.get()
+            self.settings.set("theme", theme)
+
+            # Salva layout
+            layout_config = self.settings.get("layout", {})
+            layout_config["notes_panel_visible"] = self.notes_visible_var.get()
+            self.settings.set("layout", layout_config)
 
         # Applica le modifiche
         ctk.set_appearance_mode(theme)
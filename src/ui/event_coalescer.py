@@ -0,0 +1,94 @@
+"""
+Raggruppamento degli eventi Tk ad alta frequenza
+
+Sotto key-repeat o trascinamenti Tk genera molti più eventi dei frame
+effettivamente disegnati. EventCoalescer raccoglie una raffica di eventi e
+invoca il callback una sola volta:
+
+- modalità frame (default): al più una chiamata ogni interval_ms, eseguita
+  interval_ms dopo il primo evento della raffica;
+- modalità debounce (debounce_ms > 0): una chiamata sola, debounce_ms dopo
+  l'ultimo evento, senza cancellare e riprogrammare un after() per ogni tasto.
+"""
+
+import time
+from typing import Any, Callable
+
+# Circa un frame a 60 Hz
+FRAME_MS = 16
+
+
+class EventCoalescer:
+    def __init__(self, widget, callback: Callable[[], Any], interval_ms: int = FRAME_MS,
+                 debounce_ms: int = 0):
+        self.widget = widget
+        self.callback = callback
+        self.interval_ms = interval_ms
+        self.debounce_ms = debounce_ms
+
+        # Ultimo evento ricevuto, a disposizione del callback
+        self.last_event = None
+        self._job = None
+        self._last_time = 0.0
+
+        # Contatori: eventi ricevuti, chiamate eseguite, eventi assorbiti da
+        # una chiamata già in programma, eventi scartati da cancel()
+        self.events = 0
+        self.runs = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self._pending_events = 0
+
+    @property
+    def pending(self) -> bool:
+        return self._job is not None
+
+    def __call__(self, event=None):
+        """Da usare direttamente come handler di bind()"""
+        self.events += 1
+        self._pending_events += 1
+        self.last_event = event
+        self._last_time = time.monotonic()
+        if self._job is not None:
+            self.coalesced += 1
+            return
+        delay = self.debounce_ms if self.debounce_ms > 0 else self.interval_ms
+        self._job = self.widget.after(delay, self._fire)
+
+    def _fire(self):
+        self._job = None
+        if self.debounce_ms > 0:
+            # Eventi arrivati nel frattempo: si attende il tempo che manca
+            remaining = self.debounce_ms - (time.monotonic() - self._last_time) * 1000
+            if remaining >= 1:
+                self._job = self.widget.after(int(remaining), self._fire)
+                return
+        self._run()
+
+    def _run(self):
+        self._pending_events = 0
+        self.runs += 1
+        self.callback()
+
+    def flush(self):
+        """Esegue subito il callback se ci sono eventi in attesa"""
+        if self._job is not None:
+            self.widget.after_cancel(self._job)
+            self._job = None
+            self._run()
+
+    def cancel(self):
+        """Scarta gli eventi in attesa senza eseguire il callback"""
+        if self._job is not None:
+            self.widget.after_cancel(self._job)
+            self._job = None
+            self.dropped += self._pending_events
+            self._pending_events = 0
+
+    def stats(self) -> dict:
+        return {
+            "events": self.events,
+            "runs": self.runs,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped
+        }
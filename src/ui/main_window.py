@@ -10,11 +10,21 @@ from src.ui.components.chat_panel import ChatPanel
 from src.ui.components.notes_panel import NotesPanel
 from src.ui.plugins.plugin_manager import PluginManager
 from src.configs.settings import Settings
+from src.services.http_session import close_sessions
+from src.services.request_engine import RequestEngine
+from src import startup_profiler
 
 class MainWindow:
     def __init__(self, settings: Settings):
         self.settings = settings
-        self.plugin_manager = PluginManager(settings)
+        
+        # Motore condiviso per tutte le chiamate ai servizi (chat e plugin)
+        network_config = self.settings.get("network", {})
+        self.request_engine = RequestEngine(
+            max_concurrency=network_config.get("max_concurrency", 4)
+        )
+        self.plugin_manager = PluginManager(settings, request_engine=self.request_engine)
+        startup_profiler.mark("plugin_discovery")
         
         # Crea la finestra principale
         self.root = ctk.CTk()
@@ -27,6 +37,9 @@ class MainWindow:
         if window_config.get('maximized', False):
             self.root.state('zoomed')
         
+        # I risultati del motore tornano nel thread di Tk tramite after()
+        self.request_engine.attach(self.root)
+        
         # Configura il layout
         self.setup_layout()
         
@@ -35,6 +48,10 @@ class MainWindow:
         
         # Carica i plugin
         self.load_plugins()
+        
+        # Import e inizializzazione dei plugin partono dopo il primo disegno
+        self.root.after_idle(self.start_plugin_loading)
+        startup_profiler.mark("widget_build")
     
     def setup_layout(self):
         """Configura il layout principale"""
@@ -54,29 +71,40 @@ class MainWindow:
         self.setup_main_layout()
     
     def setup_main_layout(self):
-        """Configura il layout del frame principale"""
+        """Configura il layout del frame principale (una sola volta)"""
         layout_config = self.settings.get("layout", {})
         chat_width_percent = layout_config.get("chat_width_percent", 50)
         
-        # Calcola i pesi delle colonne
-        chat_weight = chat_width_percent / 100
-        notes_weight = (100 - chat_width_percent) / 100
-        
-        # Configura il grid del frame principale
-        self.main_frame.grid_columnconfigure(0, weight=int(chat_weight * 100))
-        self.main_frame.grid_columnconfigure(1, weight=int(notes_weight * 100))
         self.main_frame.grid_rowconfigure(0, weight=1)
         
         # Chat panel (colonna sinistra)
         self.chat_panel = ChatPanel(self.main_frame, self.settings, self.plugin_manager)
         self.chat_panel.grid(row=0, column=0, sticky="nsew", padx=(0, 2.5), pady=0)
         
-        # Notes panel (colonna destra)
+        # Notes panel (colonna destra), creato solo quando serve
+        self.notes_panel = None
         if layout_config.get("notes_panel_visible", True):
+            self.show_notes_panel()
+        
+        self.apply_column_weights(chat_width_percent)
+    
+    def apply_column_weights(self, chat_width_percent: int):
+        """Aggiorna le proporzioni delle colonne senza ricreare i pannelli"""
+        notes_visible = self.notes_panel is not None and self.notes_panel.winfo_manager() != ""
+        
+        # Con "uniform" le colonne sono proporzionali ai pesi, non solo lo spazio extra
+        chat_weight = chat_width_percent if notes_visible else 100
+        notes_weight = 100 - chat_width_percent if notes_visible else 0
+        self.main_frame.grid_columnconfigure(0, weight=chat_weight, uniform="panels")
+        # Una colonna vuota nel gruppo uniform riserverebbe comunque spazio: da nascosta ne esce
+        self.main_frame.grid_columnconfigure(1, weight=notes_weight,
+                                             uniform="panels" if notes_visible else "")
+    
+    def show_notes_panel(self):
+        """Mostra il pannello note, creandolo al primo utilizzo"""
+        if self.notes_panel is None:
             self.notes_panel = NotesPanel(self.main_frame, self.settings)
-            self.notes_panel.grid(row=0, column=1, sticky="nsew", padx=(2.5, 0), pady=0)
-        else:
-            self.notes_panel = None
+        self.notes_panel.grid(row=0, column=1, sticky="nsew", padx=(2.5, 0), pady=0)
     
     def setup_events(self):
         """Configura gli event handlers"""
@@ -98,6 +126,18 @@ class MainWindow:
                 "maximized": False
             })
         
+        self.shutdown()
+    
+    def shutdown(self):
+        """Ferma i servizi e chiude la finestra"""
+        # Scrive subito le impostazioni ancora in sospeso
+        self.settings.flush()
+        
+        # Ferma il motore delle richieste e chiude le connessioni HTTP condivise
+        self.request_engine.shutdown()
+        self.plugin_manager.shutdown()
+        close_sessions()
+        
         # Chiudi l'applicazione
         self.root.destroy()
     
@@ -108,37 +148,48 @@ class MainWindow:
             pass
     
     def load_plugins(self):
-        """Carica i plugin abilitati"""
+        """Abilita i plugin configurati, caricandoli solo quando servono"""
         enabled_plugins = self.settings.get("plugins", {}).get("enabled", [])
         for plugin_name in enabled_plugins:
-            self.plugin_manager.load_plugin(plugin_name)
+            self.plugin_manager.enable_plugin(plugin_name)
+    
+    def start_plugin_loading(self):
+        """Avvia hot-reload e caricamento parallelo dei plugin abilitati"""
+        plugins_config = self.settings.get("plugins", {})
+        if plugins_config.get("hot_reload", True):
+            # Ricarica i plugin modificati su disco senza riavviare l'app
+            self.plugin_manager.watch(self.root)
+        if not plugins_config.get("preload", True):
+            return
+        self.plugin_manager.preload_plugins()
+        self.toolbar.watch_plugin("code_editor", self.toolbar.editor_btn)
     
     def toggle_notes_panel(self):
         """Mostra/nasconde il pannello delle note"""
         layout_config = self.settings.get("layout", {})
-        notes_visible = layout_config.get("notes_panel_visible", True)
+        notes_visible = self.notes_panel is not None and self.notes_panel.winfo_manager() != ""
         
-        if notes_visible and self.notes_panel:
+        if notes_visible:
+            # Nasconde il pannello mantenendone lo stato
             self.notes_panel.grid_remove()
-            self.notes_panel = None
-            layout_config["notes_panel_visible"] = False
-        elif not notes_visible:
-            self.notes_panel = NotesPanel(self.main_frame, self.settings)
-            self.notes_panel.grid(row=0, column=1, sticky="nsew", padx=(2.5, 0), pady=0)
-            layout_config["notes_panel_visible"] = True
+        else:
+            self.show_notes_panel()
+        layout_config["notes_panel_visible"] = not notes_visible
         
+        self.apply_column_weights(layout_config.get("chat_width_percent", 50))
         self.settings.set("layout", layout_config)
     
     def adjust_layout(self, chat_width_percent: int):
         """Regola la larghezza del pannello chat"""
         layout_config = self.settings.get("layout", {})
+        if layout_config.get("chat_width_percent") == chat_width_percent:
+            return
+        
         layout_config["chat_width_percent"] = chat_width_percent
         self.settings.set("layout", layout_config)
         
-        # Ricostruisce il layout
-        for widget in self.main_frame.winfo_children():
-            widget.destroy()
-        self.setup_main_layout()
+        # Solo i pesi del grid cambiano: i pannelli esistenti restano intatti
+        self.apply_column_weights(chat_width_percent)
     
     def run(self):
         """Avvia l'applicazione"""
@@ -0,0 +1,300 @@
+"""
+Host fuori processo per il lavoro pesante dei plugin
+
+La parte UI del plugin resta nel processo di Tk; la classe worker indicata
+nel manifest gira in un processo separato (contesto "spawn"). Host e worker
+si scambiano tuple compatte sulla Pipe:
+
+    richiesta: (id, op, payload)
+    risposta:  (id, ok, risultato)
+
+Testi e bytes più grandi di SHM_THRESHOLD non passano dalla Pipe: vengono
+copiati in un blocco shared_memory e viaggia solo il descrittore (SHM_TAG,
+nome, dimensione, tipo). Non è zero-copy: chi invia copia i dati nel blocco e
+chi riceve li copia in un bytes/str, così il risultato sopravvive al blocco;
+si evitano però pickle e la scrittura dei dati nella Pipe.
+
+Il worker tiene aperto il blocco del risultato finché l'host non conferma di
+averlo letto (OP_RELEASE): su Windows la memoria condivisa sparisce quando si
+chiude l'ultimo handle. Se il worker muore o non risponde entro il timeout
+viene riavviato e la chiamata fallisce con PluginWorkerError.
+"""
+
+import importlib.util
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Optional
+
+SHM_TAG = "__shm__"
+SHM_THRESHOLD = 64 * 1024
+DEFAULT_TIMEOUT = 30.0
+MAX_RESTARTS = 3
+# Finestra in cui si contano i riavvii prima di arrendersi
+RESTART_WINDOW_SECONDS = 60.0
+
+OP_STOP = "__stop__"
+# L'host ha letto il risultato: il worker può chiudere il suo blocco
+OP_RELEASE = "__release__"
+
+
+class PluginWorkerError(Exception):
+    """Errore del worker: eccezione remota, crash o timeout"""
+
+
+def encode_payload(payload: Any, threshold: int = SHM_THRESHOLD):
+    """
+    Sposta i payload grandi in un blocco di memoria condivisa
+
+    Returns:
+        (valore da inviare, blocco SharedMemory da liberare o None)
+    """
+    if isinstance(payload, str) and len(payload) >= threshold:
+        data, kind = payload.encode("utf-8"), "str"
+    elif isinstance(payload, (bytes, bytearray, memoryview)) and len(payload) >= threshold:
+        data, kind = payload, "bytes"
+    else:
+        return payload, None
+
+    size = len(data)
+    block = shared_memory.SharedMemory(create=True, size=max(1, size))
+    block.buf[:size] = data
+    return (SHM_TAG, block.name, size, kind), block
+
+
+def is_shm_descriptor(value: Any) -> bool:
+    """True se il valore è il descrittore di un blocco di memoria condivisa"""
+    return isinstance(value, tuple) and len(value) == 4 and value[0] == SHM_TAG
+
+
+def decode_payload(value: Any, unlink: bool = False) -> Any:
+    """Legge un payload, risolvendo l'eventuale descrittore di memoria condivisa"""
+    if not is_shm_descriptor(value):
+        return value
+
+    _, name, size, kind = value
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        data = block.buf[:size]
+        result = str(data, "utf-8") if kind == "str" else bytes(data)
+        data.release()
+    finally:
+        block.close()
+        if unlink:
+            block.unlink()
+    return result
+
+
+def _load_worker_class(plugin_path: str, class_name: str) -> type:
+    spec = importlib.util.spec_from_file_location("_plugin_worker_module", plugin_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return getattr(module, class_name)
+
+
+def _worker_main(conn, plugin_path: str, class_name: str, threshold: int):
+    """Ciclo del processo worker: esegue le op finché non riceve OP_STOP"""
+    worker = _load_worker_class(plugin_path, class_name)()
+    # Blocco dell'ultimo risultato, aperto finché l'host non lo ha letto
+    block = None
+    while True:
+        try:
+            request_id, op, payload = conn.recv()
+        except (EOFError, OSError):
+            break
+        # Qualsiasi messaggio arriva dopo la lettura del risultato precedente;
+        # l'unlink del blocco spetta all'host
+        if block is not None:
+            block.close()
+            block = None
+        if op == OP_STOP:
+            break
+        if op == OP_RELEASE:
+            continue
+
+        try:
+            if op.startswith("_"):
+                raise AttributeError(f"Operazione non consentita: {op}")
+            result = getattr(worker, op)(decode_payload(payload))
+            result, block = encode_payload(result, threshold)
+            conn.send((request_id, True, result))
+        except Exception as e:
+            if block is not None:
+                block.close()
+                block.unlink()
+                block = None
+            conn.send((request_id, False, f"{type(e).__name__}: {e}"))
+    if block is not None:
+        block.close()
+
+
+class PluginHost:
+    """Processo worker di un plugin, con riavvio automatico in caso di crash"""
+
+    def __init__(self, plugin_path: str, worker_class: str, timeout: float = DEFAULT_TIMEOUT,
+                 max_restarts: int = MAX_RESTARTS, shm_threshold: int = SHM_THRESHOLD):
+        self.plugin_path = plugin_path
+        self.worker_class = worker_class
+        self.timeout = timeout
+        self.max_restarts = max_restarts
+        self.shm_threshold = shm_threshold
+
+        self.restart_count = 0
+        self.crash_count = 0
+        # Diventa True dopo troppi riavvii ravvicinati
+        self.disabled = False
+        self._restart_times = []
+
+        self._context = multiprocessing.get_context("spawn")
+        self._process = None
+        self._conn = None
+        self._next_id = 0
+        # Una sola richiesta alla volta per processo
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def alive(self) -> bool:
+        return self._process is not None and self._process.is_alive()
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self._process.pid if self._process is not None else None
+
+    def start(self) -> 'PluginHost':
+        """Avvia il processo worker (se non è già attivo)"""
+        with self._lock:
+            self._ensure_started()
+        return self
+
+    def _ensure_started(self):
+        if self.alive:
+            return
+        parent_conn, child_conn = self._context.Pipe()
+        self._process = self._context.Process(
+            target=_worker_main,
+            args=(child_conn, self.plugin_path, self.worker_class, self.shm_threshold),
+            name=f"plugin-worker-{self.worker_class}",
+            daemon=True
+        )
+        self._process.start()
+        child_conn.close()
+        self._conn = parent_conn
+
+    def call(self, op: str, payload: Any = None, timeout: Optional[float] = None) -> Any:
+        """
+        Esegue un'operazione del worker e ne restituisce il risultato
+
+        Raises:
+            PluginWorkerError: se l'operazione fallisce o il worker va in crash
+        """
+        timeout = self.timeout if timeout is None else timeout
+        with self._lock:
+            if self._process is not None and not self._process.is_alive():
+                # Il worker è morto tra una chiamata e l'altra
+                self._restart("crash")
+            if self.disabled:
+                raise PluginWorkerError(f"Worker '{self.worker_class}' disabilitato dopo ripetuti crash")
+            self._ensure_started()
+            self._next_id += 1
+            request_id = self._next_id
+
+            message, block = encode_payload(payload, self.shm_threshold)
+            try:
+                self._conn.send((request_id, op, message))
+                if not self._conn.poll(timeout):
+                    self._restart("timeout")
+                    raise PluginWorkerError(f"Il worker non ha risposto a '{op}' entro {timeout}s")
+                response_id, ok, result = self._conn.recv()
+                if not ok:
+                    raise PluginWorkerError(result)
+                if is_shm_descriptor(result):
+                    # Letto sotto lock: il worker tiene il blocco finché non riceve OP_RELEASE
+                    result = decode_payload(result, unlink=True)
+                    self._conn.send((request_id, OP_RELEASE, None))
+            except (EOFError, OSError, BrokenPipeError):
+                self._restart("crash")
+                raise PluginWorkerError(f"Il worker è terminato durante '{op}'")
+            finally:
+                if block is not None:
+                    block.close()
+                    block.unlink()
+        return result
+
+    def submit(self, op: str, payload: Any = None) -> Future:
+        """Come call(), ma senza bloccare: restituisce un Future"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="plugin-host")
+        return self._executor.submit(self.call, op, payload)
+
+    def _restart(self, reason: str):
+        """Termina il worker corrente e ne avvia uno nuovo, entro il limite di riavvii"""
+        self.crash_count += 1
+        self._kill()
+
+        now = time.monotonic()
+        self._restart_times = [t for t in self._restart_times if now - t < RESTART_WINDOW_SECONDS]
+        if len(self._restart_times) >= self.max_restarts:
+            print(f"Worker '{self.worker_class}' fermato dopo troppi riavvii ({reason})")
+            self.disabled = True
+            return
+
+        self._restart_times.append(now)
+        self.restart_count += 1
+        print(f"Riavvio del worker '{self.worker_class}' ({reason})")
+        self._ensure_started()
+
+    def _kill(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        if self._process is not None:
+            if self._process.is_alive():
+                self._process.kill()
+            self._process.join(timeout=2)
+            self._process = None
+
+    def stop(self):
+        """Ferma il worker in modo ordinato"""
+        with self._lock:
+            if self.alive:
+                try:
+                    self._conn.send((0, OP_STOP, None))
+                    self._process.join(timeout=2)
+                except (OSError, BrokenPipeError):
+                    pass
+            self._kill()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+class InProcessHost:
+    """Stessa interfaccia di PluginHost, ma esegue il worker nel processo corrente"""
+
+    def __init__(self, plugin_path: str, worker_class: str):
+        self.worker = _load_worker_class(plugin_path, worker_class)()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def start(self) -> 'InProcessHost':
+        return self
+
+    def call(self, op: str, payload: Any = None, timeout: Optional[float] = None) -> Any:
+        if op.startswith("_"):
+            raise PluginWorkerError(f"Operazione non consentita: {op}")
+        try:
+            return getattr(self.worker, op)(payload)
+        except Exception as e:
+            raise PluginWorkerError(f"{type(e).__name__}: {e}")
+
+    def submit(self, op: str, payload: Any = None) -> Future:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="plugin-host")
+        return self._executor.submit(self.call, op, payload)
+
+    def stop(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
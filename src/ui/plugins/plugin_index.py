@@ -0,0 +1,118 @@
+"""
+Manifest dei plugin e indice di discovery su disco
+
+Ogni plugin dichiara un dizionario letterale PLUGIN_MANIFEST che viene letto
+con ast, senza importare il modulo. I manifest sono salvati in un indice
+JSON e riletti dal sorgente solo se mtime o dimensione del file cambiano.
+"""
+
+import ast
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+MANIFEST_NAME = "PLUGIN_MANIFEST"
+INDEX_VERSION = 1
+DEFAULT_INDEX_FILE = Path.home() / ".studio_app" / "plugin_index.json"
+
+
+def read_manifest(path: str) -> Optional[Dict[str, Any]]:
+    """
+    Estrae PLUGIN_MANIFEST dal sorgente di un plugin senza eseguirlo
+
+    Returns:
+        Il manifest, o None se il file non ne dichiara uno valido
+    """
+    try:
+        with open(path, 'rb') as f:
+            source = f.read()
+    except OSError:
+        return None
+
+    # Evita il parsing dei file che non dichiarano un manifest
+    if MANIFEST_NAME.encode("ascii") not in source:
+        return None
+
+    try:
+        tree = ast.parse(source, filename=path)
+    except SyntaxError as e:
+        print(f"Errore di sintassi nel plugin '{path}': {e}")
+        return None
+
+    for node in tree.body:
+        if (isinstance(node, ast.Assign) and
+                any(isinstance(t, ast.Name) and t.id == MANIFEST_NAME for t in node.targets)):
+            try:
+                manifest = ast.literal_eval(node.value)
+            except ValueError:
+                print(f"Il manifest di '{path}' deve essere un dizionario letterale")
+                return None
+            return manifest if isinstance(manifest, dict) else None
+    return None
+
+
+class PluginIndex:
+    """Indice dei plugin disponibili, persistito tra un avvio e l'altro"""
+
+    def __init__(self, index_file: Path = DEFAULT_INDEX_FILE):
+        self.index_file = Path(index_file)
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.parsed_count = 0
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return
+        if data.get("version") == INDEX_VERSION:
+            self.entries = data.get("plugins", {})
+
+    def scan(self, plugins_dir: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Aggiorna l'indice con i plugin presenti nella directory
+
+        Returns:
+            {nome_plugin: {"path", "mtime", "size", "manifest"}}
+        """
+        found: Dict[str, Dict[str, Any]] = {}
+        changed = False
+        self.parsed_count = 0
+
+        with os.scandir(plugins_dir) as it:
+            for item in it:
+                if not item.name.endswith('.py') or item.name.startswith('__'):
+                    continue
+                plugin_name = item.name[:-3]
+                stat = item.stat()
+
+                entry = self.entries.get(plugin_name)
+                if (entry is None or entry.get("path") != item.path or
+                        entry.get("mtime") != stat.st_mtime_ns or entry.get("size") != stat.st_size):
+                    entry = {
+                        "path": item.path,
+                        "mtime": stat.st_mtime_ns,
+                        "size": stat.st_size,
+                        "manifest": read_manifest(item.path)
+                    }
+                    self.parsed_count += 1
+                    changed = True
+                found[plugin_name] = entry
+
+        if changed or found.keys() != self.entries.keys():
+            self.entries = found
+            self._save()
+        return found
+
+    def _save(self):
+        """Scrive l'indice in modo atomico"""
+        tmp_file = self.index_file.with_suffix(".json.tmp")
+        try:
+            self.index_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump({"version": INDEX_VERSION, "plugins": self.entries}, f, indent=2)
+            os.replace(tmp_file, self.index_file)
+        except OSError as e:
+            print(f"Errore nel salvataggio dell'indice dei plugin: {e}")
@@ -5,15 +5,30 @@ Gestore dei plugin per l'architettura modulare
 import os
 import importlib
 import importlib.util
-from typing import Dict, List, Any, TYPE_CHECKING
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Set, Union, TYPE_CHECKING
 from abc import ABC, abstractmethod
+from src.ui.plugins.plugin_index import PluginIndex, DEFAULT_INDEX_FILE
+from src.ui.plugins.plugin_host import PluginHost, InProcessHost
+
+WorkerHost = Union[PluginHost, InProcessHost]
 
 if TYPE_CHECKING:
     from src.configs.settings import Settings
+    from src.services.completion_broker import CompletionBroker
+    from src.services.request_engine import RequestEngine
 
 class PluginBase(ABC):
     """Classe base per tutti i plugin"""
     
+    # Host del worker dichiarato nel manifest ("worker"), assegnato dal PluginManager
+    host: Optional[WorkerHost] = None
+    # Manager che ha caricato il plugin, assegnato prima di initialize()
+    plugin_manager: Optional['PluginManager'] = None
+    
     @abstractmethod
     def get_name(self) -> str:
         """Restituisce il nome del plugin"""
@@ -31,7 +46,7 @@ class PluginBase(ABC):
     
     @abstractmethod
     def initialize(self, settings: 'Settings') -> bool:
-        """Inizializza il plugin"""
+        """Inizializza il plugin (anche fuori dal thread di Tk: niente widget qui)"""
         pass
     
     @abstractmethod
@@ -42,82 +57,268 @@ class PluginBase(ABC):
     def cleanup(self):
         """Pulisce le risorse del plugin"""
         pass
+    
+    def get_state(self) -> Any:
+        """Stato da conservare durante un hot-reload (None se non serve)"""
+        return None
+    
+    def set_state(self, state: Any):
+        """Ripristina lo stato dopo un hot-reload, a widget già ricreato"""
+        pass
+    
+    def get_completion_broker(self) -> Optional['CompletionBroker']:
+        """Broker condiviso per le richieste al modello (None fuori dall'app)"""
+        if self.plugin_manager is None:
+            return None
+        return self.plugin_manager.get_completion_broker()
+
+DEFAULT_LOADER_WORKERS = 4
+DEFAULT_WATCH_INTERVAL_MS = 1000
 
 class PluginManager:
-    def __init__(self, settings: 'Settings'):
+    def __init__(self, settings: 'Settings', request_engine: 'RequestEngine' = None,
+                 plugins_dir: Optional[str] = None, index_file: Path = DEFAULT_INDEX_FILE):
         self.settings = settings
+        # Motore asincrono condiviso, a disposizione dei plugin per le chiamate lente
+        self.request_engine = request_engine
+        # Broker delle richieste al modello condiviso da chat e plugin, creato al primo uso
+        self._completion_broker: Optional['CompletionBroker'] = None
+        self._broker_lock = threading.Lock()
+        self.plugins_dir = plugins_dir or os.path.join(os.path.dirname(__file__), "plugins")
         self.loaded_plugins: Dict[str, PluginBase] = {}
         self.available_plugins: Dict[str, str] = {}
+        self.manifests: Dict[str, Dict[str, Any]] = {}
+        # Plugin abilitati ma non ancora importati
+        self.pending_plugins: Set[str] = set()
+        # Plugin in caricamento, con l'evento che ne segnala la fine
+        self._loading: Dict[str, threading.Event] = {}
+        # Protegge i passaggi in attesa -> in caricamento -> caricato
+        self._state_lock = threading.RLock()
+        self.index = PluginIndex(index_file)
+        
+        # Caricamento in background: un future di prontezza per plugin
+        self.ready_futures: Dict[str, Future] = {}
+        self.load_timings: Dict[str, Dict[str, float]] = {}
+        self._loader: Optional[ThreadPoolExecutor] = None
+        # Worker dei plugin, nel processo separato o in quello corrente
+        self.hosts: Dict[str, WorkerHost] = {}
+        
+        # Widget montati, per ricrearli dopo un hot-reload
+        self.mounts: Dict[str, Any] = {}
+        # Firma (mtime, inode, size) dei file osservati dal watcher
+        self._file_signatures: Dict[str, tuple] = {}
+        self.reload_timings: Dict[str, float] = {}
+        self._watch_widget = None
+        self._watch_job = None
+        self._watch_interval_ms = DEFAULT_WATCH_INTERVAL_MS
         
         self.discover_plugins()
+        self._file_signatures = self._scan_file_signatures()
     
     def discover_plugins(self):
-        """Scopre i plugin disponibili"""
-        plugins_dir = os.path.join(os.path.dirname(__file__), "plugins")
-        
-        if not os.path.exists(plugins_dir):
-            os.makedirs(plugins_dir)
+        """Scopre i plugin disponibili leggendo i manifest, senza importarli"""
+        if not os.path.exists(self.plugins_dir):
+            os.makedirs(self.plugins_dir)
             return
         
-        for item in os.listdir(plugins_dir):
-            if item.endswith('.py') and not item.startswith('__'):
-                plugin_name = item[:-3]  # Rimuovi .py
-                self.available_plugins[plugin_name] = os.path.join(plugins_dir, item)
+        entries = self.index.scan(self.plugins_dir)
+        self.available_plugins = {name: entry["path"] for name, entry in entries.items()}
+        self.manifests = {name: entry["manifest"] or {} for name, entry in entries.items()}
     
-    def load_plugin(self, plugin_name: str) -> bool:
-        """Carica un plugin"""
-        if plugin_name in self.loaded_plugins:
-            return True
+    def enable_plugin(self, plugin_name: str) -> bool:
+        """
+        Abilita un plugin rimandandone import e inizializzazione
         
-        if plugin_name not in self.available_plugins:
-            print(f"Plugin '{plugin_name}' non trovato")
-            return False
+        Il plugin viene caricato al primo get_plugin() o mount_plugin().
+        """
+        with self._state_lock:
+            if plugin_name in self.loaded_plugins or plugin_name in self._loading:
+                return True
+            
+            if plugin_name not in self.available_plugins:
+                print(f"Plugin '{plugin_name}' non trovato")
+                return False
+            
+            self.pending_plugins.add(plugin_name)
+        return True
+    
+    def load_plugin(self, plugin_name: str) -> bool:
+        """
+        Carica un plugin
         
-        try:
-            plugin_path = self.available_plugins[plugin_name]
-            spec = importlib.util.spec_from_file_location(plugin_name, plugin_path)
-            module = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(module)
+        Se un altro thread lo sta già caricando (es. il caricamento in
+        background) ne attende l'esito invece di creare una seconda istanza.
+        """
+        with self._state_lock:
+            if plugin_name in self.loaded_plugins:
+                return True
             
-            # Cerca la classe del plugin
-            plugin_class = None
-            for attr_name in dir(module):
-                attr = getattr(module, attr_name)
-                if (isinstance(attr, type) and 
-                    issubclass(attr, PluginBase) and 
-                    attr != PluginBase):
-                    plugin_class = attr
-                    break
+            if plugin_name not in self.available_plugins:
+                print(f"Plugin '{plugin_name}' non trovato")
+                return False
             
+            loading = self._loading.get(plugin_name)
+            if loading is None:
+                self._loading[plugin_name] = threading.Event()
+                self.pending_plugins.discard(plugin_name)
+        
+        if loading is not None:
+            loading.wait()
+            return self.is_plugin_loaded(plugin_name)
+        
+        try:
+            started = time.perf_counter()
+            plugin_class = self._import_plugin_class(plugin_name)
             if plugin_class is None:
                 print(f"Nessuna classe plugin valida trovata in '{plugin_name}'")
                 return False
-            
-            # Crea un'istanza del plugin
-            plugin_instance = plugin_class()
-            
-            # Inizializza il plugin
-            if plugin_instance.initialize(self.settings):
-                self.loaded_plugins[plugin_name] = plugin_instance
-                print(f"Plugin '{plugin_name}' caricato con successo")
-                return True
-            else:
-                print(f"Errore nell'inizializzazione del plugin '{plugin_name}'")
-                return False
+            return self._instantiate_plugin(plugin_name, plugin_class, started)
                 
         except Exception as e:
             print(f"Errore nel caricamento del plugin '{plugin_name}': {e}")
             return False
+        finally:
+            with self._state_lock:
+                self._loading.pop(plugin_name).set()
+    
+    def _instantiate_plugin(self, plugin_name: str, plugin_class: type, started: float) -> bool:
+        """Crea e inizializza l'istanza di un plugin già importato"""
+        imported = time.perf_counter()
+        
+        # Crea un'istanza del plugin
+        plugin_instance = plugin_class()
+        plugin_instance.plugin_manager = self
+        if self.get_manifest(plugin_name).get("worker"):
+            plugin_instance.host = self._create_host(plugin_name)
+        
+        # Inizializza il plugin
+        initialized_ok = plugin_instance.initialize(self.settings)
+        self.load_timings[plugin_name] = {
+            "import": imported - started,
+            "initialize": time.perf_counter() - imported
+        }
+        if initialized_ok:
+            with self._state_lock:
+                self.loaded_plugins[plugin_name] = plugin_instance
+            print(f"Plugin '{plugin_name}' caricato con successo")
+            return True
+        else:
+            print(f"Errore nell'inizializzazione del plugin '{plugin_name}'")
+            return False
+    
+    def _create_host(self, plugin_name: str) -> WorkerHost:
+        """
+        Crea l'host del worker del plugin
+        
+        Il processo separato parte alla prima chiamata; con "isolation": false
+        nelle impostazioni dei plugin il worker gira nel processo corrente.
+        """
+        self._stop_host(plugin_name)
+        manifest = self.get_manifest(plugin_name)
+        worker_path, worker_class = self._worker_location(plugin_name)
+        isolation = self.settings.get("plugins", {}).get("isolation", True)
+        if isolation and manifest.get("isolation") == "process":
+            host = PluginHost(worker_path, worker_class)
+        else:
+            host = InProcessHost(worker_path, worker_class)
+        self.hosts[plugin_name] = host
+        return host
+    
+    def _worker_location(self, plugin_name: str) -> tuple:
+        """
+        File e classe del worker indicati nel manifest
+        
+        "MyWorker" è una classe del file del plugin; "workers/file.py:MyWorker"
+        un file relativo alla cartella dei plugin, da tenere senza import della UI.
+        """
+        worker = self.get_manifest(plugin_name)["worker"]
+        plugin_path = self.available_plugins[plugin_name]
+        if ":" not in worker:
+            return plugin_path, worker
+        relative_path, worker_class = worker.rsplit(":", 1)
+        return os.path.join(os.path.dirname(plugin_path), relative_path), worker_class
+    
+    def _stop_host(self, plugin_name: str):
+        host = self.hosts.pop(plugin_name, None)
+        if host is not None:
+            host.stop()
+    
+    def preload_plugins(self, plugin_names: Optional[List[str]] = None) -> Dict[str, Future]:
+        """
+        Importa e inizializza in parallelo i plugin in attesa
+        
+        Va chiamato dal thread di Tk; i widget restano creati da mount_plugin().
+        
+        Returns:
+            {nome_plugin: future} che si completa con l'esito del caricamento
+        """
+        if plugin_names is None:
+            plugin_names = sorted(self.pending_plugins)
+        
+        if self._loader is None:
+            self._loader = ThreadPoolExecutor(
+                max_workers=DEFAULT_LOADER_WORKERS,
+                thread_name_prefix="plugin-loader"
+            )
+        
+        with self._state_lock:
+            for plugin_name in plugin_names:
+                if plugin_name in self.pending_plugins and plugin_name not in self.ready_futures:
+                    self.ready_futures[plugin_name] = self._loader.submit(self.load_plugin, plugin_name)
+        return {name: self.ready_futures[name] for name in plugin_names if name in self.ready_futures}
+    
+    def get_ready_future(self, plugin_name: str) -> Optional[Future]:
+        """Future di prontezza del plugin, se è in caricamento in background"""
+        return self.ready_futures.get(plugin_name)
+    
+    def _wait_ready(self, plugin_name: str):
+        """Attende l'eventuale caricamento in background del plugin"""
+        future = self.ready_futures.get(plugin_name)
+        if future is not None:
+            future.result()
+    
+    def _import_plugin_class(self, plugin_name: str) -> Optional[type]:
+        """Importa il modulo del plugin e restituisce la classe d'ingresso"""
+        plugin_path = self.available_plugins[plugin_name]
+        spec = importlib.util.spec_from_file_location(plugin_name, plugin_path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        
+        # Il manifest indica direttamente la classe da usare
+        entry = self.manifests.get(plugin_name, {}).get("entry")
+        if entry:
+            plugin_class = getattr(module, entry, None)
+            if isinstance(plugin_class, type) and issubclass(plugin_class, PluginBase):
+                return plugin_class
+            return None
+        
+        # Plugin senza manifest: cerca la classe tra gli attributi del modulo
+        for attr_name in dir(module):
+            attr = getattr(module, attr_name)
+            if (isinstance(attr, type) and 
+                issubclass(attr, PluginBase) and 
+                attr != PluginBase):
+                return attr
+        return None
     
     def unload_plugin(self, plugin_name: str) -> bool:
         """Scarica un plugin"""
-        if plugin_name not in self.loaded_plugins:
+        self._wait_ready(plugin_name)
+        with self._state_lock:
+            self.ready_futures.pop(plugin_name, None)
+            
+            if plugin_name in self.pending_plugins:
+                self.pending_plugins.discard(plugin_name)
+                return True
+            
+            plugin = self.loaded_plugins.pop(plugin_name, None)
+        if plugin is None:
             return False
         
         try:
-            plugin = self.loaded_plugins[plugin_name]
             plugin.cleanup()
-            del self.loaded_plugins[plugin_name]
+            self._stop_host(plugin_name)
+            self.mounts.pop(plugin_name, None)
             print(f"Plugin '{plugin_name}' scaricato")
             return True
         except Exception as e:
@@ -132,10 +333,205 @@ class PluginManager:
         """Restituisce la lista dei plugin disponibili"""
         return list(self.available_plugins.keys())
     
+    def get_manifest(self, plugin_name: str) -> Dict[str, Any]:
+        """Restituisce il manifest di un plugin (vuoto se non dichiarato)"""
+        return self.manifests.get(plugin_name, {})
+    
+    def get_completion_broker(self) -> Optional['CompletionBroker']:
+        """
+        Broker condiviso per le richieste di completamento
+        
+        I plugin lo usano con priorità PRIORITY_BACKGROUND (il default di
+        submit()); None se il manager non ha un motore delle richieste.
+        """
+        # I plugin possono chiederlo in parallelo dai thread di caricamento
+        with self._broker_lock:
+            if self._completion_broker is None and self.request_engine is not None:
+                # Import rimandato: CopilotService porta con sé requests
+                from src.services.completion_broker import CompletionBroker
+                from src.services.copilot_service import CopilotService
+                
+                network_config = self.settings.get("network", {})
+                self._completion_broker = CompletionBroker(
+                    CopilotService(self.settings),
+                    self.request_engine,
+                    max_concurrency=network_config.get("completion_concurrency", 3)
+                )
+            return self._completion_broker
+    
     def get_plugin(self, plugin_name: str) -> PluginBase:
-        """Restituisce un plugin specifico"""
+        """Restituisce un plugin specifico, caricandolo se era in attesa"""
+        self._wait_ready(plugin_name)
+        if plugin_name in self.pending_plugins or plugin_name in self._loading:
+            self.load_plugin(plugin_name)
         return self.loaded_plugins.get(plugin_name)
     
+    def mount_plugin(self, plugin_name: str, parent):
+        """Crea il widget di un plugin, caricandolo al primo utilizzo"""
+        plugin = self.get_plugin(plugin_name)
+        if plugin is None:
+            return None
+        widget = plugin.create_widget(parent)
+        if widget is not None:
+            self.mounts[plugin_name] = widget
+        return widget
+    
     def is_plugin_loaded(self, plugin_name: str) -> bool:
         """Controlla se un plugin è caricato"""
         return plugin_name in self.loaded_plugins
+    
+    def is_plugin_pending(self, plugin_name: str) -> bool:
+        """Controlla se un plugin è abilitato ma non ancora importato"""
+        return plugin_name in self.pending_plugins
+    
+    def is_plugin_loading(self, plugin_name: str) -> bool:
+        """Controlla se un plugin è in caricamento (in background o da un altro thread)"""
+        return plugin_name in self._loading
+    
+    # --- Hot-reload -----------------------------------------------------
+    
+    def _scan_file_signatures(self) -> Dict[str, tuple]:
+        signatures = {}
+        try:
+            with os.scandir(self.plugins_dir) as it:
+                for item in it:
+                    if item.name.endswith('.py') and not item.name.startswith('__'):
+                        stat = item.stat()
+                        signatures[item.name[:-3]] = (stat.st_mtime_ns, stat.st_ino, stat.st_size)
+        except OSError:
+            pass
+        return signatures
+    
+    def check_for_changes(self) -> List[str]:
+        """
+        Confronta i file dei plugin con l'ultimo controllo e ricarica quelli modificati
+        
+        Returns:
+            Nomi dei plugin modificati, aggiunti o rimossi
+        """
+        signatures = self._scan_file_signatures()
+        changed = [name for name, signature in signatures.items()
+                   if self._file_signatures.get(name) != signature]
+        removed = [name for name in self._file_signatures if name not in signatures]
+        self._file_signatures = signatures
+        if not changed and not removed:
+            return []
+        
+        # Il manifest potrebbe essere cambiato: aggiorna l'indice
+        self.discover_plugins()
+        for plugin_name in removed:
+            self.unload_plugin(plugin_name)
+        for plugin_name in changed:
+            if plugin_name in self.loaded_plugins:
+                self.reload_plugin(plugin_name)
+        return changed + removed
+    
+    def reload_plugin(self, plugin_name: str) -> bool:
+        """
+        Reimporta un plugin caricato, ricreandone il widget e conservandone lo stato
+        
+        Se il nuovo codice non si importa, resta attiva la versione precedente.
+        """
+        self._wait_ready(plugin_name)
+        plugin = self.loaded_plugins.get(plugin_name)
+        if plugin is None:
+            return False
+        
+        started = time.perf_counter()
+        try:
+            plugin_class = self._import_plugin_class(plugin_name)
+        except Exception as e:
+            print(f"Errore nel ricaricamento del plugin '{plugin_name}': {e}")
+            return False
+        if plugin_class is None:
+            print(f"Nessuna classe plugin valida trovata in '{plugin_name}'")
+            return False
+        
+        try:
+            state = plugin.get_state()
+        except Exception as e:
+            print(f"Errore nel salvataggio dello stato del plugin '{plugin_name}': {e}")
+            state = None
+        mount = self._capture_mount(plugin_name)
+        
+        self.unload_plugin(plugin_name)
+        try:
+            if not self._instantiate_plugin(plugin_name, plugin_class, started):
+                return False
+            new_plugin = self.loaded_plugins[plugin_name]
+            if mount is not None:
+                self._restore_mount(plugin_name, new_plugin, mount)
+            if state is not None:
+                new_plugin.set_state(state)
+        except Exception as e:
+            print(f"Errore nel ricaricamento del plugin '{plugin_name}': {e}")
+            return False
+        
+        self.reload_timings[plugin_name] = time.perf_counter() - started
+        print(f"Plugin '{plugin_name}' ricaricato in {self.reload_timings[plugin_name] * 1000:.0f} ms")
+        return True
+    
+    def _capture_mount(self, plugin_name: str):
+        """(parent, geometry manager, opzioni) del widget montato, se esiste"""
+        widget = self.mounts.get(plugin_name)
+        if widget is None or not widget.winfo_exists():
+            return None
+        manager = widget.winfo_manager()
+        info = {}
+        if manager == "pack":
+            info = widget.pack_info()
+        elif manager == "grid":
+            info = widget.grid_info()
+        elif manager == "place":
+            info = widget.place_info()
+        info.pop("in", None)
+        return widget.master, manager, info
+    
+    def _restore_mount(self, plugin_name: str, plugin: PluginBase, mount):
+        parent, manager, info = mount
+        if not parent.winfo_exists():
+            return
+        widget = plugin.create_widget(parent)
+        if widget is None:
+            return
+        self.mounts[plugin_name] = widget
+        if manager == "pack":
+            widget.pack(**info)
+        elif manager == "grid":
+            widget.grid(**info)
+        elif manager == "place":
+            widget.place(**info)
+    
+    def watch(self, widget, interval_ms: int = DEFAULT_WATCH_INTERVAL_MS):
+        """Controlla periodicamente i file dei plugin con after() nel thread di Tk"""
+        self._watch_widget = widget
+        self._watch_interval_ms = interval_ms
+        self._watch_job = widget.after(interval_ms, self._poll_changes)
+    
+    def _poll_changes(self):
+        try:
+            self.check_for_changes()
+        except Exception as e:
+            print(f"Errore nel controllo dei plugin modificati: {e}")
+        if self._watch_widget is not None:
+            self._watch_job = self._watch_widget.after(self._watch_interval_ms, self._poll_changes)
+    
+    def stop_watching(self):
+        """Ferma il controllo dei file dei plugin"""
+        if self._watch_widget is not None and self._watch_job is not None:
+            try:
+                self._watch_widget.after_cancel(self._watch_job)
+            except Exception:
+                pass
+        self._watch_widget = None
+    
+    def shutdown(self):
+        """Ferma il caricamento in background e i worker dei plugin"""
+        self.stop_watching()
+        if self._completion_broker is not None:
+            self._completion_broker.shutdown()
+        if self._loader is not None:
+            self._loader.shutdown(wait=False, cancel_futures=True)
+            self._loader = None
+        for plugin_name in list(self.hosts):
+            self._stop_host(plugin_name)
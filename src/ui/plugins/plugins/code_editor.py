@@ -2,18 +2,81 @@
 Plugin di esempio per l'editor di codice
 """
 
+import os
 import customtkinter as ctk
 import tkinter as tk
+from src.services.file_saver import BackgroundSaver, temp_path
+from src.services.syntax_highlighter import BackgroundHighlighter, TAG_COLORS
+from src.services.text_buffer import MappedTextFile
+from src.ui.event_coalescer import EventCoalescer
 from src.ui.plugins.plugin_manager import PluginBase
-from typing import TYPE_CHECKING
+from typing import Any, Dict, List, Optional, Tuple, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from src.configs.settings import Settings
 
+# Letto dal PluginManager senza importare il modulo
+PLUGIN_MANIFEST = {
+    "name": "Editor di Codice",
+    "version": "1.0.0",
+    "description": "Un semplice editor di codice con sintassi highlighting di base",
+    "entry": "CodeEditorPlugin",
+    "capabilities": ["widget"],
+    # Analisi e indicizzazione girano in un processo separato, in un modulo senza UI
+    "worker": "workers/code_editor_worker.py:CodeEditorWorker",
+    "isolation": "process"
+}
+
+# Intervallo di controllo del risultato dell'analisi (ms)
+ANALYSIS_POLL_MS = 50
+
+# Oltre questa dimensione il file viene mappato e mostrato a finestre
+LARGE_FILE_BYTES = 8 * 1024 * 1024
+# Righe presenti nel widget in modalità file grande
+WINDOW_LINES = 2000
+# Controllo della posizione di scroll per caricare la finestra successiva (ms)
+PAGE_CHECK_MS = 100
+# Frazione del widget vicino ai bordi oltre la quale si sposta la finestra
+PAGE_EDGE = 0.1
+
+# Righe lette dal widget per ogni blocco passato al thread di scrittura
+SAVE_CHUNK_LINES = 2000
+SAVE_POLL_MS = 50
+
+# Applicazione dei token dell'evidenziatore: intervallo (ms) e righe per giro
+HIGHLIGHT_POLL_MS = 30
+HIGHLIGHT_BATCH_LINES = 120
+
+EXTENSION_LANGUAGES = {
+    ".py": "Python", ".pyw": "Python",
+    ".js": "JavaScript", ".mjs": "JavaScript", ".ts": "JavaScript",
+    ".html": "HTML", ".htm": "HTML",
+    ".css": "CSS",
+    ".json": "JSON",
+    ".md": "Markdown", ".markdown": "Markdown",
+}
+
 class CodeEditorPlugin(PluginBase):
     def __init__(self):
         self.settings = None
         self.widget = None
+        
+        # Modalità file grande: il widget contiene solo le righe [window_start, window_end)
+        self.buffer: Optional[MappedTextFile] = None
+        self.window_start = 0
+        self.window_end = 0
+        self._page_job = None
+        
+        # Evidenziazione: lexing nel thread del highlighter, tag solo sulle righe visibili
+        self.highlighter: Optional[BackgroundHighlighter] = None
+        self._highlight_job = None
+        self._tagged_lines = set()
+        self._line_count = 1
+        
+        # Scrittura dei file in background
+        self.saver = BackgroundSaver()
+        self._save_future = None
+        self._save_done = None
     
     def get_name(self) -> str:
         return "Editor di Codice"
@@ -84,6 +147,39 @@ class CodeEditorPlugin(PluginBase):
         )
         save_btn.pack(side="left", padx=5, pady=5)
         
+        # Ricerca e salto a riga (sul file mappato in modalità file grande)
+        goto_btn = ctk.CTkButton(
+            toolbar_frame,
+            text="Vai a riga",
+            width=80,
+            command=self.on_goto_line
+        )
+        goto_btn.pack(side="right", padx=(5, 10), pady=5)
+        
+        search_btn = ctk.CTkButton(
+            toolbar_frame,
+            text="Cerca",
+            width=60,
+            command=self.on_search
+        )
+        search_btn.pack(side="right", padx=5, pady=5)
+        
+        self.search_entry = ctk.CTkEntry(
+            toolbar_frame,
+            width=160,
+            placeholder_text="Testo o numero di riga"
+        )
+        self.search_entry.pack(side="right", padx=5, pady=5)
+        self.search_entry.bind("<Return>", lambda e: self.on_search())
+        
+        self.analyze_btn = ctk.CTkButton(
+            toolbar_frame,
+            text="🔍 Analizza",
+            width=80,
+            command=self.analyze
+        )
+        self.analyze_btn.pack(side="left", padx=5, pady=5)
+        
         # Editor di testo
         self.text_editor = ctk.CTkTextbox(
             main_frame,
@@ -91,6 +187,9 @@ class CodeEditorPlugin(PluginBase):
             font=ctk.CTkFont(family="Consolas", size=12)
         )
         self.text_editor.pack(fill="both", expand=True, padx=5, pady=(0, 5))
+        self.text_editor.tag_config("lint_problem", underline=True, foreground="#e5a50a")
+        for tag, color in TAG_COLORS.items():
+            self.text_editor.tag_config(tag, foreground=color)
         
         # Status bar
         self.status_frame = ctk.CTkFrame(main_frame)
@@ -110,16 +209,26 @@ class CodeEditorPlugin(PluginBase):
         )
         self.position_label.pack(side="right", padx=10, pady=5)
         
-        # Bind eventi
+        # Bind eventi: posizione del cursore aggiornata al più una volta per frame
+        self.cursor_updates = EventCoalescer(self.text_editor, self.update_cursor_position)
+        self._position_text = ""
         self.text_editor.bind("<KeyRelease>", self.on_text_change)
         self.text_editor.bind("<Button-1>", self.on_cursor_move)
+        # Modifiche che non seguono il cursore: si risincronizza tutto il testo
+        for sequence in ("<<Paste>>", "<<Cut>>", "<<Undo>>", "<<Redo>>"):
+            self.text_editor.bind(sequence, lambda e: self.text_editor.after_idle(self._reset_highlight))
+        
+        self.highlighter = BackgroundHighlighter(self.language_option.get())
+        self._highlight_job = self.text_editor.after(HIGHLIGHT_POLL_MS, self._highlight_tick)
         
         self.widget = main_frame
         return main_frame
     
     def new_file(self):
         """Crea un nuovo file"""
+        self.close_large_file()
         self.text_editor.delete("1.0", "end")
+        self._reset_highlight()
         self.status_label.configure(text="Nuovo file")
     
     def open_file(self):
@@ -140,11 +249,22 @@ class CodeEditorPlugin(PluginBase):
             )
             
             if filename:
+                language = EXTENSION_LANGUAGES.get(os.path.splitext(filename)[1].lower())
+                if language:
+                    self.language_option.set(language)
+                    self.highlighter.set_language(language)
+                
+                if os.path.getsize(filename) >= LARGE_FILE_BYTES:
+                    self.open_large_file(filename)
+                    return
+                
+                self.close_large_file()
                 with open(filename, 'r', encoding='utf-8') as f:
                     content = f.read()
                 
                 self.text_editor.delete("1.0", "end")
                 self.text_editor.insert("1.0", content)
+                self._reset_highlight()
                 self.status_label.configure(text=f"Aperto: {filename}")
                 
         except Exception as e:
@@ -152,6 +272,9 @@ class CodeEditorPlugin(PluginBase):
     
     def save_file(self):
         """Salva il file"""
+        if self._save_future is not None:
+            self.status_label.configure(text="Salvataggio già in corso")
+            return
         try:
             from tkinter import filedialog
             filename = filedialog.asksaveasfilename(
@@ -170,39 +293,438 @@ class CodeEditorPlugin(PluginBase):
             )
             
             if filename:
-                content = self.text_editor.get("1.0", "end-1c")
-                with open(filename, 'w', encoding='utf-8') as f:
-                    f.write(content)
-                
-                self.status_label.configure(text=f"Salvato: {filename}")
+                if self.buffer is not None:
+                    self.save_large_file(filename)
+                else:
+                    self._save_text(filename)
                 
         except Exception as e:
             self.status_label.configure(text=f"Errore nel salvataggio: {str(e)}")
     
+    def _save_text(self, filename: str):
+        """
+        Passa il testo al thread di scrittura a blocchi di righe
+        
+        Il widget si legge solo dal thread di Tk: i blocchi vengono letti qui,
+        tutti nello stesso giro (così il file salvato è coerente), mentre
+        codifica, scrittura e fsync avvengono nel thread di scrittura.
+        """
+        total = int(self.text_editor.index("end-1c").split(".")[0])
+        chunks = []
+        for start in range(1, total + 1, SAVE_CHUNK_LINES):
+            end = min(total, start + SAVE_CHUNK_LINES - 1)
+            chunk = self.text_editor.get(f"{start}.0", f"{end}.end")
+            chunks.append(chunk + "\n" if end < total else chunk)
+        self._watch_save(self.saver.save_chunks(filename, chunks), filename)
+    
+    def _watch_save(self, future, filename: str, on_done=None):
+        """Segue il salvataggio in corso; on_done viene eseguito nel thread di Tk a scrittura finita"""
+        self._save_future = future
+        self._save_done = on_done
+        self.status_label.configure(text=f"💾 Salvataggio di {os.path.basename(filename)}...")
+        self.text_editor.after(SAVE_POLL_MS, self._poll_save, future, filename)
+    
+    def _poll_save(self, future, filename: str):
+        if future is not self._save_future:
+            # Già concluso da _finish_save()
+            return
+        if not future.done():
+            self.text_editor.after(SAVE_POLL_MS, self._poll_save, future, filename)
+            return
+        
+        try:
+            message = self._finish_save()
+            self.status_label.configure(text=message or f"Salvato: {filename}")
+        except Exception as e:
+            self.status_label.configure(text=f"Errore nel salvataggio: {str(e)}")
+    
+    def _wait_for_save(self):
+        """Completa subito l'eventuale salvataggio in corso"""
+        if self._save_future is None:
+            return
+        try:
+            message = self._finish_save()
+            if message:
+                print(message)
+        except Exception as e:
+            print(f"Errore nel salvataggio: {e}")
+    
+    def _finish_save(self) -> Optional[str]:
+        """
+        Attende il salvataggio in corso e ne completa la sostituzione del file
+        
+        Restituisce l'eventuale messaggio di stato di on_done.
+        """
+        future, on_done = self._save_future, self._save_done
+        self._save_future = self._save_done = None
+        future.result()
+        if on_done is not None:
+            return on_done()
+        return None
+    
+    # --- Modalità file grande -------------------------------------------
+    
+    def open_large_file(self, filename: str):
+        """Mappa il file e mostra solo una finestra di righe attorno al viewport"""
+        self.close_large_file()
+        self.buffer = MappedTextFile(filename)
+        self.buffer.start_indexing()
+        self.window_start = self.window_end = 0
+        self._load_window(0)
+        size_mb = self.buffer.size / (1024 * 1024)
+        self.status_label.configure(text=f"📦 Aperto a finestre ({size_mb:.0f} MB): {filename}")
+        self._page_job = self.text_editor.after(PAGE_CHECK_MS, self._check_page)
+    
+    def close_large_file(self):
+        """Esce dalla modalità file grande (eventuali modifiche non salvate vanno perse)"""
+        # Il salvataggio in corso legge ancora dal file mappato
+        self._wait_for_save()
+        if self._page_job is not None:
+            self.text_editor.after_cancel(self._page_job)
+            self._page_job = None
+        if self.buffer is not None:
+            self.buffer.close()
+            self.buffer = None
+    
+    def _commit_window(self):
+        """Riporta nel buffer le modifiche fatte alla finestra corrente"""
+        if self.buffer is None or not self.text_editor.edit_modified():
+            return
+        lines = self.text_editor.get("1.0", "end-1c").split("\n")
+        self.buffer.replace_lines(self.window_start, self.window_end, lines)
+        self.window_end = self.window_start + len(lines)
+        self.text_editor.edit_modified(False)
+    
+    def _load_window(self, start: int):
+        """Sostituisce il contenuto del widget con le righe a partire da start"""
+        self._commit_window()
+        end = min(start + WINDOW_LINES, self.buffer.line_count)
+        self.text_editor.delete("1.0", "end")
+        self.text_editor.insert("1.0", self.buffer.get_text(start, end))
+        self._reset_highlight()
+        # Undo e flag di modifica valgono solo per la finestra corrente
+        self.text_editor.edit_reset()
+        self.text_editor.edit_modified(False)
+        self.window_start, self.window_end = start, end
+    
+    def _top_line(self) -> int:
+        """Riga assoluta (0-based) in cima al viewport"""
+        return self.window_start + int(self.text_editor.index("@0,0").split(".")[0]) - 1
+    
+    def _check_page(self):
+        """Sposta la finestra quando il viewport si avvicina ai suoi bordi"""
+        self._page_job = None
+        if self.buffer is None:
+            return
+        
+        first, last = self.text_editor.yview()
+        near_end = last >= 1 - PAGE_EDGE and self.window_end < self.buffer.line_count
+        near_start = first <= PAGE_EDGE and self.window_start > 0
+        if near_end or near_start:
+            top = self._top_line()
+            self._load_window(max(0, top - WINDOW_LINES // 2))
+            self.text_editor.yview(f"{top - self.window_start + 1}.0")
+        
+        self._page_job = self.text_editor.after(PAGE_CHECK_MS, self._check_page)
+    
+    def save_large_file(self, filename: str):
+        """
+        Salva il documento in background, copiando dal file mappato le parti non modificate
+        
+        Si può continuare a scrivere durante il salvataggio: viene salvato lo
+        stato del documento al momento della richiesta. L'indice delle righe si
+        completa nel thread di scrittura, non in quello di Tk.
+        """
+        self._commit_window()
+        buffer = self.buffer
+        pieces = buffer.snapshot()
+        same_file = os.path.exists(filename) and os.path.samefile(filename, buffer.path)
+        # Sovrascrivendo il file mappato la rinomina avviene nel thread di Tk, a scrittura finita
+        future = self.saver.submit(filename, lambda out: buffer.write_to(out, pieces),
+                                   replace=not same_file)
+        on_done = (lambda: self._replace_mapped_file(buffer, pieces, filename)) if same_file else None
+        self._watch_save(future, filename, on_done)
+    
+    def _replace_mapped_file(self, buffer: MappedTextFile, pieces: List[tuple],
+                             filename: str) -> Optional[str]:
+        """Sostituisce il file mappato con quello appena scritto"""
+        if buffer.snapshot() is not pieces:
+            # Modifiche fatte durante il salvataggio: il buffer legge ancora il
+            # file originale, che non si può sostituire finché è mappato (su
+            # Windows la rinomina fallisce). Il file scritto resta accanto.
+            return (f"⚠️ Modificato durante il salvataggio: salva di nuovo "
+                    f"(copia in {os.path.basename(temp_path(filename))})")
+        
+        # Nessuna modifica nel frattempo: il nuovo file ha le stesse righe, si
+        # rimappa senza toccare la finestra (le modifiche non ancora riportate
+        # nel buffer restano nel widget)
+        self.buffer = None
+        buffer.close()
+        os.replace(temp_path(filename), filename)
+        self.buffer = MappedTextFile(filename)
+        self.buffer.start_indexing()
+        return None
+    
+    # --- Ricerca e salto a riga ---------------------------------------
+    
+    def _cursor_line(self) -> Tuple[int, int]:
+        """(riga assoluta 0-based, colonna) del cursore"""
+        line, column = self.text_editor.index(tk.INSERT).split(".")
+        return self.window_start + int(line) - 1, int(column)
+    
+    def goto_line(self, line: int, column: int = 0, length: int = 0):
+        """Porta il cursore su una riga assoluta (0-based), caricando la finestra se serve"""
+        if self.buffer is not None:
+            line = max(0, min(line, self.buffer.line_count - 1))
+            margin = WINDOW_LINES // 10
+            inside = self.window_start <= line < self.window_end
+            near_edge = ((line < self.window_start + margin and self.window_start > 0) or
+                         (line >= self.window_end - margin and self.window_end < self.buffer.line_count))
+            if not inside or near_edge:
+                self._load_window(max(0, line - WINDOW_LINES // 2))
+        
+        index = f"{line - self.window_start + 1}.{column}"
+        self.text_editor.mark_set(tk.INSERT, index)
+        self.text_editor.tag_remove("sel", "1.0", "end")
+        if length:
+            self.text_editor.tag_add("sel", index, f"{index}+{length}c")
+        self.text_editor.see(index)
+        self.update_cursor_position()
+    
+    def on_goto_line(self):
+        """Salta alla riga indicata nel campo di ricerca"""
+        value = self.search_entry.get().strip()
+        if not value.isdigit():
+            self.status_label.configure(text="Inserisci un numero di riga")
+            return
+        self.goto_line(int(value) - 1)
+    
+    def on_search(self):
+        """Cerca il testo indicato dopo il cursore, ricominciando dall'inizio se serve"""
+        query = self.search_entry.get()
+        if not query:
+            return
+        
+        cursor_line, cursor_column = self._cursor_line()
+        if self.buffer is not None:
+            self._commit_window()
+            match = self.buffer.find(query, cursor_line)
+            if match is not None and match[0] == cursor_line and match[1] <= cursor_column:
+                # Risultato già sotto il cursore: passa al successivo
+                line_text = self.buffer.get_lines(cursor_line, cursor_line + 1)[0]
+                column = line_text.find(query, cursor_column + 1)
+                match = (cursor_line, column) if column >= 0 else self.buffer.find(query, cursor_line + 1)
+            if match is None:
+                match = self.buffer.find(query, 0)
+        else:
+            position = self.text_editor.search(query, f"{tk.INSERT}+1c", stopindex="end")
+            if not position:
+                position = self.text_editor.search(query, "1.0", stopindex="end")
+            match = None
+            if position:
+                line, column = position.split(".")
+                match = (int(line) - 1, int(column))
+        
+        if match is None:
+            self.status_label.configure(text=f"Nessun risultato per '{query}'")
+            return
+        self.goto_line(match[0], match[1], len(query))
+        self.status_label.configure(text=f"Trovato alla riga {match[0] + 1}")
+    
+    def analyze(self):
+        """Analizza il sorgente nel worker senza bloccare l'interfaccia"""
+        if self.host is None:
+            self.status_label.configure(text="Analisi non disponibile")
+            return
+        
+        text = self.text_editor.get("1.0", "end-1c")
+        self.analyze_btn.configure(state="disabled")
+        self.status_label.configure(text="Analisi in corso...")
+        self._poll_analysis(self.host.submit("lint", text))
+    
+    def _poll_analysis(self, future):
+        if not future.done():
+            self.text_editor.after(ANALYSIS_POLL_MS, self._poll_analysis, future)
+            return
+        
+        self.analyze_btn.configure(state="normal")
+        self.text_editor.tag_remove("lint_problem", "1.0", "end")
+        try:
+            problems = future.result()
+        except Exception as e:
+            self.status_label.configure(text=f"Errore nell'analisi: {e}")
+            return
+        
+        for problem in problems:
+            line = problem["line"]
+            self.text_editor.tag_add("lint_problem", f"{line}.0", f"{line}.end")
+        if problems:
+            first = problems[0]
+            self.status_label.configure(
+                text=f"⚠️ {len(problems)} problemi - riga {first['line']}: {first['message']}"
+            )
+        else:
+            self.status_label.configure(text="✅ Nessun problema trovato")
+    
     def on_language_change(self, language: str):
         """Gestisce il cambio di linguaggio"""
         self.status_label.configure(text=f"Linguaggio: {language}")
-        # Qui si potrebbe implementare syntax highlighting specifico
+        self.highlighter.set_language(language)
+        self._clear_highlight_tags()
     
     def on_text_change(self, event=None):
         """Gestisce i cambiamenti nel testo"""
-        self.update_cursor_position()
+        self._sync_highlight_edit()
+        self.cursor_updates(event)
+    
+    # --- Evidenziazione della sintassi ---------------------------------
+    
+    def _reset_highlight(self):
+        """Passa all'evidenziatore l'intero contenuto del widget"""
+        self.highlighter.set_text(self.text_editor.get("1.0", "end-1c"))
+        self._line_count = int(self.text_editor.index("end-1c").split(".")[0])
+        self._clear_highlight_tags()
+    
+    def _clear_highlight_tags(self):
+        for tag in TAG_COLORS:
+            self.text_editor.tag_remove(tag, "1.0", "end")
+        self._tagged_lines = set()
+    
+    def _sync_highlight_edit(self):
+        """
+        Comunica all'evidenziatore le righe modificate dall'ultimo tasto
+        
+        Costo costante: si leggono solo il numero di righe e le righe attorno
+        al cursore, mai l'intero testo.
+        """
+        line_count = int(self.text_editor.index("end-1c").split(".")[0])
+        cursor = int(self.text_editor.index(tk.INSERT).split(".")[0])
+        delta = line_count - self._line_count
+        self._line_count = line_count
+        
+        if delta >= 0:
+            # Righe inserite prima del cursore (es. Invio o incolla): [cursor-delta, cursor]
+            first = max(1, cursor - delta)
+            old_range = (first - 1, first)
+            new_text = self.text_editor.get(f"{first}.0", f"{cursor}.end")
+        else:
+            # Righe unite al cursore (es. Backspace a inizio riga)
+            first = cursor
+            old_range = (first - 1, first - delta)
+            new_text = self.text_editor.get(f"{first}.0", f"{first}.end")
+        
+        self.highlighter.replace_lines(old_range[0], old_range[1], new_text.split("\n"))
+        # I tag di Tk seguono il testo: si spostano solo gli indici delle righe
+        # già evidenziate dopo quelle sostituite
+        old_last = first + old_range[1] - old_range[0] - 1
+        self._tagged_lines = {line if line < first else line + delta
+                              for line in self._tagged_lines
+                              if line < first or line > old_last}
+    
+    def _visible_lines(self) -> Tuple[int, int]:
+        """Righe (1-based) [prima, ultima] visibili nel widget"""
+        first = int(self.text_editor.index("@0,0").split(".")[0])
+        last = int(self.text_editor.index(f"@0,{self.text_editor.winfo_height()}").split(".")[0])
+        return first, last
+    
+    def _highlight_tick(self):
+        """Applica a blocchi i token pronti, solo per le righe visibili"""
+        self._highlight_job = None
+        if self.highlighter is None:
+            return
+        
+        # Righe rianalizzate: i loro tag vanno riapplicati
+        for start, end in self.highlighter.drain_changes():
+            self._tagged_lines = {line for line in self._tagged_lines
+                                  if not (start < line <= end)}
+        
+        first, last = self._visible_lines()
+        todo = [line for line in range(first, last + 1) if line not in self._tagged_lines]
+        if todo:
+            todo = todo[:HIGHLIGHT_BATCH_LINES]
+            for line_index, tokens in self.highlighter.tokens_for(todo[0] - 1, todo[-1]):
+                line = line_index + 1
+                if tokens is None or line not in todo:
+                    continue
+                for tag in TAG_COLORS:
+                    self.text_editor.tag_remove(tag, f"{line}.0", f"{line}.end")
+                for start, end, tag in tokens:
+                    self.text_editor.tag_add(tag, f"{line}.{start}", f"{line}.{end}")
+                self._tagged_lines.add(line)
+        
+        self._highlight_job = self.text_editor.after(HIGHLIGHT_POLL_MS, self._highlight_tick)
     
     def on_cursor_move(self, event=None):
         """Gestisce il movimento del cursore"""
-        self.text_editor.after(10, self.update_cursor_position)
+        # Il cursore si sposta dopo questo handler: l'aggiornamento è comunque differito
+        self.cursor_updates(event)
     
     def update_cursor_position(self):
         """Aggiorna la posizione del cursore"""
         try:
-            cursor_pos = self.text_editor.index(tk.INSERT)
-            line, column = cursor_pos.split('.')
-            self.position_label.configure(text=f"Riga: {line}, Colonna: {int(column) + 1}")
+            line, column = self._cursor_line()
+            text = f"Riga: {line + 1}, Colonna: {column + 1}"
+            if text != self._position_text:
+                self._position_text = text
+                self.position_label.configure(text=text)
         except:
             pass
     
+    def get_state(self) -> Optional[Dict[str, Any]]:
+        """Testo, cursore e linguaggio, conservati durante un hot-reload"""
+        if self.widget is None:
+            return None
+        # La nuova istanza deve ricevere il buffer del file già sostituito
+        self._wait_for_save()
+        if self.buffer is not None:
+            # Il buffer mappato (con le modifiche) passa alla nuova istanza
+            self._commit_window()
+            state = {
+                "buffer": self.buffer,
+                "cursor_line": self._cursor_line()[0],
+                "language": self.language_option.get()
+            }
+            if self._page_job is not None:
+                self.text_editor.after_cancel(self._page_job)
+                self._page_job = None
+            self.buffer = None
+            return state
+        return {
+            "text": self.text_editor.get("1.0", "end-1c"),
+            "cursor": self.text_editor.index(tk.INSERT),
+            "language": self.language_option.get()
+        }
+    
+    def set_state(self, state: Dict[str, Any]):
+        """Ripristina lo stato salvato da get_state()"""
+        if self.widget is None:
+            return
+        if "buffer" in state:
+            self.buffer = state["buffer"]
+            self._load_window(max(0, state["cursor_line"] - WINDOW_LINES // 2))
+            self.goto_line(state["cursor_line"])
+            self.language_option.set(state.get("language", "Python"))
+            self.highlighter.set_language(self.language_option.get())
+            self._page_job = self.text_editor.after(PAGE_CHECK_MS, self._check_page)
+            return
+        self.text_editor.delete("1.0", "end")
+        self.text_editor.insert("1.0", state.get("text", ""))
+        self._reset_highlight()
+        self.text_editor.mark_set(tk.INSERT, state.get("cursor", "1.0"))
+        self.language_option.set(state.get("language", "Python"))
+        self.highlighter.set_language(self.language_option.get())
+        self.update_cursor_position()
+    
     def cleanup(self):
         """Pulisce le risorse"""
         if self.widget:
+            self.close_large_file()
+            self.saver.shutdown()
+            self.cursor_updates.cancel()
+            if self._highlight_job is not None:
+                self.text_editor.after_cancel(self._highlight_job)
+                self._highlight_job = None
+            self.highlighter.stop()
+            self.highlighter = None
             self.widget.destroy()
             self.widget = None
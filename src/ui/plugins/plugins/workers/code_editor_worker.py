@@ -0,0 +1,47 @@
+"""
+Worker dell'editor di codice
+
+Gira nel processo del PluginHost: importa solo la libreria standard, niente
+customtkinter né moduli della UI, così il processo parte in fretta.
+"""
+
+import ast
+from typing import Any, Dict, List
+
+MAX_LINE_LENGTH = 120
+
+
+class CodeEditorWorker:
+    """Lavoro CPU-bound dell'editor, eseguito fuori dal processo di Tk"""
+    
+    def lint(self, text: str) -> List[Dict[str, Any]]:
+        """Errori di sintassi Python, righe troppo lunghe e spazi finali"""
+        problems = []
+        try:
+            compile(text, "<editor>", "exec")
+        except SyntaxError as e:
+            problems.append({"line": e.lineno or 1, "column": e.offset or 1, "message": e.msg})
+        
+        for number, line in enumerate(text.split("\n"), start=1):
+            if len(line) > MAX_LINE_LENGTH:
+                problems.append({"line": number, "column": MAX_LINE_LENGTH + 1,
+                                 "message": f"Riga più lunga di {MAX_LINE_LENGTH} caratteri"})
+            if line != line.rstrip():
+                problems.append({"line": number, "column": len(line.rstrip()) + 1,
+                                 "message": "Spazi alla fine della riga"})
+        problems.sort(key=lambda p: (p["line"], p["column"]))
+        return problems
+    
+    def index(self, text: str) -> List[Dict[str, Any]]:
+        """Classi e funzioni definite nel sorgente, con la riga di definizione"""
+        try:
+            tree = ast.parse(text)
+        except SyntaxError:
+            return []
+        symbols = []
+        for node in ast.walk(tree):
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                kind = "class" if isinstance(node, ast.ClassDef) else "def"
+                symbols.append({"name": node.name, "kind": kind, "line": node.lineno})
+        symbols.sort(key=lambda s: s["line"])
+        return symbols
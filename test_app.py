@@ -115,6 +115,1658 @@ def test_copilot_service():
         print(f"❌ Errore nel test del servizio Copilot: {e}")
         return False
 
+def test_copilot_streaming():
+    """Testa lo streaming SSE contro il server mock locale"""
+    print("\n📡 Testando lo streaming delle risposte...")
+    
+    import time
+    from src.configs.settings import Settings
+    from src.services.completion_broker import CompletionBroker
+    from src.services.copilot_service import CopilotService
+    from src.services.mock_server import MockCompletionServer
+    from src.services.request_engine import RequestEngine
+    
+    env_keys = ["GITHUB_COPILOT_API_KEY", "OPENAI_API_KEY", "OPENAI_BASE_URL"]
+    saved_env = {key: os.environ.get(key) for key in env_keys}
+    
+    try:
+        with MockCompletionServer(reply="uno due tre quattro") as server:
+            os.environ["GITHUB_COPILOT_API_KEY"] = "test-key-1234567890"
+            os.environ["OPENAI_API_KEY"] = "test-key"
+            os.environ["OPENAI_BASE_URL"] = server.base_url
+            
+            copilot_service = CopilotService(Settings())
+            deltas = list(copilot_service.stream_message([{"role": "user", "content": "ciao"}]))
+        
+        # Stream interrotto dopo due delta: il testo arriva, poi on_error e non on_done
+        with MockCompletionServer(reply="uno due tre quattro", break_after=2) as server:
+            os.environ["OPENAI_BASE_URL"] = server.base_url
+            broken_service = CopilotService(Settings())
+            engine = RequestEngine(max_concurrency=2)
+            broker = CompletionBroker(broken_service, engine)
+            partial, finished, errors = [], [], []
+            try:
+                handle = broker.submit_stream([{"role": "user", "content": "interrotto"}],
+                                              on_item=partial.append,
+                                              on_done=lambda: finished.append(True),
+                                              on_error=errors.append)
+                handle.wait(timeout=5)
+                deadline = time.perf_counter() + 2
+                while engine.active_requests and time.perf_counter() < deadline:
+                    time.sleep(0.01)
+                engine.process_callbacks()
+            finally:
+                broker.shutdown()
+                engine.shutdown()
+        broken_ok = "".join(partial) == "uno due " and not finished and len(errors) == 1
+        
+        if len(deltas) == 4 and "".join(deltas) == "uno due tre quattro" and broken_ok:
+            ttft_ms = copilot_service.last_time_to_first_token * 1000
+            print(f"✅ Streaming funzionante: {len(deltas)} delta, primo token in {ttft_ms:.1f} ms, "
+                  f"interruzione segnalata ({errors[0]})")
+            return True
+        else:
+            print(f"❌ Delta inattesi: {deltas}, stream interrotto {partial} "
+                  f"(completato {bool(finished)}, errori {errors})")
+            return False
+            
+    except Exception as e:
+        print(f"❌ Errore nel test dello streaming: {e}")
+        return False
+    finally:
+        for key, value in saved_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+def test_http_session_pool():
+    """Testa il riuso della sessione HTTP condivisa"""
+    print("\n🔌 Testando il pool di connessioni HTTP...")
+    
+    try:
+        from src.services.http_session import get_session, close_sessions
+        
+        first = get_session("test")
+        second = get_session("test")
+        close_sessions()
+        third = get_session("test")
+        close_sessions()
+        
+        if first is second and third is not first:
+            print("✅ Sessione condivisa riusata e chiusa correttamente")
+            return True
+        else:
+            print("❌ La sessione condivisa non viene riusata")
+            return False
+            
+    except Exception as e:
+        print(f"❌ Errore nel test del pool HTTP: {e}")
+        return False
+
+def test_request_engine():
+    """Testa concorrenza limitata, streaming e annullamento del motore asyncio"""
+    print("\n⚙️ Testando il motore delle richieste...")
+    
+    import threading
+    import time
+    from src.services.request_engine import RequestEngine
+    
+    engine = RequestEngine(max_concurrency=2)
+    try:
+        running = []
+        peak = []
+        lock = threading.Lock()
+        
+        def slow_call(value):
+            with lock:
+                running.append(value)
+                peak.append(len(running))
+            time.sleep(0.05)
+            with lock:
+                running.remove(value)
+            return value * 2
+        
+        results = []
+        handles = [engine.submit(slow_call, i, on_result=results.append) for i in range(6)]
+        
+        def endless_stream():
+            while True:
+                yield "x"
+                time.sleep(0.01)
+        
+        items = []
+        stream = engine.submit_stream(endless_stream, on_item=items.append)
+        time.sleep(0.05)
+        stream.cancel()
+        
+        for handle in handles + [stream]:
+            handle.wait(timeout=2)
+        engine.process_callbacks()
+        
+        if max(peak) <= 2 and sorted(results) == [0, 2, 4, 6, 8, 10] and stream.done() and not items:
+            print(f"✅ Motore funzionante: picco di concorrenza {max(peak)}, stream annullato")
+            return True
+        else:
+            print(f"❌ Risultati inattesi: picco {max(peak)}, risultati {results}, delta {len(items)}")
+            return False
+            
+    except Exception as e:
+        print(f"❌ Errore nel test del motore delle richieste: {e}")
+        return False
+    finally:
+        engine.shutdown()
+
+def test_message_store():
+    """Testa l'archivio compatto della lista messaggi virtualizzata"""
+    print("\n💬 Testando l'archivio dei messaggi...")
+    
+    try:
+        from src.ui.components.message_list import MessageStore, estimate_line_count
+        
+        store = MessageStore()
+        for i in range(10000):
+            store.append("user" if i % 2 else "assistant", f"messaggio {i}")
+        store.set_content(9999, "ultimo")
+        
+        roles_ok = store[0]["role"] == "assistant" and store.role(1) == "user"
+        content_ok = store.content(9999) == "ultimo" and len(list(store)) == 10000
+        lines_ok = estimate_line_count("a" * 25 + "\n\nb", 10) == 5
+        
+        if roles_ok and content_ok and lines_ok:
+            print("✅ Archivio messaggi funzionante con 10000 messaggi")
+            return True
+        else:
+            print("❌ Errore nell'archivio dei messaggi")
+            return False
+            
+    except Exception as e:
+        print(f"❌ Errore nel test dell'archivio messaggi: {e}")
+        return False
+
+def test_response_cache():
+    """Testa eviction LRU, scadenza TTL e livello su disco della cache"""
+    print("\n🗄️ Testando la cache delle risposte...")
+    
+    import tempfile
+    import time
+    from src.services.response_cache import ResponseCache, make_cache_key
+    
+    try:
+        messages = [{"role": "user", "content": "Cos'è  una lista?"}]
+        same = [{"role": "USER", "content": " Cos'è una lista? "}]
+        key = make_cache_key("gpt-3.5-turbo", messages, 0, 1000)
+        normalized_ok = key == make_cache_key("gpt-3.5-turbo", same, 0, 1000)
+        
+        cache = ResponseCache(max_entries=2, ttl_seconds=60)
+        cache.put("a", "1")
+        cache.put("b", "2")
+        cache.get("a")
+        cache.put("c", "3")  # "b" è la voce usata meno di recente
+        lru_ok = cache.get("b") is None and cache.get("a") == "1"
+        
+        expiring = ResponseCache(ttl_seconds=0.01)
+        expiring.put("a", "1")
+        time.sleep(0.02)
+        ttl_ok = expiring.get("a") is None
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            ResponseCache(disk_dir=tmp_dir).put(key, "dal disco")
+            disk_cache = ResponseCache(disk_dir=tmp_dir)
+            disk_ok = disk_cache.get(key) == "dal disco" and disk_cache.stats()["disk_hits"] == 1
+        
+        if normalized_ok and lru_ok and ttl_ok and disk_ok:
+            print(f"✅ Cache funzionante: {cache.stats()}")
+            return True
+        else:
+            print(f"❌ Cache non corretta: chiave {normalized_ok}, LRU {lru_ok}, TTL {ttl_ok}, disco {disk_ok}")
+            return False
+            
+    except Exception as e:
+        print(f"❌ Errore nel test della cache: {e}")
+        return False
+
+def test_notes_journal():
+    """Testa la lettura del journal delle note: replay e recupero dopo crash"""
+    print("\n📝 Testando il journal delle note...")
+    
+    import json
+    import tempfile
+    from pathlib import Path
+    from src.services.notes_store import JournalNotesStore
+    
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            data_dir = Path(tmp_dir)
+            legacy = {"a": {"id": "a", "title": "Vecchia", "content": "da notes.json"}}
+            (data_dir / "notes.json").write_text(json.dumps(legacy), encoding="utf-8")
+            
+            reader = JournalNotesStore(data_dir)
+            legacy_ok = reader.source() == reader.legacy_file and reader.load() == legacy
+            
+            records = [{"op": "put", "note": legacy["a"]}]
+            records += [{"op": "put", "note": {"id": "b", "title": "Bozza", "content": f"versione {i}"}}
+                        for i in range(300)]
+            records.append({"op": "delete", "id": "a"})
+            journal = "".join(json.dumps(record) + "\n" for record in records)
+            # Simula un crash a metà di una scrittura
+            journal += '{"op": "put", "note": {"id": "c"'
+            (data_dir / "notes.journal").write_text(journal, encoding="utf-8")
+            
+            notes = reader.load()
+            replay_ok = (reader.source() == reader.journal_file and set(notes) == {"b"}
+                         and notes["b"]["content"] == "versione 299")
+            # Solo lettura: i file di origine restano intatti
+            untouched_ok = ((data_dir / "notes.journal").read_text(encoding="utf-8") == journal
+                            and sorted(p.name for p in data_dir.iterdir()) == ["notes.journal", "notes.json"])
+        
+        if legacy_ok and replay_ok and untouched_ok:
+            print(f"✅ Journal delle note letto correttamente ({len(records)} record)")
+            return True
+        else:
+            print(f"❌ Journal non corretto: notes.json {legacy_ok}, replay {replay_ok}, "
+                  f"file intatti {untouched_ok}")
+            return False
+            
+    except Exception as e:
+        print(f"❌ Errore nel test del journal delle note: {e}")
+        return False
+
+def test_notes_sqlite_store():
+    """Testa l'archivio SQLite delle note: migrazione e ricerca full-text"""
+    print("\n🔎 Testando l'archivio SQLite delle note...")
+    
+    import json
+    import tempfile
+    from pathlib import Path
+    from src.services.notes_store import NotesStore
+    
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            data_dir = Path(tmp_dir)
+            legacy = {
+                "a": {"id": "a", "title": "Ricetta", "content": "pomodoro e basilico"},
+                "b": {"id": "b", "title": "Pomodoro", "content": "tecnica di studio a intervalli"}
+            }
+            (data_dir / "notes.json").write_text(json.dumps(legacy), encoding="utf-8")
+            
+            store = NotesStore(data_dir)
+            migrated_ok = set(store.load()) == {"a", "b"}
+            
+            store.put({"id": "c", "title": "Ricetta", "content": "pasta al forno"})
+            store.put({"id": "a", "title": "Ricetta", "content": "pomodoro, basilico e mozzarella"})
+            store.delete("c")
+            
+            results = store.search("pomod")
+            ranked_ok = [r["id"] for r in results] == ["b", "a"]
+            updated_ok = store.get("a")["content"].endswith("mozzarella") and store.get("c") is None
+            empty_ok = store.search("  \"* ") == []
+            store.close()
+            
+            # La migrazione avviene una sola volta
+            reopened = NotesStore(data_dir)
+            once_ok = "c" not in reopened.load() and len(reopened.search("mozzarella")) == 1
+            reopened.close()
+            
+            # Scritture e letture aprono il database da sole, anche senza load()
+            fresh_dir = data_dir / "nuovo"
+            fresh = NotesStore(fresh_dir)
+            fresh.put({"id": "x", "title": "Prima nota", "content": "senza open"})
+            fresh.close()
+            fresh = NotesStore(fresh_dir)
+            lazy_ok = fresh.get("x")["content"] == "senza open"
+            fresh.close()
+            fresh = NotesStore(fresh_dir)
+            fresh.delete("x")
+            lazy_ok = lazy_ok and fresh.search("open") == [] and fresh.get("x") is None
+            fresh.close()
+        
+        if migrated_ok and ranked_ok and updated_ok and empty_ok and once_ok and lazy_ok:
+            print(f"✅ Archivio SQLite funzionante (FTS5: {store.fts_enabled})")
+            return True
+        else:
+            print(f"❌ Archivio SQLite non corretto: migrazione {migrated_ok}, ranking {ranked_ok}, "
+                  f"aggiornamento {updated_ok}, query vuota {empty_ok}, riapertura {once_ok}, "
+                  f"apertura implicita {lazy_ok}")
+            return False
+            
+    except Exception as e:
+        print(f"❌ Errore nel test dell'archivio SQLite: {e}")
+        return False
+
+def test_notes_lazy_loading():
+    """Testa indice dei metadati e caricamento su richiesta dei contenuti"""
+    print("\n📇 Testando il caricamento lazy delle note...")
+    
+    import tempfile
+    from pathlib import Path
+    from src.services.notes_store import NotesStore
+    
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = NotesStore(Path(tmp_dir), body_cache_size=2)
+            store.open()
+            for i in range(5):
+                store.put({"id": str(i), "title": f"Nota {i}", "content": "x" * (i * 100),
+                           "created_at": f"2026-01-0{i + 1}", "modified_at": None})
+            
+            meta = store.list_meta()
+            meta_ok = list(meta) == ["0", "1", "2", "3", "4"] and meta["3"]["size"] == 300
+            no_body_ok = all("content" not in note for note in meta.values())
+            
+            plan = " ".join(row[3] for row in store._conn.execute(
+                "EXPLAIN QUERY PLAN SELECT id, title, modified_at, size FROM notes ORDER BY created_at"
+            ))
+            covering_ok = "COVERING INDEX" in plan
+            
+            for note_id in ["1", "2", "3"]:
+                store.get(note_id)
+            lru_ok = list(store._bodies) == ["2", "3"] and store.get("1")["content"] == "x" * 100
+            store.close()
+        
+        if meta_ok and no_body_ok and covering_ok and lru_ok:
+            print("✅ Indice dei metadati e LRU dei contenuti funzionanti")
+            return True
+        else:
+            print(f"❌ Caricamento lazy non corretto: indice {meta_ok}, senza contenuti {no_body_ok}, "
+                  f"indice coprente {covering_ok}, LRU {lru_ok}")
+            return False
+            
+    except Exception as e:
+        print(f"❌ Errore nel test del caricamento lazy: {e}")
+        return False
+
+def test_settings_write_behind():
+    """Testa debounce, transazioni e scrittura atomica delle impostazioni"""
+    print("\n💾 Testando il salvataggio differito delle impostazioni...")
+    
+    import tempfile
+    import time
+    from src.configs.settings import Settings
+    
+    saved_home = os.environ.get("HOME")
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            os.environ["HOME"] = tmp_dir
+            settings = Settings(debounce_seconds=0.05)
+            initial_writes = settings.write_count
+            
+            # Come un trascinamento dello slider del layout
+            for percent in range(20, 80):
+                settings.set("layout", {"chat_width_percent": percent})
+            time.sleep(0.2)
+            debounce_ok = settings.write_count == initial_writes + 1
+            
+            with settings.transaction():
+                settings.set("theme", "light")
+                settings.set("window", {"width": 800, "height": 600, "maximized": False})
+            settings.flush()
+            transaction_ok = settings.write_count == initial_writes + 2
+            
+            # Disco lento: una scrittura bloccata non ferma set() nel thread di Tk
+            with settings._write_lock:
+                settings.set("layout", {"chat_width_percent": 30})
+                time.sleep(0.15)
+                start = time.perf_counter()
+                for percent in range(31, 41):
+                    settings.set("layout", {"chat_width_percent": percent})
+                set_seconds = time.perf_counter() - start
+            time.sleep(0.2)
+            slow_disk_ok = set_seconds < 0.02
+            
+            reloaded = Settings()
+            persisted_ok = (reloaded.get("theme") == "light"
+                            and reloaded.get("layout")["chat_width_percent"] == 40)
+            no_tmp_ok = not list(settings.config_dir.glob("*.tmp"))
+        
+        if debounce_ok and transaction_ok and persisted_ok and no_tmp_ok and slow_disk_ok:
+            print("✅ 61 modifiche salvate con 2 scritture atomiche")
+            return True
+        else:
+            print(f"❌ Salvataggio non corretto: debounce {debounce_ok}, transazione {transaction_ok}, "
+                  f"persistenza {persisted_ok}, file temporanei {no_tmp_ok}, disco lento {slow_disk_ok}")
+            return False
+            
+    except Exception as e:
+        print(f"❌ Errore nel test del salvataggio delle impostazioni: {e}")
+        return False
+    finally:
+        if saved_home is None:
+            os.environ.pop("HOME", None)
+        else:
+            os.environ["HOME"] = saved_home
+
+def test_plugin_manifest_discovery():
+    """Testa discovery tramite manifest, indice su disco e import differito"""
+    print("\n🧩 Testando la discovery dei plugin tramite manifest...")
+    
+    import tempfile
+    from pathlib import Path
+    from src.configs.settings import Settings
+    from src.ui.plugins.plugin_manager import PluginManager
+    
+    plugin_template = '''
+from src.ui.plugins.plugin_manager import PluginBase
+
+PLUGIN_MANIFEST = {{
+    "name": "Plugin {index}",
+    "version": "0.{index}",
+    "entry": "DemoPlugin",
+    "capabilities": ["widget"]
+}}
+
+# Effetto collaterale visibile: segna l'avvenuto import
+with open({marker!r}, "a") as f:
+    f.write("{index}\\n")
+
+class DemoPlugin(PluginBase):
+    def get_name(self): return "Plugin {index}"
+    def get_description(self): return ""
+    def get_version(self): return "0.{index}"
+    def initialize(self, settings):
+        self.initialized = True
+        return True
+    def create_widget(self, parent): return None
+'''
+    
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            plugins_dir = Path(tmp_dir) / "plugins"
+            plugins_dir.mkdir()
+            marker = Path(tmp_dir) / "imports.txt"
+            index_file = Path(tmp_dir) / "plugin_index.json"
+            for index in range(20):
+                (plugins_dir / f"demo_{index}.py").write_text(
+                    plugin_template.format(index=index, marker=str(marker)), encoding="utf-8"
+                )
+            
+            settings = Settings()
+            manager = PluginManager(settings, plugins_dir=str(plugins_dir), index_file=index_file)
+            discovery_ok = (len(manager.get_available_plugins()) == 20
+                            and manager.get_manifest("demo_3").get("version") == "0.3"
+                            and manager.index.parsed_count == 20
+                            and not marker.exists())
+            
+            # Secondo avvio: l'indice evita di rileggere i sorgenti
+            manager = PluginManager(settings, plugins_dir=str(plugins_dir), index_file=index_file)
+            cached_ok = manager.index.parsed_count == 0
+            
+            with open(plugins_dir / "demo_5.py", "a", encoding="utf-8") as f:
+                f.write("\n# modificato\n")
+            manager = PluginManager(settings, plugins_dir=str(plugins_dir), index_file=index_file)
+            reparse_ok = manager.index.parsed_count == 1
+            
+            # Abilitare non importa nulla; il primo get_plugin sì
+            for name in manager.get_available_plugins():
+                manager.enable_plugin(name)
+            deferred_ok = not marker.exists() and manager.is_plugin_pending("demo_7")
+            plugin = manager.get_plugin("demo_7")
+            lazy_ok = (plugin is not None and plugin.initialized
+                       and marker.read_text().split() == ["7"]
+                       and manager.is_plugin_loaded("demo_7")
+                       and not manager.is_plugin_pending("demo_7"))
+        
+        if discovery_ok and cached_ok and reparse_ok and deferred_ok and lazy_ok:
+            print("✅ 20 plugin scoperti senza import, indice riutilizzato, import al primo uso")
+            return True
+        else:
+            print(f"❌ Discovery non corretta: manifest {discovery_ok}, indice {cached_ok}, "
+                  f"rilettura {reparse_ok}, differito {deferred_ok}, caricamento {lazy_ok}")
+            return False
+            
+    except Exception as e:
+        print(f"❌ Errore nel test della discovery dei plugin: {e}")
+        return False
+
+def test_plugin_background_loading():
+    """Testa il caricamento parallelo dei plugin con future di prontezza"""
+    print("\n⏳ Testando il caricamento dei plugin in background...")
+    
+    import tempfile
+    import threading
+    import time
+    from pathlib import Path
+    from src.configs.settings import Settings
+    from src.ui.plugins.plugin_manager import PluginManager
+    
+    plugin_template = '''
+import threading
+import time
+from src.ui.plugins.plugin_manager import PluginBase
+
+PLUGIN_MANIFEST = {{"name": "Lento {index}", "version": "1.0", "entry": "SlowPlugin"}}
+
+class SlowPlugin(PluginBase):
+    def get_name(self): return "Lento {index}"
+    def get_description(self): return ""
+    def get_version(self): return "1.0"
+    def initialize(self, settings):
+        self.thread_name = threading.current_thread().name
+        # Solo in memoria: conta le inizializzazioni di ogni plugin
+        settings.settings.setdefault("_test_initialized", []).append("slow_{index}")
+        time.sleep(0.2)
+        return True
+    def create_widget(self, parent): return None
+'''
+    
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            plugins_dir = Path(tmp_dir) / "plugins"
+            plugins_dir.mkdir()
+            for index in range(4):
+                (plugins_dir / f"slow_{index}.py").write_text(
+                    plugin_template.format(index=index), encoding="utf-8"
+                )
+            
+            manager = PluginManager(Settings(), plugins_dir=str(plugins_dir),
+                                    index_file=Path(tmp_dir) / "plugin_index.json")
+            for name in manager.get_available_plugins():
+                manager.enable_plugin(name)
+            
+            start = time.perf_counter()
+            futures = manager.preload_plugins()
+            submit_time = time.perf_counter() - start
+            # Un caricamento esplicito durante quello in background lo attende,
+            # senza creare una seconda istanza
+            time.sleep(0.05)
+            loading_ok = (manager.is_plugin_loading("slow_3")
+                          and not manager.is_plugin_pending("slow_3")
+                          and not manager.is_plugin_loaded("slow_3"))
+            explicit_ok = manager.load_plugin("slow_3") and manager.is_plugin_loaded("slow_3")
+            results = [future.result(timeout=5) for future in futures.values()]
+            elapsed = time.perf_counter() - start
+            single_ok = sorted(manager.settings.settings.pop("_test_initialized")) == [
+                f"slow_{index}" for index in range(4)]
+            
+            plugin = manager.get_plugin("slow_2")
+            ok = (len(futures) == 4 and all(results)
+                  and loading_ok and explicit_ok and single_ok
+                  and submit_time < 0.1
+                  and elapsed < 0.6
+                  and plugin.thread_name.startswith("plugin-loader")
+                  and set(manager.load_timings) == set(futures)
+                  and all(t["initialize"] >= 0.2 for t in manager.load_timings.values()))
+            manager.shutdown()
+        
+        if ok:
+            print(f"✅ 4 plugin da 200 ms inizializzati in parallelo in {elapsed * 1000:.0f} ms")
+            return True
+        else:
+            print(f"❌ Caricamento in background non corretto: {elapsed * 1000:.0f} ms, "
+                  f"tempi {manager.load_timings}")
+            return False
+            
+    except Exception as e:
+        print(f"❌ Errore nel test del caricamento dei plugin in background: {e}")
+        return False
+
+def test_plugin_host():
+    """Testa il worker fuori processo: protocollo, memoria condivisa e riavvio"""
+    print("\n🧱 Testando l'host dei plugin fuori processo...")
+    
+    import subprocess
+    import tempfile
+    from pathlib import Path
+    from src.configs.settings import Settings
+    from src.ui.plugins.plugin_host import PluginHost, PluginWorkerError
+    from src.ui.plugins.plugin_manager import PluginManager
+    
+    worker_source = '''
+import os
+
+class DemoWorker:
+    def upper(self, text): return text.upper()
+    def pid(self, payload): return os.getpid()
+    def crash(self, payload): os._exit(3)
+    def fail(self, payload): raise ValueError("errore previsto")
+'''
+    
+    host = None
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            worker_path = Path(tmp_dir) / "demo_worker.py"
+            worker_path.write_text(worker_source, encoding="utf-8")
+            shm_before = set(os.listdir("/dev/shm")) if os.path.isdir("/dev/shm") else set()
+            
+            host = PluginHost(str(worker_path), "DemoWorker", timeout=10)
+            first_pid = host.call("pid")
+            isolated_ok = first_pid != os.getpid()
+            
+            # 1 MB: passa per la memoria condivisa in entrambe le direzioni, più volte
+            # di seguito (il worker libera il blocco del risultato dopo la conferma)
+            big_text = "abc" * 350_000
+            shm_ok = all(host.call("upper", big_text) == big_text.upper() for _ in range(3))
+            
+            # Un'eccezione remota non riavvia il worker
+            try:
+                host.call("fail")
+                remote_error_ok = False
+            except PluginWorkerError as e:
+                remote_error_ok = "errore previsto" in str(e) and host.restart_count == 0
+            
+            # Un crash viene contenuto e il worker riparte
+            try:
+                host.call("crash")
+                crash_ok = False
+            except PluginWorkerError:
+                crash_ok = True
+            second_pid = host.call("pid")
+            restart_ok = crash_ok and host.restart_count == 1 and second_pid != first_pid
+            
+            host.stop()
+            shm_after = set(os.listdir("/dev/shm")) if os.path.isdir("/dev/shm") else set()
+            no_leak_ok = shm_after <= shm_before
+        
+        # Il worker dell'editor indicato nel manifest non importa la UI
+        manager = PluginManager(Settings())
+        worker_path, worker_class = manager._worker_location("code_editor")
+        probe = (
+            "import importlib.util, sys\n"
+            f"spec = importlib.util.spec_from_file_location('w', {worker_path!r})\n"
+            "module = importlib.util.module_from_spec(spec)\n"
+            "spec.loader.exec_module(module)\n"
+            f"getattr(module, {worker_class!r})().index('def f(): pass')\n"
+            "print(any(name in sys.modules for name in ('tkinter', 'customtkinter')))"
+        )
+        ui_imported = subprocess.run([sys.executable, "-c", probe], capture_output=True,
+                                     text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+        worker_module_ok = ui_imported.stdout.strip() == "False"
+        
+        if isolated_ok and shm_ok and remote_error_ok and restart_ok and no_leak_ok and worker_module_ok:
+            print("✅ Worker isolato, payload da 1 MB in memoria condivisa, crash contenuto e riavviato")
+            return True
+        else:
+            print(f"❌ Host non corretto: isolamento {isolated_ok}, memoria condivisa {shm_ok}, "
+                  f"errore remoto {remote_error_ok}, riavvio {restart_ok}, blocchi liberati {no_leak_ok}, "
+                  f"worker senza UI {worker_module_ok}")
+            return False
+            
+    except Exception as e:
+        print(f"❌ Errore nel test dell'host dei plugin: {e}")
+        return False
+    finally:
+        if host is not None:
+            host.stop()
+
+def test_plugin_hot_reload():
+    """Testa il ricaricamento dei plugin modificati con stato conservato"""
+    print("\n♻️ Testando l'hot-reload dei plugin...")
+    
+    import tempfile
+    from pathlib import Path
+    from src.configs.settings import Settings
+    from src.ui.plugins.plugin_manager import PluginManager
+    
+    plugin_template = '''
+from src.ui.plugins.plugin_manager import PluginBase
+
+PLUGIN_MANIFEST = {{"name": "Contatore", "version": "{version}", "entry": "CounterPlugin"}}
+
+class CounterPlugin(PluginBase):
+    def __init__(self):
+        self.count = 0
+        self.cleaned_up = False
+    def get_name(self): return "Contatore"
+    def get_description(self): return ""
+    def get_version(self): return "{version}"
+    def initialize(self, settings): return True
+    def create_widget(self, parent): return None
+    def cleanup(self): self.cleaned_up = True
+    def get_state(self): return {{"count": self.count}}
+    def set_state(self, state): self.count = state["count"]
+'''
+    
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            plugins_dir = Path(tmp_dir) / "plugins"
+            plugins_dir.mkdir()
+            plugin_file = plugins_dir / "counter.py"
+            plugin_file.write_text(plugin_template.format(version="1.0"), encoding="utf-8")
+            
+            manager = PluginManager(Settings(), plugins_dir=str(plugins_dir),
+                                    index_file=Path(tmp_dir) / "plugin_index.json")
+            manager.load_plugin("counter")
+            old_plugin = manager.get_plugin("counter")
+            old_plugin.count = 42
+            unchanged_ok = manager.check_for_changes() == []
+            
+            plugin_file.write_text(plugin_template.format(version="2.0.0"), encoding="utf-8")
+            changed = manager.check_for_changes()
+            new_plugin = manager.get_plugin("counter")
+            reload_ok = (changed == ["counter"]
+                         and new_plugin is not old_plugin
+                         and new_plugin.get_version() == "2.0.0"
+                         and manager.get_manifest("counter")["version"] == "2.0.0"
+                         and old_plugin.cleaned_up
+                         and new_plugin.count == 42
+                         and manager.reload_timings["counter"] < 1.0)
+            
+            # Un file con errori lascia attiva la versione precedente
+            plugin_file.write_text("class Rotto(:\n", encoding="utf-8")
+            manager.check_for_changes()
+            broken_ok = manager.get_plugin("counter") is new_plugin
+            
+            plugin_file.unlink()
+            manager.check_for_changes()
+            removed_ok = (not manager.is_plugin_loaded("counter")
+                          and "counter" not in manager.get_available_plugins())
+        
+        if unchanged_ok and reload_ok and broken_ok and removed_ok:
+            print(f"✅ Plugin ricaricato in {manager.reload_timings['counter'] * 1000:.0f} ms con stato conservato")
+            return True
+        else:
+            print(f"❌ Hot-reload non corretto: invariato {unchanged_ok}, ricarica {reload_ok}, "
+                  f"file rotto {broken_ok}, rimozione {removed_ok}")
+            return False
+            
+    except Exception as e:
+        print(f"❌ Errore nel test dell'hot-reload dei plugin: {e}")
+        return False
+
+def test_mapped_text_file():
+    """Testa il buffer mappato per i file grandi: indice, finestre, ricerca e modifiche"""
+    print("\n📦 Testando il buffer mappato per i file grandi...")
+    
+    import tempfile
+    import time
+    from pathlib import Path
+    from src.services.text_buffer import MappedTextFile
+    
+    buffer = None
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / "grande.log"
+            with open(path, "w", encoding="utf-8") as f:
+                for i in range(200_000):
+                    f.write(f"riga {i} è un evento di log\n")
+            
+            start = time.perf_counter()
+            buffer = MappedTextFile(str(path))
+            open_time = time.perf_counter() - start
+            first_lines_ok = buffer.get_lines(0, 2) == ["riga 0 è un evento di log",
+                                                         "riga 1 è un evento di log"]
+            
+            buffer.start_indexing()
+            indexed_ok = buffer.wait_indexed(timeout=10) and buffer.line_count == 200_001
+            tail_ok = buffer.get_lines(199_999, 200_001) == ["riga 199999 è un evento di log", ""]
+            find_ok = (buffer.find("riga 123456 ") == (123456, 0)
+                       and buffer.find("evento", 5) == (5, 12)
+                       and buffer.find("inesistente") is None)
+            
+            buffer.replace_lines(10, 12, ["modificata A", "modificata B", "modificata C"])
+            edit_ok = (buffer.line_count == 200_002
+                       and buffer.get_lines(9, 14) == ["riga 9 è un evento di log", "modificata A",
+                                                       "modificata B", "modificata C",
+                                                       "riga 12 è un evento di log"]
+                       and buffer.find("modificata C") == (12, 0)
+                       and buffer.find("riga 11 ") is None
+                       and buffer.find("riga 500 ") == (501, 0))
+            buffer.close()
+            
+            # Modifiche e snapshot prima che l'indice sia completo: niente attese,
+            # e le righe indicizzate dopo restano in coda al documento
+            buffer = MappedTextFile(str(path))
+            indexed = buffer.line_count
+            start = time.perf_counter()
+            buffer.replace_lines(10, 12, ["modificata A"])
+            buffer.replace_lines(indexed - 2, indexed - 1, ["ultima indicizzata"])
+            pieces = buffer.snapshot()
+            edit_time = time.perf_counter() - start
+            pending_ok = not buffer.index_ready.is_set() and indexed < 200_000
+            saved_path = Path(tmp_dir) / "salvato.log"
+            with open(saved_path, "wb") as out:
+                buffer.write_to(out, pieces)
+            expected = [f"riga {i} è un evento di log" for i in range(200_000)] + [""]
+            expected[10:12] = ["modificata A"]
+            expected[indexed - 2] = "ultima indicizzata"
+            lazy_edit_ok = (pending_ok and edit_time < 0.05 and buffer.line_count == 200_000
+                            and saved_path.read_text(encoding="utf-8") == "\n".join(expected))
+            buffer.close()
+            buffer = None
+        
+        if (open_time < 0.5 and first_lines_ok and indexed_ok and tail_ok and find_ok and edit_ok
+                and lazy_edit_ok):
+            print(f"✅ File da 200k righe aperto in {open_time * 1000:.1f} ms, ricerca e modifiche sul buffer")
+            return True
+        else:
+            print(f"❌ Buffer non corretto: apertura {open_time:.3f}s, inizio {first_lines_ok}, "
+                  f"indice {indexed_ok}, fine {tail_ok}, ricerca {find_ok}, modifiche {edit_ok}, "
+                  f"modifiche durante l'indicizzazione {lazy_edit_ok}")
+            return False
+            
+    except Exception as e:
+        print(f"❌ Errore nel test del buffer mappato: {e}")
+        return False
+    finally:
+        if buffer is not None:
+            buffer.close()
+
+def test_syntax_highlighter():
+    """Testa il lexer incrementale e l'evidenziatore in background"""
+    print("\n🎨 Testando l'evidenziazione della sintassi...")
+    
+    from src.services.syntax_highlighter import BackgroundHighlighter, HighlightDocument, lex_line
+    
+    highlighter = None
+    try:
+        tokens, state = lex_line("Python", 'def f(x): return "ciao"  # fine')
+        tags = [tag for _, _, tag in tokens]
+        python_ok = (state == "root" and tags[0] == "hl_keyword"
+                     and "hl_string" in tags and tags[-1] == "hl_comment")
+        _, open_state = lex_line("Python", 'testo = """inizio')
+        _, js_state = lex_line("JavaScript", "let a = 1; /* commento")
+        states_ok = open_state != "root" and js_state != "root"
+        
+        # Una modifica su una riga rianalizza solo quella riga (più la convergenza)
+        source = "\n".join(f"def funzione_{i}(x):\n    return x + {i}  # riga" for i in range(5000))
+        document = HighlightDocument("Python")
+        document.set_text(source)
+        while document.relex(100_000):
+            pass
+        before = document.lexed_lines
+        document.replace_lines(4000, 4001, ["    return 'modificata'"])
+        while document.relex():
+            pass
+        relexed = document.lexed_lines - before
+        incremental_ok = relexed <= 2
+        
+        # Aprire una stringa tripla propaga lo stato: il risultato deve
+        # coincidere con un'analisi completa da zero
+        document.replace_lines(10, 11, ['    return """aperta'])
+        while document.relex():
+            pass
+        full = HighlightDocument("Python")
+        full.set_text("\n".join(document.lines))
+        while full.relex(100_000):
+            pass
+        convergence_ok = document.tokens == full.tokens and document.end_states == full.end_states
+        
+        highlighter = BackgroundHighlighter("JavaScript")
+        highlighter.set_text("const a = 1;\n// commento\nlet b = 'x';")
+        idle_ok = highlighter.wait_idle(timeout=5)
+        changes = highlighter.drain_changes()
+        ready = highlighter.tokens_for(0, 3)
+        background_ok = (idle_ok and changes == [(0, 3)]
+                         and all(tokens is not None for _, tokens in ready)
+                         and ready[1][1] == [(0, 11, "hl_comment")])
+        
+        if python_ok and states_ok and incremental_ok and convergence_ok and background_ok:
+            print(f"✅ Lexer corretto, modifica rianalizzata in {relexed} righe "
+                  f"su {len(document.lines)}")
+            return True
+        else:
+            print(f"❌ Evidenziazione non corretta: python {python_ok}, stati {states_ok}, "
+                  f"incrementale {incremental_ok}, convergenza {convergence_ok}, background {background_ok}")
+            return False
+            
+    except Exception as e:
+        print(f"❌ Errore nel test dell'evidenziazione: {e}")
+        return False
+    finally:
+        if highlighter is not None:
+            highlighter.stop()
+
+def test_background_save():
+    """Testa il salvataggio atomico a blocchi e la scrittura dal buffer mappato"""
+    print("\n💾 Testando il salvataggio in background...")
+    
+    import os
+    import tempfile
+    from pathlib import Path
+    from src.services.file_saver import BackgroundSaver, temp_path, write_atomic
+    from src.services.text_buffer import MappedTextFile
+    
+    saver = BackgroundSaver()
+    buffer = None
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / "file.txt"
+            path.write_text("contenuto originale", encoding="utf-8")
+            
+            # Un errore durante la scrittura lascia intatto il file precedente
+            def failing_write(out):
+                out.write(b"parziale")
+                raise IOError("disco pieno")
+            try:
+                write_atomic(str(path), failing_write)
+                atomic_ok = False
+            except IOError:
+                atomic_ok = (path.read_text(encoding="utf-8") == "contenuto originale"
+                             and not os.path.exists(temp_path(str(path))))
+            
+            chunks = [f"riga {i}\n" for i in range(10_000)] + ["fine"]
+            saver.save_chunks(str(path), chunks).result(timeout=10)
+            chunks_ok = path.read_text(encoding="utf-8") == "".join(chunks)
+            
+            # Le righe non modificate vengono copiate byte per byte dal file mappato,
+            # anche se non sono UTF-8 valido
+            big = Path(tmp_dir) / "grande.log"
+            original_lines = [f"evento {i}".encode() for i in range(100_000)]
+            original_lines[5] = b"latin-1: \xe8"
+            big.write_bytes(b"\n".join(original_lines))
+            buffer = MappedTextFile(str(big))
+            buffer.replace_lines(50_000, 50_002, ["modificata"])
+            pieces = buffer.snapshot()
+            future = saver.submit(str(big), lambda out: buffer.write_to(out, pieces), replace=False)
+            # Le modifiche successive non entrano nel salvataggio in corso
+            buffer.replace_lines(0, 1, ["dopo il salvataggio"])
+            future.result(timeout=10)
+            
+            buffer.close()
+            buffer = None
+            os.replace(temp_path(str(big)), str(big))
+            expected = original_lines[:50_000] + [b"modificata"] + original_lines[50_002:]
+            write_to_ok = big.read_bytes() == b"\n".join(expected)
+        
+        if atomic_ok and chunks_ok and write_to_ok:
+            print("✅ Salvataggio atomico, a blocchi e con copia diretta dal file mappato")
+            return True
+        else:
+            print(f"❌ Salvataggio non corretto: atomico {atomic_ok}, blocchi {chunks_ok}, "
+                  f"file mappato {write_to_ok}")
+            return False
+            
+    except Exception as e:
+        print(f"❌ Errore nel test del salvataggio: {e}")
+        return False
+    finally:
+        saver.shutdown()
+        if buffer is not None:
+            buffer.close()
+
+def test_event_coalescer():
+    """Testa il raggruppamento degli eventi in una sola chiamata per frame"""
+    print("\n⏱️ Testando il raggruppamento degli eventi...")
+    
+    import time
+    from src.ui.event_coalescer import EventCoalescer
+    
+    class Scheduler:
+        """Coda di after() eseguita a mano, al posto del mainloop di Tk"""
+        def __init__(self):
+            self.jobs = {}
+            self.next_id = 0
+        
+        def after(self, ms, func, *args):
+            self.next_id += 1
+            self.jobs[self.next_id] = (func, args)
+            return self.next_id
+        
+        def after_cancel(self, job):
+            self.jobs.pop(job, None)
+        
+        def run_pending(self):
+            jobs, self.jobs = self.jobs, {}
+            for func, args in jobs.values():
+                func(*args)
+    
+    try:
+        widget = Scheduler()
+        calls = []
+        
+        # Raffica di key-repeat: un solo after() e una sola chiamata
+        frame = EventCoalescer(widget, lambda: calls.append("frame"))
+        for _ in range(50):
+            frame("evento")
+        frame_ok = len(widget.jobs) == 1 and widget.next_id == 1
+        widget.run_pending()
+        frame_ok = frame_ok and calls == ["frame"] and frame.stats() == {
+            "events": 50, "runs": 1, "coalesced": 49, "dropped": 0
+        }
+        
+        # Debounce: si esegue solo dopo la pausa, senza un after() per ogni tasto
+        calls.clear()
+        scheduled_before = widget.next_id
+        debounce = EventCoalescer(widget, lambda: calls.append("debounce"), debounce_ms=30)
+        for _ in range(10):
+            debounce()
+            time.sleep(0.005)
+        widget.run_pending()
+        waited_ok = calls == [] and debounce.pending
+        time.sleep(0.05)
+        widget.run_pending()
+        timers = widget.next_id - scheduled_before
+        debounce_ok = waited_ok and calls == ["debounce"] and debounce.runs == 1 and timers == 2
+        
+        # flush() esegue subito, cancel() scarta e conta gli eventi persi
+        debounce()
+        debounce.flush()
+        debounce()
+        debounce()
+        debounce.cancel()
+        widget.run_pending()
+        control_ok = (calls == ["debounce", "debounce"] and debounce.dropped == 2
+                      and not debounce.pending)
+        
+        if frame_ok and debounce_ok and control_ok:
+            print(f"✅ 50 eventi in 1 chiamata, debounce con {timers} timer")
+            return True
+        else:
+            print(f"❌ Raggruppamento non corretto: frame {frame_ok}, debounce {debounce_ok}, "
+                  f"flush/cancel {control_ok}")
+            return False
+            
+    except Exception as e:
+        print(f"❌ Errore nel test del raggruppamento degli eventi: {e}")
+        return False
+
+def test_benchmark_harness():
+    """Testa la misura dei benchmark: percentili, filtri e confronto tra report"""
+    print("\n📈 Testando l'harness dei benchmark...")
+    
+    try:
+        from benchmarks.harness import BenchmarkRunner, compare_reports, percentile
+        
+        ordered = [float(i) for i in range(1, 101)]
+        percentile_ok = (percentile(ordered, 50) == 50.5 and percentile(ordered, 0) == 1.0
+                         and percentile(ordered, 100) == 100.0
+                         and abs(percentile(ordered, 95) - 95.05) < 1e-9)
+        
+        calls = []
+        runner = BenchmarkRunner(warmup=2, repeats=5, only=["somma"], verbose=False)
+        result = runner.run("somma", lambda: calls.append(sum(range(1000))), params={"n": 1000})
+        skipped = runner.run("altro", lambda: calls.append(0))
+        runner_ok = (len(calls) == 7 and skipped is None and len(result["samples"]) == 5
+                     and result["stats"]["min"] <= result["stats"]["p50"] <= result["stats"]["max"]
+                     and result["params"] == {"n": 1000})
+        
+        baseline = {"results": [{"name": "a", "stats": {"p50": 10.0}},
+                                {"name": "b", "stats": {"p50": 10.0}}]}
+        current = {"results": [{"name": "a", "stats": {"p50": 10.5}},
+                               {"name": "b", "stats": {"p50": 13.0}},
+                               {"name": "nuovo", "stats": {"p50": 1.0}}]}
+        comparison = {item["name"]: item["regression"] for item in compare_reports(baseline, current, 0.2)}
+        compare_ok = comparison == {"a": False, "b": True}
+        
+        if percentile_ok and runner_ok and compare_ok:
+            print("✅ Percentili, riscaldamento, filtri e rilevamento delle regressioni corretti")
+            return True
+        else:
+            print(f"❌ Harness non corretto: percentili {percentile_ok}, runner {runner_ok}, "
+                  f"confronto {compare_ok}")
+            return False
+            
+    except Exception as e:
+        print(f"❌ Errore nel test dell'harness dei benchmark: {e}")
+        return False
+
+def test_startup_profiler():
+    """Testa il profilo dell'avvio: tempi di import per modulo, fasi e budget"""
+    print("\n⏱️ Testando il profilo dell'avvio...")
+    
+    import contextlib
+    import io
+    import json
+    import tempfile
+    import time
+    from pathlib import Path
+    from src.startup_profiler import StartupProfiler, parse_args
+    
+    profiler = None
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # Modulo lento che importa a sua volta un altro modulo lento
+            (Path(tmp_dir) / "avvio_lento_a.py").write_text(
+                "import time\nimport avvio_lento_b\ntime.sleep(0.02)\n", encoding="utf-8")
+            (Path(tmp_dir) / "avvio_lento_b.py").write_text(
+                "import time\ntime.sleep(0.03)\n", encoding="utf-8")
+            report_file = Path(tmp_dir) / "profilo.json"
+            
+            sys.path.insert(0, tmp_dir)
+            try:
+                profiler = StartupProfiler(total_budget_ms=10, report_file=str(report_file))
+                import avvio_lento_a
+                profiler.mark("imports")
+                time.sleep(0.01)
+                profiler.mark("settings")
+                profiler.skip("widget_build", "nessun display")
+                with contextlib.redirect_stdout(io.StringIO()):
+                    code = profiler.finish()
+                profiler = None
+            finally:
+                sys.path.remove(tmp_dir)
+                for name in ("avvio_lento_a", "avvio_lento_b"):
+                    sys.modules.pop(name, None)
+            
+            report = json.loads(report_file.read_text(encoding="utf-8"))
+            modules = {item["module"]: item for item in report["modules"]}
+            a, b = modules.get("avvio_lento_a"), modules.get("avvio_lento_b")
+            imports_ok = (a is not None and b is not None
+                          and 15 <= a["self_ms"] < a["cumulative_ms"]
+                          and a["cumulative_ms"] >= b["cumulative_ms"] + a["self_ms"] - 1
+                          and b["self_ms"] >= 25
+                          and avvio_lento_a.__loader__.__class__.__name__ != "_TimedLoader")
+            phases_ok = (report["phases_ms"]["imports"] >= 50 and report["phases_ms"]["settings"] >= 10
+                         and report["notes"]["widget_build"] == "nessun display")
+            budget_ok = code == 1 and len(report["failures"]) == 1
+        
+        options = parse_args(["--profile-startup", "--startup-budget", "800", "--import-budget=300"])
+        args_ok = options == {"total_budget_ms": 800.0, "import_budget_ms": 300.0}
+        
+        if imports_ok and phases_ok and budget_ok and args_ok:
+            print(f"✅ Import misurati per modulo ({a['self_ms']:.0f}/{a['cumulative_ms']:.0f} ms), "
+                  f"budget superato segnalato")
+            return True
+        else:
+            print(f"❌ Profilo non corretto: import {imports_ok}, fasi {phases_ok}, "
+                  f"budget {budget_ok}, opzioni {args_ok}")
+            return False
+            
+    except Exception as e:
+        print(f"❌ Errore nel test del profilo dell'avvio: {e}")
+        return False
+    finally:
+        if profiler is not None:
+            profiler.imports.uninstall()
+
+def test_context_builder():
+    """Testa la finestra di contesto della chat con budget di token e riassunto"""
+    print("\n🧠 Testando la finestra di contesto della chat...")
+    
+    import time
+    from src.services.context_builder import ContextBuilder, estimate_tokens
+    
+    def payload_tokens(messages):
+        return sum(estimate_tokens(message["content"]) for message in messages)
+    
+    try:
+        # Conversazione breve: tutto entra nel budget, nessun riassunto
+        short = ContextBuilder(max_tokens=1000)
+        short.append("user", "ciao")
+        short.append("assistant", "ciao, come posso aiutarti?")
+        short_ok = short.build() == [{"role": "user", "content": "ciao"},
+                                     {"role": "assistant", "content": "ciao, come posso aiutarti?"}]
+        
+        # Conversazione lunga: payload entro il budget, messaggi recenti in ordine
+        context = ContextBuilder(max_tokens=600, summary_tokens=150, max_messages=200)
+        timings = {}
+        appended = 0
+        for count in (1_000, 50_000):
+            for i in range(appended, count):
+                role = "user" if i % 2 == 0 else "assistant"
+                context.append(role, f"messaggio {i}: " + "testo " * (i % 30))
+                if i % 50 == 0:
+                    context.build()
+            appended = count
+            start = time.perf_counter()
+            for _ in range(200):
+                messages = context.build()
+            timings[count] = time.perf_counter() - start
+        
+        recent = [m["content"] for m in messages[1:]]
+        budget_ok = payload_tokens(messages) <= 600
+        order_ok = (recent[-1].startswith("messaggio 49999:")
+                    and recent == sorted(recent, key=lambda c: int(c.split(":")[0].split()[1])))
+        summary_ok = (messages[0]["role"] == "system"
+                      and estimate_tokens(messages[0]["content"]) <= 150 + 4
+                      and context.summarized_count + len(recent) == 50_000)
+        # Il costo non cresce con la lunghezza della conversazione
+        constant_ok = timings[50_000] < timings[1_000] * 5 + 0.05
+        
+        # La risposta arrivata in streaming aggiorna la stima dell'ultimo messaggio
+        context.append("assistant", "")
+        context.update_last("risposta completa " * 20)
+        update_ok = context.build()[-1]["content"] == "risposta completa " * 20
+        
+        # Un singolo messaggio oltre il budget viene troncato, tenendone la fine
+        huge = ContextBuilder(max_tokens=100, summary_tokens=20)
+        huge.append("user", "inizio " + "x" * 5000 + " fine")
+        trimmed = huge.build()[-1]["content"]
+        trim_ok = trimmed.endswith(" fine") and estimate_tokens(trimmed) <= 100
+        
+        if short_ok and budget_ok and order_ok and summary_ok and constant_ok and update_ok and trim_ok:
+            print(f"✅ Payload di {payload_tokens(messages)} token su 50k messaggi, "
+                  f"build in {timings[50_000] / 200 * 1e6:.0f} µs")
+            return True
+        else:
+            print(f"❌ Contesto non corretto: breve {short_ok}, budget {budget_ok}, ordine {order_ok}, "
+                  f"riassunto {summary_ok}, costo costante {constant_ok}, aggiornamento {update_ok}, "
+                  f"troncamento {trim_ok}")
+            return False
+            
+    except Exception as e:
+        print(f"❌ Errore nel test della finestra di contesto: {e}")
+        return False
+
+def test_conversation_store():
+    """Testa l'archivio delle conversazioni: coda, pagine, ricerca e compattazione"""
+    print("\n🗂️ Testando l'archivio delle conversazioni...")
+    
+    import os
+    import tempfile
+    import time
+    from pathlib import Path
+    from src.services import conversation_store
+    from src.services.conversation_store import ConversationStore
+    
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            data_dir = Path(tmp_dir)
+            store = ConversationStore(data_dir)
+            session_id = store.create_session("Refactoring del parser Python")
+            other_id = store.create_session("Ricette di cucina")
+            for i in range(10_000):
+                store.append(session_id, "user" if i % 2 == 0 else "assistant", f"messaggio {i}")
+            store.append(other_id, "user", "pasta al pomodoro")
+            store.close()
+            
+            # Riapertura: si legge solo la coda, le pagine precedenti su richiesta
+            reopened = ConversationStore(data_dir)
+            start = time.perf_counter()
+            first, tail = reopened.tail(session_id, 50)
+            tail_ms = (time.perf_counter() - start) * 1000
+            tail_ok = (first == 9_950 and len(tail) == 50
+                       and tail[-1] == {"role": "assistant", "content": "messaggio 9999"})
+            page = reopened.read_messages(session_id, first - 50, first)
+            page_ok = [m["content"] for m in page] == [f"messaggio {i}" for i in range(9_900, 9_950)]
+            
+            # Elenco dalla più recente e ricerca per titolo
+            listed = [s["id"] for s in reopened.list_sessions()]
+            found = [s["id"] for s in reopened.search_sessions("python REFACTORING")]
+            search_ok = (listed == [other_id, session_id] or listed == [session_id, other_id]) \
+                and found == [session_id] and reopened.search_sessions("javascript") == []
+            
+            # Risposta salvata più volte durante lo streaming: la compattazione
+            # elimina le versioni superate
+            index = reopened.append(session_id, "assistant", "")
+            base_size = os.path.getsize(data_dir / f"{session_id}.log")
+            written = 0
+            for step in range(1, 200):
+                content = "parziale " * step * 20
+                reopened.update_message(session_id, index, content)
+                written += len(content)
+            reopened.close()
+            log_size = os.path.getsize(data_dir / f"{session_id}.log")
+            live_size = base_size + len(content) + 100
+            compact_ok = written > 2 * live_size and log_size <= conversation_store.COMPACT_RATIO * live_size
+            
+            # Un crash tra log e indice: l'indice viene ricostruito dal log
+            index_path = data_dir / f"{session_id}.idx"
+            with open(index_path, 'r+b') as f:
+                f.truncate(conversation_store.INDEX_ENTRY_BYTES * 9_000)
+            recovered = ConversationStore(data_dir)
+            recover_ok = (recovered.message_count(session_id) == 10_001
+                          and recovered.read_messages(session_id, index, index + 1)[0]["content"]
+                          == "parziale " * 199 * 20
+                          and recovered.read_messages(session_id, 9_500, 9_501)[0]["content"]
+                          == "messaggio 9500")
+            recovered.close()
+        
+        if tail_ok and page_ok and search_ok and compact_ok and recover_ok:
+            print(f"✅ Coda di 50 messaggi su 10k in {tail_ms:.1f} ms, log compattato a {log_size} byte")
+            return True
+        else:
+            print(f"❌ Archivio non corretto: coda {tail_ok}, pagine {page_ok}, ricerca {search_ok}, "
+                  f"compattazione {compact_ok}, recupero {recover_ok}")
+            return False
+            
+    except Exception as e:
+        print(f"❌ Errore nel test dell'archivio delle conversazioni: {e}")
+        return False
+
+def test_completion_broker():
+    """Testa coda con priorità, single-flight e limite di concorrenza del broker"""
+    print("\n📮 Testando il broker delle richieste di completamento...")
+    
+    import threading
+    import time
+    from src.services.completion_broker import (PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE,
+                                                CompletionBroker)
+    from src.services.request_engine import RequestEngine
+    
+    class FakeService:
+        model = "modello-test"
+        temperature = 0.0
+        max_tokens = 100
+        
+        def __init__(self):
+            self.calls = []
+            self.running = 0
+            self.peak = 0
+            self.lock = threading.Lock()
+        
+        def send_message(self, messages):
+            with self.lock:
+                self.calls.append(messages[-1]["content"])
+                self.running += 1
+                self.peak = max(self.peak, self.running)
+            time.sleep(0.05)
+            with self.lock:
+                self.running -= 1
+            return "risposta a " + messages[-1]["content"]
+        
+        def stream_message(self, messages):
+            for word in ("risposta", " in", " streaming"):
+                yield word
+    
+    engine = RequestEngine(max_concurrency=4)
+    service = FakeService()
+    broker = CompletionBroker(service, engine, max_concurrency=2, reserved_interactive=1)
+    try:
+        def ask(text):
+            return [{"role": "user", "content": text}]
+        
+        # Cinque richieste identiche in volo: una sola chiamata, cinque risultati
+        results = []
+        same = [broker.submit(ask("riassumi il file"), on_result=results.append) for _ in range(5)]
+        # Lavoro in background: al massimo uno slot, l'altro resta alla chat
+        background = [broker.submit(ask(f"analisi {i}"), priority=PRIORITY_BACKGROUND)
+                      for i in range(4)]
+        cancelled = broker.submit(ask("non serve più"))
+        cancelled.cancel()
+        
+        deltas = []
+        finished = []
+        started = time.perf_counter()
+        stream = broker.submit_stream(ask("domanda della chat"), priority=PRIORITY_INTERACTIVE,
+                                      on_item=deltas.append, on_done=lambda: finished.append(
+                                          time.perf_counter() - started))
+        stream.wait(timeout=2)
+        stream_seconds = time.perf_counter() - started
+        
+        for handle in same + background:
+            handle.wait(timeout=5)
+        deadline = time.perf_counter() + 2
+        while engine.active_requests and time.perf_counter() < deadline:
+            time.sleep(0.01)
+        engine.process_callbacks()
+        
+        dedupe_ok = (service.calls.count("riassumi il file") == 1 and len(results) == 5
+                     and all(h.result == "risposta a riassumi il file" for h in same))
+        cap_ok = service.peak <= 1 and broker.stats()["peak_running"] <= 2
+        # La chat non aspetta la coda dei plugin (4 richieste da 50 ms)
+        priority_ok = "".join(deltas) == "risposta in streaming" and finished and stream_seconds < 0.15
+        cancel_ok = "non serve più" not in service.calls and broker.stats()["skipped"] == 1
+        done_ok = all(h.result == f"risposta a analisi {i}" for i, h in enumerate(background))
+        
+        if dedupe_ok and cap_ok and priority_ok and cancel_ok and done_ok:
+            stats = broker.stats()
+            print(f"✅ {stats['submitted']} richieste, {stats['deduplicated']} deduplicate, "
+                  f"chat servita in {stream_seconds * 1000:.0f} ms")
+            return True
+        else:
+            print(f"❌ Broker non corretto: single-flight {dedupe_ok}, limite {cap_ok}, "
+                  f"priorità {priority_ok}, annullamento {cancel_ok}, completamento {done_ok}")
+            return False
+            
+    except Exception as e:
+        print(f"❌ Errore nel test del broker delle richieste: {e}")
+        return False
+    finally:
+        broker.shutdown()
+        engine.shutdown()
+
+def test_resilience():
+    """Testa retry con backoff, Retry-After, timeout separati e circuit breaker"""
+    print("\n🛡️ Testando retry e circuit breaker...")
+    
+    import time
+    from src.configs.settings import Settings
+    from src.services.copilot_service import CopilotService
+    from src.services.mock_server import MockCompletionServer
+    from src.services.resilience import CircuitBreaker, RetryPolicy, parse_retry_after
+    
+    env_keys = ["GITHUB_COPILOT_API_KEY", "OPENAI_API_KEY", "OPENAI_BASE_URL"]
+    saved_env = {key: os.environ.get(key) for key in env_keys}
+    messages = [{"role": "user", "content": "ciao"}]
+    
+    try:
+        with MockCompletionServer(reply="risposta reale") as server:
+            os.environ["GITHUB_COPILOT_API_KEY"] = "test-key-1234567890"
+            os.environ["OPENAI_API_KEY"] = "test-key"
+            os.environ["OPENAI_BASE_URL"] = server.base_url
+            
+            service = CopilotService(Settings())
+            sleeps = []
+            service.retry_policy = RetryPolicy(max_attempts=3, base_delay=0.2, sleep=sleeps.append)
+            now = [0.0]
+            service.breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10,
+                                             clock=lambda: now[0])
+            transitions = []
+            service.breaker.on_transition.append(lambda old, new: transitions.append(f"{old}->{new}"))
+            
+            # Due 503 consecutivi: al terzo tentativo la risposta è quella reale
+            server.fail_next(503, count=2)
+            retry_ok = (service.send_message(messages) == "risposta reale" and len(sleeps) == 2
+                        and sleeps[0] <= 0.2 and sleeps[1] <= 0.4)
+            
+            # Un 429 con Retry-After: l'attesa è quella chiesta dal server
+            sleeps.clear()
+            server.fail_next(429, retry_after="0.75")
+            retry_after_ok = service.send_message(messages) == "risposta reale" and sleeps == [0.75]
+            date_ok = abs(parse_retry_after("Wed, 21 Oct 2015 07:28:10 GMT", now=1445412480) - 10) < 1e-6
+            
+            # Upstream lento: il timeout di lettura scatta subito, non dopo 30 s
+            server.response_delay = 0.5
+            service.timeout = (1.0, 0.1)
+            service.retry_policy.max_attempts = 1
+            started = time.perf_counter()
+            slow_reply = service.send_message(messages)
+            timeout_ok = slow_reply != "risposta reale" and time.perf_counter() - started < 0.45
+            server.response_delay = 0
+            
+            # Tre fallimenti aprono il circuito: le chiamate successive non toccano il server
+            server.fail_next(503, count=2)
+            service.send_message(messages)
+            service.send_message(messages)
+            requests_before = server.request_count
+            started = time.perf_counter()
+            short_reply = service.send_message(messages)
+            short_ms = (time.perf_counter() - started) * 1000
+            open_ok = (service.breaker.state == "open" and server.request_count == requests_before
+                       and short_reply != "risposta reale" and short_ms < 50)
+            
+            # Dopo reset_timeout una sola prova half-open richiude il circuito
+            now[0] += 10
+            probe_ok = service.send_message(messages) == "risposta reale" and service.breaker.state == "closed"
+            metrics = service.breaker.stats()
+            metrics_ok = (transitions == ["closed->open", "open->half_open", "half_open->closed"]
+                          and metrics["transitions"]["closed->open"] == 1
+                          and metrics["short_circuited"] == 1)
+        
+        if retry_ok and retry_after_ok and date_ok and timeout_ok and open_ok and probe_ok and metrics_ok:
+            print(f"✅ Retry e breaker funzionanti: fallback immediato in {short_ms:.1f} ms "
+                  f"a circuito aperto")
+            return True
+        else:
+            print(f"❌ Resilienza non corretta: retry {retry_ok}, Retry-After {retry_after_ok}/{date_ok}, "
+                  f"timeout {timeout_ok}, circuito aperto {open_ok}, prova {probe_ok}, "
+                  f"metriche {metrics_ok} {transitions}")
+            return False
+            
+    except Exception as e:
+        print(f"❌ Errore nel test di retry e circuit breaker: {e}")
+        return False
+    finally:
+        for key, value in saved_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+def test_provider_routing():
+    """Testa instradamento per latenza, hedging e failover tra due server locali"""
+    print("\n🔀 Testando i provider dei modelli...")
+    
+    import time
+    from src.configs.settings import Settings
+    from src.services.copilot_service import CopilotService
+    from src.services.mock_server import MockCompletionServer
+    from src.services.providers import HTTPProvider, MockProvider, Provider, ProviderRegistry
+    from src.services.resilience import CircuitBreaker, RetryPolicy
+    
+    class SendOnlyProvider(Provider):
+        def send(self, messages, params):
+            return "solo send"
+    
+    env_keys = ["GITHUB_COPILOT_API_KEY", "OPENAI_API_KEY", "OPENAI_BASE_URL"]
+    saved_env = {key: os.environ.get(key) for key in env_keys}
+    messages = [{"role": "user", "content": "ciao"}]
+    params = {"model": "gpt-test", "temperature": 0, "max_tokens": 50}
+    
+    def local_provider(name, server):
+        return HTTPProvider(name, server.base_url, kind="local", timeout=(1.0, 2.0),
+                            retry_policy=RetryPolicy(max_attempts=1),
+                            breaker=CircuitBreaker(failure_threshold=1, reset_timeout=60))
+    
+    try:
+        # Un provider senza stream() fallisce alla costruzione, non a metà richiesta
+        try:
+            SendOnlyProvider("incompleto")
+            abstract_ok = False
+        except TypeError:
+            abstract_ok = True
+        
+        with MockCompletionServer(reply="lento", response_delay=0.15) as slow, \
+                MockCompletionServer(reply="veloce", model="modello-veloce") as fast:
+            servers = {"lento": slow, "veloce": fast}
+            registry = ProviderRegistry(hedge=False)
+            registry.register(local_provider("lento", slow))
+            registry.register(local_provider("veloce", fast))
+            registry.register(MockProvider(lambda msgs: "mock"))
+            
+            # Dopo un giro di misure vince il backend con il p50 più basso
+            replies = [registry.complete(messages, params)[1] for _ in range(5)]
+            routing_ok = (replies[0] == "lento" and replies[2:] == ["veloce"] * 3
+                          and registry.ranked()[0].name == "veloce")
+            
+            # Il backend preferito rallenta: oltre il suo p95 risponde il secondo
+            registry.hedge = True
+            fast.response_delay = 0.5
+            started = time.perf_counter()
+            provider, reply = registry.complete(messages, params)
+            hedge_seconds = time.perf_counter() - started
+            hedge_ok = (reply == "lento" and hedge_seconds < 0.4
+                        and registry.hedged == 1 and registry.hedge_wins == 1)
+            fast.response_delay = 0
+            
+            # Un 503 sul primo backend: failover sul secondo, che resta l'unico sano
+            first = registry.ranked()[0]
+            other = "lento" if first.name == "veloce" else "veloce"
+            servers[first.name].fail_next(503)
+            provider, reply = registry.complete(messages, params)
+            failover_ok = (provider.name == other and reply == other and registry.failovers == 1
+                           and [p.name for p in registry.ranked()] == [other])
+            
+            # Streaming attraverso il registro
+            provider, deltas = registry.stream(messages, params)
+            stream_ok = provider.name == other and "".join(deltas) == other
+            
+            # Nessun backend sano: risposta del provider mock
+            servers[other].fail_next(503)
+            provider, reply = registry.complete(messages, params)
+            fallback_ok = provider.kind == "mock" and reply == "mock" and registry.fallbacks == 1
+            
+            # CopilotService con solo un server locale nelle impostazioni, senza API key
+            for key in ("GITHUB_COPILOT_API_KEY", "OPENAI_API_KEY"):
+                os.environ.pop(key, None)
+            settings = Settings()
+            settings.settings["github_copilot_api_key"] = ""
+            unconfigured_ok = not CopilotService(settings).is_configured()
+            settings.settings["providers"] = {
+                "local": [{"name": "locale", "base_url": fast.base_url}],
+                "hedge": True
+            }
+            service = CopilotService(settings)
+            service_ok = (unconfigured_ok and service.is_configured()
+                          and service.send_message(messages) == "veloce"
+                          and service.last_provider == "locale"
+                          and "".join(service.stream_message(messages)) == "veloce"
+                          and service.get_models() == ["modello-veloce"])
+        
+        if (routing_ok and hedge_ok and failover_ok and stream_ok and fallback_ok and service_ok
+                and abstract_ok):
+            print(f"✅ Provider funzionanti: risposta con hedging in {hedge_seconds * 1000:.0f} ms "
+                  f"invece di 500 ms")
+            return True
+        else:
+            print(f"❌ Provider non corretti: instradamento {routing_ok} {replies}, hedging {hedge_ok}, "
+                  f"failover {failover_ok}, streaming {stream_ok}, fallback {fallback_ok}, "
+                  f"servizio {service_ok}, classe astratta {abstract_ok}")
+            return False
+            
+    except Exception as e:
+        print(f"❌ Errore nel test dei provider: {e}")
+        return False
+    finally:
+        for key, value in saved_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+def test_layout_resize():
+    """Testa che il ridimensionamento dei pannelli riconfiguri solo il grid, in meno di un frame"""
+    print("\n📐 Testando il ridimensionamento dei pannelli...")
+    
+    import tempfile
+    import time
+    import tkinter as tk
+    
+    try:
+        tk.Tk().destroy()
+    except tk.TclError:
+        print("⏭️ Nessun display: test del layout saltato")
+        return True
+    
+    saved_home = os.environ.get("HOME")
+    window = None
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            os.environ["HOME"] = tmp_dir
+            from src.configs.settings import Settings
+            from src.ui.main_window import MainWindow
+            
+            settings = Settings()
+            settings.settings["plugins"] = {**settings.get("plugins", {}), "preload": False}
+            window = MainWindow(settings)
+            chat_panel, notes_panel = window.chat_panel, window.notes_panel
+            for i in range(500):
+                chat_panel.add_message("user" if i % 2 else "assistant", f"Messaggio {i} " * 20)
+            window.root.update()
+            
+            samples = []
+            for percent in list(range(20, 81)) + list(range(80, 19, -1)):
+                start = time.perf_counter()
+                window.adjust_layout(percent)
+                window.root.update_idletasks()
+                samples.append(time.perf_counter() - start)
+            samples.sort()
+            p95_ms = samples[int(len(samples) * 0.95)] * 1000
+            
+            # Stessi widget di prima: nessun pannello ricreato
+            panels_ok = window.chat_panel is chat_panel and window.notes_panel is notes_panel
+            
+            # Con le note nascoste la chat occupa tutta la larghezza
+            window.toggle_notes_panel()
+            window.root.update_idletasks()
+            hidden_ok = (not window.main_frame.grid_columnconfigure(1)["uniform"]
+                         and chat_panel.winfo_width() >= window.main_frame.winfo_width() - 20)
+            window.toggle_notes_panel()
+            shown_ok = window.main_frame.grid_columnconfigure(1)["uniform"] == "panels"
+            
+            window.shutdown()
+            window = None
+        
+        if p95_ms < 16 and panels_ok and hidden_ok and shown_ok:
+            print(f"✅ Ridimensionamento in {p95_ms:.1f} ms (p95) con 500 messaggi")
+            return True
+        else:
+            print(f"❌ Layout non corretto: p95 {p95_ms:.1f} ms, pannelli {panels_ok}, "
+                  f"note nascoste {hidden_ok}, note visibili {shown_ok}")
+            return False
+            
+    except Exception as e:
+        print(f"❌ Errore nel test del layout: {e}")
+        return False
+    finally:
+        if window is not None:
+            window.shutdown()
+        if saved_home is None:
+            os.environ.pop("HOME", None)
+        else:
+            os.environ["HOME"] = saved_home
+
 def main():
     """Esegue tutti i test"""
     print("🚀 Studio App - Test Suite")
@@ -124,7 +1776,32 @@ def main():
         ("Import dei moduli", test_imports),
         ("Sistema di configurazione", test_settings),
         ("Sistema dei plugin", test_plugin_system),
-        ("Servizio Copilot", test_copilot_service)
+        ("Servizio Copilot", test_copilot_service),
+        ("Streaming delle risposte", test_copilot_streaming),
+        ("Pool di connessioni HTTP", test_http_session_pool),
+        ("Motore delle richieste", test_request_engine),
+        ("Archivio messaggi chat", test_message_store),
+        ("Cache delle risposte", test_response_cache),
+        ("Journal delle note", test_notes_journal),
+        ("Archivio SQLite delle note", test_notes_sqlite_store),
+        ("Caricamento lazy delle note", test_notes_lazy_loading),
+        ("Salvataggio differito delle impostazioni", test_settings_write_behind),
+        ("Discovery dei plugin tramite manifest", test_plugin_manifest_discovery),
+        ("Caricamento dei plugin in background", test_plugin_background_loading),
+        ("Host dei plugin fuori processo", test_plugin_host),
+        ("Hot-reload dei plugin", test_plugin_hot_reload),
+        ("Buffer mappato per file grandi", test_mapped_text_file),
+        ("Evidenziazione della sintassi", test_syntax_highlighter),
+        ("Salvataggio in background", test_background_save),
+        ("Raggruppamento degli eventi", test_event_coalescer),
+        ("Harness dei benchmark", test_benchmark_harness),
+        ("Profilo dell'avvio", test_startup_profiler),
+        ("Finestra di contesto della chat", test_context_builder),
+        ("Archivio delle conversazioni", test_conversation_store),
+        ("Broker delle richieste", test_completion_broker),
+        ("Retry e circuit breaker", test_resilience),
+        ("Provider dei modelli", test_provider_routing),
+        ("Ridimensionamento dei pannelli", test_layout_resize)
     ]
     
     passed = 0